@@ -8,6 +8,12 @@ from .user import db
 class AuditLog(db.Model):
     """Modelo para logs de auditoria"""
     __tablename__ = 'audit_logs'
+    __table_args__ = (
+        # Consultas de auditoria filtram por usuário/ação e ordenam por data
+        db.Index('ix_audit_user_created', 'user_id', 'created_at'),
+        db.Index('ix_audit_action_created', 'action', 'created_at'),
+        db.Index('ix_audit_created', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -153,7 +153,8 @@ def smart_chat_route():
         prompt=prompt,
         user_id=user_id,
         use_rag=use_rag,
-        use_cache=use_cache
+        use_cache=use_cache,
+        force_rag=rag_mode == 'force'
     )
     
     # Adicionar tempo de processamento
@@ -226,7 +227,8 @@ def rag_chat_route():
         prompt=prompt,
         user_id=user_id,
         use_rag=True,
-        use_cache=True
+        use_cache=True,
+        force_rag=True
     )
     
     # Se RAG falhou mas Claude disponível, informar
@@ -606,8 +606,9 @@ def get_index_status():
 def health_check():
     """Health check do serviço de busca"""
     try:
-        # Verificar service
-        health_status = search_service.health_check()
+        # Verificar service (deep=true executa também uma busca de teste)
+        deep = request.args.get('deep', 'false').lower() == 'true'
+        health_status = search_service.health_check(deep=deep)
         
         return jsonify({
             'status': 'healthy',
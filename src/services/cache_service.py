@@ -6,6 +6,7 @@ performance do sistema POLARIS.
 """
 
 import os
+import copy
 import json
 import pickle
 import time
@@ -61,6 +62,18 @@ class CacheService:
         # Inicializar Redis
         self._init_redis()
     
+    def __deepcopy__(self, memo):
+        """
+        Copiar o cache em memória e as estatísticas; o cliente Redis
+        (thread-safe, com pool de conexões e locks internos) é compartilhado
+        """
+        clone = self.__class__.__new__(self.__class__)
+        memo[id(self)] = clone
+        memo[id(self.redis_client)] = self.redis_client
+        for name, value in self.__dict__.items():
+            setattr(clone, name, copy.deepcopy(value, memo))
+        return clone
+    
     def get(self, key: str, default: Any = None) -> Any:
         """
         Obter valor do cache
@@ -342,9 +355,10 @@ class CacheService:
                 except Exception as e:
                     self._log_error(f"Erro no Redis mset: {str(e)}")
             
-            # Fallback para cache em memória
+            # Fallback para cache em memória (um único instante para o lote)
+            now = time.time()
             for key, value in mapping.items():
-                self._set_memory_cache(key, value, ttl)
+                self._set_memory_cache(key, value, ttl, now)
             
             return True
             
@@ -542,8 +556,9 @@ class CacheService:
             self._log_error(f"Erro na conexão Redis: {str(e)}")
             self.redis_available = False
     
-    def _set_memory_cache(self, key: str, value: Any, ttl: int):
-        """Definir valor no cache em memória"""
+    def _set_memory_cache(self, key: str, value: Any, ttl: int,
+                          now: float = None):
+        """Definir valor no cache em memória (now: instante já obtido)"""
         # Verificar limite de tamanho
         if len(self.memory_cache) >= self.max_memory_cache_size:
             # Remover item mais antigo
@@ -554,7 +569,7 @@ class CacheService:
             self._remove_from_memory_cache(oldest_key)
         
         # Adicionar novo item
-        current_time = time.time()
+        current_time = time.time() if now is None else now
         self.memory_cache[key] = value
         self.memory_cache_timestamps[key] = current_time
         self.memory_cache_ttl[key] = current_time + ttl
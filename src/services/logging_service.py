@@ -6,18 +6,187 @@ e monitoramento do sistema POLARIS.
 """
 
 import os
+import re
 import json
+import mmap
 import logging
 import logging.handlers
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass
 from enum import Enum
+import sys
 import traceback
 import functools
+import threading
+import time
+import heapq
+import struct
+import zlib
+import bisect
 
 from src.models import db, AuditLog
 
+# Parser JSON rápido (opcional)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_json_loads = orjson.loads if orjson else json.loads
+
+if orjson:
+    _ORJSON_OPTIONS = (orjson.OPT_APPEND_NEWLINE | orjson.OPT_NAIVE_UTC |
+                       orjson.OPT_NON_STR_KEYS)
+
+
+def _json_default(value: Any) -> Any:
+    """Serializar tipos não suportados nativamente pelo encoder"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def _json_dumps_line(data: Dict[str, Any]) -> bytes:
+    """Serializar registro como linha JSON compacta em UTF-8"""
+    if orjson:
+        return orjson.dumps(data, default=_json_default,
+                            option=_ORJSON_OPTIONS)
+    return (json.dumps(data, ensure_ascii=False, separators=(',', ':'),
+                       default=_json_default) + '\n').encode('utf-8')
+
+
+# Timestamp é sempre a primeira chave do registro JSON
+_TIMESTAMP_RE = re.compile(rb'"timestamp": ?"([^"]+)"')
+
+
+# Índice lateral do arquivo de log: cabeçalho com o offset a partir do qual
+# o índice está completo, seguido de entradas
+# (timestamp ms, crc32 do service, user_id, offset, tamanho da linha)
+LOG_INDEX_SUFFIX = '.idx'
+_INDEX_HEADER = struct.Struct('<Q')
+_INDEX_ENTRY = struct.Struct('<QIIQI')
+# Tolerância para registros gravados fora de ordem entre threads
+_INDEX_TS_SLACK_MS = 1000
+# user_id que não cabe no índice (registro precisa ser conferido na linha)
+_INDEX_USER_UNKNOWN = 0xFFFFFFFF
+
+# Contadores de auditoria pré-computados na escrita (Redis)
+AUDIT_COUNTERS_READY_KEY = 'polaris:audit:counters_ready'
+AUDIT_TOTAL_KEY = 'polaris:audit:total'
+AUDIT_ACTION_COUNTS_KEY = 'polaris:audit:action_counts'
+AUDIT_USER_COUNTS_KEY = 'polaris:audit:user_counts'
+
+# Cache por thread do último timestamp formatado
+_clock_cache = threading.local()
+
+
+def _now():
+    """
+    Instante atual em ms e como timestamp UTC ISO-8601 (ms)
+    
+    O texto é formatado no máximo uma vez por milissegundo por thread.
+    """
+    now_ms = time.time_ns() // 1_000_000
+    if getattr(_clock_cache, 'ms', None) != now_ms:
+        now = datetime.utcfromtimestamp(now_ms // 1000).replace(
+            microsecond=(now_ms % 1000) * 1000)
+        _clock_cache.ms = now_ms
+        _clock_cache.iso = now.isoformat(timespec='milliseconds') + 'Z'
+    return now_ms, _clock_cache.iso
+
+
+def _now_iso() -> str:
+    """Timestamp UTC ISO-8601 (ms) atual"""
+    return _now()[1]
+
+
+def _to_utc(value: datetime) -> datetime:
+    """Converter datetime para UTC sem timezone (naive = já em UTC)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _to_log_timestamp(value: datetime) -> str:
+    """Formatar datetime no mesmo formato do campo 'timestamp' dos logs"""
+    return _to_utc(value).isoformat(timespec='milliseconds') + 'Z'
+
+
+def _to_epoch_ms(value: datetime) -> int:
+    """Converter datetime (naive = UTC) para epoch em ms"""
+    return int(_to_utc(value).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _service_hash(service: str) -> int:
+    """Hash estável entre processos do nome do service"""
+    return zlib.crc32(service.encode('utf-8'))
+
+
+def _log_matches(log_data: Dict[str, Any],
+                 service: Optional[str],
+                 level: Optional['LogLevel'],
+                 user_id: Optional[int],
+                 start_iso: Optional[str],
+                 end_iso: Optional[str]) -> bool:
+    """Verificar se um registro decodificado atende aos filtros"""
+    if service and log_data.get('service') != service:
+        return False
+    if level and log_data.get('level') != level.value:
+        return False
+    if user_id and log_data.get('user_id') != user_id:
+        return False
+    timestamp = log_data.get('timestamp', '')
+    if start_iso and timestamp < start_iso:
+        return False
+    if end_iso and timestamp > end_iso:
+        return False
+    return True
+
+
+class _IndexTimestamps:
+    """Sequência dos timestamps de um índice de log (para bisect)"""
+
+    def __init__(self, buffer, count: int):
+        self.buffer = buffer
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, position: int) -> int:
+        return _INDEX_ENTRY.unpack_from(
+            self.buffer,
+            _INDEX_HEADER.size + position * _INDEX_ENTRY.size)[0]
+
+
+def _format_exc_info(error_details: Dict[str, Any]) -> Dict[str, Any]:
+    """Substituir 'exc_info' pelo traceback formatado"""
+    details = dict(error_details)
+    details['traceback'] = ''.join(
+        traceback.format_exception(*details.pop('exc_info')))
+    return details
+
+
+def _iter_lines_reversed(file_path: str):
+    """Iterar linhas de um arquivo do fim para o início (via mmap)"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = len(mm)
+            while end > 0:
+                start = mm.rfind(b'\n', 0, end - 1) + 1
+                yield mm[start:end]
+                end = start
+
+
+def _filter_needle(key: str, value: Any) -> bytes:
+    """Trecho serializado de um campo, usado como pré-filtro de linhas"""
+    return _json_dumps_line({key: value}).rstrip(b'\n')[1:-1]
+
 
 class LogLevel(Enum):
     """Níveis de log"""
@@ -28,6 +197,16 @@ class LogLevel(Enum):
     CRITICAL = "CRITICAL"
 
 
+# Mapeamento LogLevel -> nível do módulo logging
+_LOGGING_LEVELS = {
+    LogLevel.DEBUG: logging.DEBUG,
+    LogLevel.INFO: logging.INFO,
+    LogLevel.WARNING: logging.WARNING,
+    LogLevel.ERROR: logging.ERROR,
+    LogLevel.CRITICAL: logging.CRITICAL
+}
+
+
 class ActionType(Enum):
     """Tipos de ação para auditoria"""
     CREATE = "CREATE"
@@ -81,6 +260,187 @@ class AuditEntry:
     metadata: Optional[Dict[str, Any]] = None
 
 
+class RawBytesFormatter(logging.Formatter):
+    """
+    Formatter para arquivo que repassa registros já serializados
+
+    Mensagens em bytes (linhas JSON geradas por ``LoggingService.log``) são
+    escritas como estão; as demais usam o formato textual configurado.
+    """
+
+    def format(self, record: logging.LogRecord) -> bytes:
+        if isinstance(record.msg, bytes):
+            return record.msg
+        return (super().format(record) + '\n').encode('utf-8')
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Formatter textual que aceita mensagens serializadas em bytes"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        if isinstance(record.msg, bytes):
+            record = logging.makeLogRecord(record.__dict__)
+            record.msg = record.msg.decode('utf-8').rstrip('\n')
+        return super().format(record)
+
+
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler com escrita bufferizada
+
+    Acumula os registros em um buffer de ``buffer_size`` bytes e descarrega
+    em disco a cada ``flush_interval`` segundos, em vez de um ``write()`` +
+    ``flush()`` por registro. Registros ERROR/CRITICAL descarregam o buffer
+    imediatamente para não se perderem em caso de queda do processo.
+
+    O arquivo é aberto em modo binário: formatters que retornam ``bytes``
+    (ver ``RawBytesFormatter``) são escritos sem recodificação.
+
+    A rotação é apenas sinalizada em ``emit`` e executada pela thread de
+    flush, para que o rename/reabertura não bloqueie a thread chamadora.
+
+    Com ``index=True``, registros que carregam o atributo ``log_index``
+    (timestamp em ms, service, user_id) têm o offset gravado no índice
+    lateral ``<arquivo>.idx``, usado por ``LoggingService.get_logs``.
+    """
+
+    def __init__(self,
+                 filename: str,
+                 buffer_size: int = 64 * 1024,
+                 flush_interval: float = 0.2,
+                 index: bool = False,
+                 **kwargs):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        # Tamanho atual do arquivo, mantido em memória para que a checagem
+        # de rotação não precise de seek()/tell() (que descarregam o buffer)
+        self._stream_size = 0
+        self._rollover_pending = False
+        self.index_path = (os.path.abspath(filename) + LOG_INDEX_SUFFIX
+                           if index else None)
+        self._index_stream = None
+        super().__init__(filename, **kwargs)
+
+        self._flush_stop = threading.Event()
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop,
+            name='polaris-log-flush',
+            daemon=True
+        )
+        self._flush_thread.start()
+
+    def _open(self):
+        """Abrir arquivo de log (binário) com buffer de escrita ampliado"""
+        stream = open(self.baseFilename, 'ab', buffering=self.buffer_size)
+        self._stream_size = os.fstat(stream.fileno()).st_size
+        if self.index_path:
+            self._open_index()
+        return stream
+
+    def _open_index(self) -> None:
+        """Abrir índice lateral, registrando a partir de onde está completo"""
+        self._close_index()
+        self._index_stream = open(self.index_path, 'ab',
+                                  buffering=self.buffer_size)
+        if os.fstat(self._index_stream.fileno()).st_size == 0:
+            # Linhas já existentes no log não estão no índice
+            self._index_stream.write(_INDEX_HEADER.pack(self._stream_size))
+
+    def _close_index(self) -> None:
+        """Fechar índice lateral"""
+        if self._index_stream is not None:
+            self._index_stream.close()
+            self._index_stream = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Escrever registro no buffer, rotacionando quando necessário"""
+        try:
+            msg = self.format(record)
+            if isinstance(msg, str):
+                msg = (msg + self.terminator).encode(self.encoding or 'utf-8')
+
+            if self.stream is None:
+                self.stream = self._open()
+
+            if (self.maxBytes > 0 and not self._rollover_pending and
+                    self._stream_size > 0 and
+                    self._stream_size + len(msg) >= self.maxBytes):
+                self._rollover_pending = True
+
+            log_index = getattr(record, 'log_index', None)
+            if log_index is not None and self._index_stream is not None:
+                timestamp_ms, service, user_id = log_index
+                if user_id is None:
+                    user_id = 0
+                elif (not isinstance(user_id, int) or
+                      not 0 < user_id < _INDEX_USER_UNKNOWN):
+                    user_id = _INDEX_USER_UNKNOWN
+                self._index_stream.write(_INDEX_ENTRY.pack(
+                    timestamp_ms, _service_hash(service), user_id,
+                    self._stream_size, len(msg)))
+
+            self.stream.write(msg)
+            self._stream_size += len(msg)
+
+            if record.levelno >= logging.ERROR:
+                self.flush()
+
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        """Descarregar buffers do log e do índice"""
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.flush()
+            if self._index_stream is not None:
+                self._index_stream.flush()
+        finally:
+            self.release()
+
+    def doRollover(self) -> None:
+        """Rotacionar log, recomeçando o índice lateral"""
+        if self.index_path:
+            self._close_index()
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+        super().doRollover()
+
+    def close(self) -> None:
+        """Parar thread de flush e fechar arquivos"""
+        self._flush_stop.set()
+        self.acquire()
+        try:
+            self._close_index()
+        finally:
+            self.release()
+        super().close()
+
+    def _flush_loop(self) -> None:
+        """Descarregar o buffer periodicamente"""
+        while not self._flush_stop.wait(self.flush_interval):
+            try:
+                if self._rollover_pending:
+                    self._rollover()
+                else:
+                    self.flush()
+            except Exception:
+                pass
+
+    def _rollover(self) -> None:
+        """Executar rotação sinalizada por emit"""
+        self.acquire()
+        try:
+            if self._rollover_pending and self.stream is not None:
+                self.doRollover()
+            self._rollover_pending = False
+        finally:
+            self.release()
+
+
 class LoggingService:
     """Service para logging e auditoria com configuração flexível"""
     
@@ -111,8 +471,13 @@ class LoggingService:
             'max_log_file_size': 10 * 1024 * 1024,  # 10MB
             'max_log_files': 5,
             'log_retention_days': 30,
+            'cleanup_batch_size': 5000,
+            'cleanup_batch_pause': 0.05,  # segundos entre lotes
+            'audit_counters_ttl': 3600,  # ressincronizar contadores (s)
             'console_log_level': 'WARNING',
-            'file_log_level': 'DEBUG'
+            'file_log_level': 'DEBUG',
+            'log_buffer_size': 64 * 1024,  # 64KB
+            'log_flush_interval': 0.2  # segundos
         }
         
         # Mesclar configurações
@@ -123,10 +488,15 @@ class LoggingService:
         self.max_log_file_size = default_config['max_log_file_size']
         self.max_log_files = default_config['max_log_files']
         self.log_retention_days = default_config['log_retention_days']
+        self.cleanup_batch_size = default_config['cleanup_batch_size']
+        self.cleanup_batch_pause = default_config['cleanup_batch_pause']
+        self.audit_counters_ttl = default_config['audit_counters_ttl']
         self.console_log_level = getattr(
             logging, default_config['console_log_level'])
         self.file_log_level = getattr(
             logging, default_config['file_log_level'])
+        self.log_buffer_size = default_config['log_buffer_size']
+        self.log_flush_interval = default_config['log_flush_interval']
         
         # Configurar logging padrão
         self._setup_logging()
@@ -162,49 +532,124 @@ class LoggingService:
             request_id: ID da requisição (opcional)
             duration_ms: Duração em milissegundos (opcional)
             metadata: Metadados adicionais (opcional)
-            error_details: Detalhes do erro (opcional)
+            error_details: Detalhes do erro (opcional); pode conter
+                'exc_info' (sys.exc_info()), formatado apenas na serialização
         """
         try:
-            entry = LogEntry(
-                timestamp=datetime.utcnow(),
-                level=level,
-                service=service,
-                action=action,
-                message=message,
-                user_id=user_id,
-                session_id=session_id,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                request_id=request_id,
-                duration_ms=duration_ms,
-                metadata=metadata,
-                error_details=error_details
-            )
+            logging_level = _LOGGING_LEVELS[level]
+            if not self.logger.isEnabledFor(logging_level):
+                return
             
-            # Log estruturado em JSON
-            log_data = asdict(entry)
-            log_data['timestamp'] = entry.timestamp.isoformat()
-            log_data['level'] = level.value
-            
-            # Log usando logger padrão
-            log_message = json.dumps(log_data, ensure_ascii=False)
-            
-            if level == LogLevel.DEBUG:
-                self.logger.debug(log_message)
-            elif level == LogLevel.INFO:
-                self.logger.info(log_message)
-            elif level == LogLevel.WARNING:
-                self.logger.warning(log_message)
-            elif level == LogLevel.ERROR:
-                self.logger.error(log_message)
-            elif level == LogLevel.CRITICAL:
-                self.logger.critical(log_message)
+            # Montar registro diretamente (sem LogEntry + asdict, que copia
+            # recursivamente metadados); campos vazios são omitidos
+            now_ms, timestamp = _now()
+            log_data = {
+                'timestamp': timestamp,
+                'level': level,
+                'service': service,
+                'action': action,
+                'message': message
+            }
+            
+            # Caminho rápido: a maioria das chamadas não passa campos
+            # opcionais (comparação encadeada: todos são None)
+            if not (user_id is session_id is ip_address is user_agent is
+                    request_id is duration_ms is metadata is error_details
+                    is None):
+                self._add_optional_fields(
+                    log_data, user_id, session_id, ip_address, user_agent,
+                    request_id, duration_ms, metadata, error_details)
+            
+            # Linha JSON em bytes, escrita sem passar pelo formatter textual
+            self.logger.log(logging_level, _json_dumps_line(log_data),
+                            extra={'log_index': (now_ms, service, user_id)})
             
         except Exception as e:
             # Fallback para log simples
             print(f"[{level.value}] {service}.{action}: {message}")
             print(f"[ERROR] LoggingService: {str(e)}")
     
+    def log_many(self,
+                 entries: List[Tuple[LogLevel, str, str, str]]) -> int:
+        """
+        Registrar vários logs simples de uma vez
+        
+        Os registros são montados primeiro e entregues aos handlers com o
+        lock de cada handler adquirido uma única vez para todo o lote (e
+        sem a busca da linha chamadora que ``Logger.log`` faz por registro).
+        
+        Args:
+            entries: Tuplas (level, service, action, message)
+        
+        Returns:
+            Número de registros emitidos (após o filtro de nível)
+        """
+        logger = self.logger
+        records = []
+        try:
+            for level, service, action, message in entries:
+                logging_level = _LOGGING_LEVELS[level]
+                if not logger.isEnabledFor(logging_level):
+                    continue
+                
+                now_ms, timestamp = _now()
+                log_data = {
+                    'timestamp': timestamp,
+                    'level': level,
+                    'service': service,
+                    'action': action,
+                    'message': message
+                }
+                records.append(logger.makeRecord(
+                    logger.name, logging_level, '(unknown file)', 0,
+                    _json_dumps_line(log_data), None, None,
+                    extra={'log_index': (now_ms, service, None)}))
+            
+            handlers = logger.handlers
+            for handler in handlers:
+                handler.acquire()
+            try:
+                for record in records:
+                    logger.handle(record)
+            finally:
+                for handler in reversed(handlers):
+                    handler.release()
+            return len(records)
+        
+        except Exception as e:
+            print(f"[ERROR] LoggingService: {str(e)}")
+            return 0
+    
+    @staticmethod
+    def _add_optional_fields(log_data: Dict[str, Any],
+                             user_id: Optional[int],
+                             session_id: Optional[str],
+                             ip_address: Optional[str],
+                             user_agent: Optional[str],
+                             request_id: Optional[str],
+                             duration_ms: Optional[float],
+                             metadata: Optional[Dict[str, Any]],
+                             error_details: Optional[Dict[str, Any]]) -> None:
+        """Adicionar ao registro os campos opcionais informados"""
+        if user_id is not None:
+            log_data['user_id'] = user_id
+        if session_id is not None:
+            log_data['session_id'] = session_id
+        if ip_address is not None:
+            log_data['ip_address'] = ip_address
+        if user_agent is not None:
+            log_data['user_agent'] = user_agent
+        if request_id is not None:
+            log_data['request_id'] = request_id
+        if duration_ms is not None:
+            log_data['duration_ms'] = duration_ms
+        if metadata is not None:
+            log_data['metadata'] = metadata
+        if error_details is not None:
+            if 'exc_info' in error_details:
+                error_details = _format_exc_info(error_details)
+            log_data['error_details'] = error_details
+    
     def audit(self,
               user_id: int,
               action_type: ActionType,
@@ -253,25 +698,14 @@ class LoggingService:
                 metadata=metadata
             )
             
-            # Salvar no banco de dados
-            audit_log = AuditLog(
-                user_id=user_id,
-                action_type=action_type.value,
-                resource_type=resource_type,
-                resource_id=resource_id,
-                old_values=old_values or {},
-                new_values=new_values or {},
-                ip_address=ip_address,
-                user_agent=user_agent,
-                session_id=session_id,
-                success=success,
-                error_message=error_message,
-                metadata=metadata or {}
-            )
-            
-            db.session.add(audit_log)
+            # Salvar no banco de dados via Core (sem objeto ORM)
+            db.session.execute(AuditLog.__table__.insert(),
+                               [self._audit_row(audit_entry)])
             db.session.commit()
             
+            # Atualizar contadores usados por get_statistics
+            self._increment_audit_counters([audit_entry])
+            
             # Log da auditoria usando a entrada estruturada
             self.log(
                 level=LogLevel.INFO,
@@ -286,7 +720,7 @@ class LoggingService:
                     'resource_type': resource_type,
                     'resource_id': resource_id,
                     'success': audit_entry.success,
-                    'timestamp': audit_entry.timestamp.isoformat()
+                    'timestamp': _now_iso()
                 }
             )
             
@@ -300,9 +734,52 @@ class LoggingService:
                 user_id=user_id,
                 error_details={
                     'error': str(e),
-                    'traceback': traceback.format_exc()
+                    'exc_info': sys.exc_info()
+                }
+            )
+    
+    def audit_many(self, entries: List[AuditEntry]) -> int:
+        """
+        Registrar várias entradas de auditoria em um único INSERT
+        
+        Args:
+            entries: Entradas de auditoria
+            
+        Returns:
+            Número de entradas registradas
+        """
+        if not entries:
+            return 0
+        
+        try:
+            # executemany via Core: um statement para todo o lote
+            db.session.execute(AuditLog.__table__.insert(),
+                               [self._audit_row(entry) for entry in entries])
+            db.session.commit()
+            
+            self._increment_audit_counters(entries)
+            
+            self.info(
+                "AuditService",
+                "AUDIT_BATCH",
+                f"Audit: {len(entries)} entradas registradas",
+                metadata={'count': len(entries)}
+            )
+            return len(entries)
+            
+        except Exception as e:
+            db.session.rollback()
+            self.log(
+                level=LogLevel.ERROR,
+                service="AuditService",
+                action="AUDIT_ERROR",
+                message=f"Erro na auditoria em lote: {str(e)}",
+                error_details={
+                    'error': str(e),
+                    'exc_info': sys.exc_info()
                 }
             )
+            return 0
     
     def info(self, service: str, action: str, message: str, **kwargs):
         """Log de informação"""
@@ -346,56 +823,161 @@ class LoggingService:
             Lista de logs
         """
         try:
-            # Ler logs do arquivo (implementação simplificada)
             logs = []
             log_file = os.path.join(self.logs_dir, 'polaris.log')
             
             if not os.path.exists(log_file):
                 return []
             
-            with open(log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        log_data = json.loads(line.strip())
-                        
-                        # Aplicar filtros
-                        if service and log_data.get('service') != service:
-                            continue
-                        
-                        if level and log_data.get('level') != level.value:
-                            continue
-                        
-                        if user_id and log_data.get('user_id') != user_id:
-                            continue
-                        
-                        # Filtros de data
-                        timestamp_str = log_data['timestamp']
-                        log_timestamp = datetime.fromisoformat(timestamp_str)
-                        
-                        if start_date and log_timestamp < start_date:
-                            continue
-                        
-                        if end_date and log_timestamp > end_date:
-                            continue
-                        
-                        logs.append(log_data)
-                        
-                        if len(logs) >= limit:
-                            break
-                            
-                    except (json.JSONDecodeError, KeyError):
-                        continue
+            # Descarregar buffer para incluir registros recentes
+            for handler in self.logger.handlers:
+                handler.flush()
+            
+            start_iso = _to_log_timestamp(start_date) if start_date else None
+            end_iso = _to_log_timestamp(end_date) if end_date else None
+            
+            # Consultas seletivas usam o índice lateral, quando disponível
+            if service or user_id or start_date:
+                indexed_logs = self._get_logs_from_index(
+                    log_file, service, level, user_id,
+                    start_date, start_iso, end_iso, limit)
+                if indexed_logs is not None:
+                    return indexed_logs
             
-            # Ordenar por timestamp (mais recentes primeiro)
-            logs.sort(key=lambda x: x['timestamp'], reverse=True)
+            # Pré-filtros em bytes: evitam decodificar JSON de linhas
+            # que certamente não atendem aos filtros de igualdade
+            needles = []
+            if service:
+                needles.append(_filter_needle('service', service))
+            if level:
+                needles.append(_filter_needle('level', level.value))
+            if user_id:
+                needles.append(_filter_needle('user_id', user_id))
+            
+            # ISO-8601 ordena lexicograficamente
+            start_bytes = start_iso.encode() if start_iso else None
+            end_bytes = end_iso.encode() if end_iso else None
+            
+            # Arquivo é append-only: ler a partir do fim retorna os mais
+            # recentes primeiro e permite parar ao atingir o limite
+            for line in _iter_lines_reversed(log_file):
+                if any(needle not in line for needle in needles):
+                    continue
+                
+                # Filtros de data sem decodificar a linha
+                if start_bytes or end_bytes:
+                    match = _TIMESTAMP_RE.search(line)
+                    if not match:
+                        continue
+                    timestamp = match.group(1)
+                    if start_bytes and timestamp < start_bytes:
+                        continue
+                    if end_bytes and timestamp > end_bytes:
+                        continue
+                
+                json_start = line.find(b'{')
+                if json_start < 0:
+                    continue
+                
+                try:
+                    log_data = _json_loads(line[json_start:])
+                except ValueError:
+                    continue
+                
+                # Confirmar filtros (o trecho pode casar em metadados)
+                if not isinstance(log_data, dict) or not _log_matches(
+                        log_data, service, level, user_id, start_iso, end_iso):
+                    continue
+                
+                logs.append(log_data)
+                
+                if len(logs) >= limit:
+                    break
             
-            return logs[:limit]
+            return logs
             
         except Exception as e:
             error_msg = f"Erro ao obter logs: {str(e)}"
             self.error("LoggingService", "GET_LOGS", error_msg)
             return []
     
+    def _get_logs_from_index(self,
+                             log_file: str,
+                             service: Optional[str],
+                             level: Optional[LogLevel],
+                             user_id: Optional[int],
+                             start_date: Optional[datetime],
+                             start_iso: Optional[str],
+                             end_iso: Optional[str],
+                             limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Obter logs filtrados via índice lateral
+        
+        Returns:
+            Lista de logs, ou None se o índice não puder ser usado (ausente,
+            incompleto ou inconsistente com o arquivo de log)
+        """
+        index_file = log_file + LOG_INDEX_SUFFIX
+        try:
+            index_f = open(index_file, 'rb')
+        except OSError:
+            return None
+        
+        with index_f, open(log_file, 'rb') as log_f:
+            index_size = os.fstat(index_f.fileno()).st_size
+            if index_size <= _INDEX_HEADER.size:
+                return None
+            
+            with mmap.mmap(index_f.fileno(), 0,
+                           access=mmap.ACCESS_READ) as mm:
+                # Índice só é usado se cobre o arquivo desde o início
+                if _INDEX_HEADER.unpack_from(mm, 0)[0] != 0:
+                    return None
+                
+                count = (index_size - _INDEX_HEADER.size) // _INDEX_ENTRY.size
+                first = 0
+                if start_date:
+                    first = bisect.bisect_left(
+                        _IndexTimestamps(mm, count),
+                        _to_epoch_ms(start_date) - _INDEX_TS_SLACK_MS)
+                
+                service_hash = _service_hash(service) if service else None
+                logs = []
+                
+                # Mais recentes primeiro
+                for position in range(count - 1, first - 1, -1):
+                    _, entry_hash, entry_user, offset, length = \
+                        _INDEX_ENTRY.unpack_from(
+                            mm, _INDEX_HEADER.size +
+                            position * _INDEX_ENTRY.size)
+                    
+                    if service_hash is not None and entry_hash != service_hash:
+                        continue
+                    if user_id and entry_user not in (user_id,
+                                                      _INDEX_USER_UNKNOWN):
+                        continue
+                    
+                    log_f.seek(offset)
+                    line = log_f.read(length)
+                    if len(line) < length:
+                        return None
+                    
+                    try:
+                        log_data = _json_loads(line)
+                    except ValueError:
+                        return None
+                    
+                    if not isinstance(log_data, dict):
+                        return None
+                    
+                    if _log_matches(log_data, service, level, user_id,
+                                    start_iso, end_iso):
+                        logs.append(log_data)
+                        if len(logs) >= limit:
+                            break
+                
+                return logs
+    
     def get_audit_logs(self,
                        user_id: int = None,
                        action_type: ActionType = None,
@@ -424,10 +1006,10 @@ class LoggingService:
                 query = query.filter_by(user_id=user_id)
             
             if action_type:
-                query = query.filter_by(action_type=action_type.value)
+                query = query.filter_by(action=action_type.value)
             
             if resource_type:
-                query = query.filter_by(resource_type=resource_type)
+                query = query.filter_by(resource=resource_type)
             
             if start_date:
                 query = query.filter(AuditLog.created_at >= start_date)
@@ -446,41 +1028,36 @@ class LoggingService:
             self.error("LoggingService", "GET_AUDIT_LOGS", error_msg)
             return []
     
-    def get_statistics(self) -> Dict[str, Any]:
+    def get_statistics(self, include_files: bool = True) -> Dict[str, Any]:
         """
         Obter estatísticas de logs
         
+        Args:
+            include_files: Incluir tamanho dos arquivos de log (varre o
+                diretório de logs)
+        
         Returns:
             Dict com estatísticas
         """
         try:
-            # Estatísticas de auditoria
-            total_audit_logs = AuditLog.query.count()
-            
-            # Por tipo de ação
-            action_stats = db.session.query(
-                AuditLog.action_type,
-                db.func.count(AuditLog.id).label('count')
-            ).group_by(AuditLog.action_type).all()
-            
-            # Por usuário (top 10)
-            user_stats = db.session.query(
-                AuditLog.user_id,
-                db.func.count(AuditLog.id).label('count')
-            ).group_by(AuditLog.user_id).order_by(
-                db.func.count(AuditLog.id).desc()
-            ).limit(10).all()
+            # Totais pré-computados na escrita, com SQL como fallback
+            counters = self._read_audit_counters()
+            if counters is None:
+                counters = self._compute_audit_counters()
+            total_audit_logs, action_counts, user_counts = counters
             
-            # Logs de hoje
-            today = datetime.utcnow().date()
+            # Logs de hoje (intervalo semiaberto para usar o índice)
+            today_start = datetime.combine(datetime.utcnow().date(),
+                                           datetime.min.time())
             logs_today = AuditLog.query.filter(
-                db.func.date(AuditLog.created_at) == today
+                AuditLog.created_at >= today_start,
+                AuditLog.created_at < today_start + timedelta(days=1)
             ).count()
             
             # Logs da semana
-            week_ago = today - timedelta(days=7)
+            week_ago = today_start - timedelta(days=7)
             logs_week = AuditLog.query.filter(
-                db.func.date(AuditLog.created_at) >= week_ago
+                AuditLog.created_at >= week_ago
             ).count()
             
             # Erros recentes
@@ -490,23 +1067,17 @@ class LoggingService:
             ).count()
             
             # Tamanho dos arquivos de log
-            log_files_size = 0
-            if os.path.exists(self.logs_dir):
-                for filename in os.listdir(self.logs_dir):
-                    file_path = os.path.join(self.logs_dir, filename)
-                    if os.path.isfile(file_path):
-                        log_files_size += os.path.getsize(file_path)
-            
-            # Preparar estatísticas por tipo de ação
-            action_stats_dict = {
-                action_type: count
-                for action_type, count in action_stats
-            }
+            log_files = {'directory': self.logs_dir}
+            if include_files:
+                log_files_size, _ = self._collect_file_info()
+                log_files['total_size_mb'] = round(
+                    log_files_size / (1024 * 1024), 2)
             
             # Preparar lista de top usuários
             top_users_list = [
                 {'user_id': user_id, 'count': count}
-                for user_id, count in user_stats
+                for user_id, count in heapq.nlargest(
+                    10, user_counts.items(), key=lambda item: item[1])
             ]
             
             # Calcular tamanho máximo em MB
@@ -519,12 +1090,9 @@ class LoggingService:
                     'this_week': logs_week,
                     'recent_errors': recent_errors
                 },
-                'by_action_type': action_stats_dict,
+                'by_action_type': action_counts,
                 'top_users': top_users_list,
-                'log_files': {
-                    'directory': self.logs_dir,
-                    'total_size_mb': round(log_files_size / (1024 * 1024), 2)
-                },
+                'log_files': log_files,
                 'config': {
                     'max_log_file_size_mb': max_size_mb,
                     'max_log_files': self.max_log_files,
@@ -562,25 +1130,21 @@ class LoggingService:
             retention_days = self.log_retention_days
             cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
             
-            # Limpar logs de auditoria antigos
-            deleted_audit = AuditLog.query.filter(
-                AuditLog.created_at < cutoff_date
-            ).delete()
-            
-            db.session.commit()
+            # Limpar logs de auditoria antigos em lotes, com commit por
+            # lote, para limitar duração de locks e tamanho de transação
+            deleted_audit = self._delete_old_audit_logs(cutoff_date)
+            if deleted_audit:
+                self._invalidate_audit_counters()
             
             # Limpar arquivos de log antigos
             deleted_files = 0
             if os.path.exists(self.logs_dir):
-                for filename in os.listdir(self.logs_dir):
-                    file_path = os.path.join(self.logs_dir, filename)
-                    if os.path.isfile(file_path):
-                        # Verificar se arquivo é antigo
-                        file_mtime = os.path.getmtime(file_path)
-                        file_time = datetime.fromtimestamp(file_mtime)
-                        if file_time < cutoff_date:
-                            os.remove(file_path)
-                            deleted_files += 1
+                for _, file_path, _, file_mtime in self._iter_log_files():
+                    # Verificar se arquivo é antigo
+                    file_time = datetime.fromtimestamp(file_mtime)
+                    if file_time < cutoff_date:
+                        os.remove(file_path)
+                        deleted_files += 1
             
             # Log de conclusão da limpeza
             cleanup_msg = (f"Limpeza concluída: {deleted_audit} audit logs, "
@@ -618,51 +1182,31 @@ class LoggingService:
             else:
                 logs_dir_writable = False
             
-            # Testar escrita de log
-            test_log_success = False
-            try:
-                self.debug("LoggingService", "HEALTH_CHECK", "Test log entry")
-                test_log_success = True
-            except Exception:
-                pass
+            # Verificar logging sem escrever registros a cada probe
+            test_log_success = (bool(self.logger.handlers) and
+                                self.logger.isEnabledFor(logging.DEBUG))
             
             # Testar auditoria
             test_audit_success = False
             try:
-                # Não salvar no banco, apenas testar criação do objeto
-                _ = AuditLog(
+                # Não salvar no banco, apenas montar a linha de auditoria
+                audit_row = self._audit_row(AuditEntry(
+                    timestamp=datetime.utcnow(),
                     user_id=0,
-                    action_type="TEST",
-                    resource_type="health_check",
-                    success=True
-                )
-                test_audit_success = True
+                    action_type=ActionType.READ,
+                    resource_type="health_check"
+                ))
+                test_audit_success = set(audit_row).issubset(
+                    AuditLog.__table__.columns.keys())
             except Exception:
                 pass
             
-            # Verificar tamanho dos logs
-            log_files_info = []
-            total_size = 0
+            # Verificar tamanho dos logs (uma única varredura)
+            total_size, log_files_info = (
+                self._collect_file_info() if logs_dir_exists else (0, []))
             
-            if logs_dir_exists:
-                for filename in os.listdir(self.logs_dir):
-                    file_path = os.path.join(self.logs_dir, filename)
-                    if os.path.isfile(file_path):
-                        file_size = os.path.getsize(file_path)
-                        total_size += file_size
-                        
-                        # Formatar data de modificação
-                        mtime = os.path.getmtime(file_path)
-                        modified_date = datetime.fromtimestamp(mtime)
-                        
-                        log_files_info.append({
-                            'filename': filename,
-                            'size_mb': round(file_size / (1024 * 1024), 2),
-                            'modified': modified_date.isoformat()
-                        })
-            
-            # Estatísticas recentes
-            stats = self.get_statistics()
+            # Estatísticas recentes (sem varrer o diretório novamente)
+            stats = self.get_statistics(include_files=False)
             
             # Determinar status
             status = "healthy"
@@ -702,18 +1246,232 @@ class LoggingService:
                     "max_file_size_mb": self.max_log_file_size / (1024 * 1024),
                     "max_files": self.max_log_files
                 },
-                "last_check": datetime.utcnow().isoformat()
+                "last_check": _now_iso()
             }
             
         except Exception as e:
             return {
                 "status": "unhealthy",
                 "error": str(e),
-                "last_check": datetime.utcnow().isoformat()
+                "last_check": _now_iso()
             }
     
     # Métodos privados auxiliares
     
+    def _collect_file_info(self):
+        """
+        Coletar tamanho total e informações dos arquivos de log
+        
+        Returns:
+            Tupla (tamanho total em bytes, lista de dicts por arquivo)
+        """
+        total_size = 0
+        files_info = []
+        
+        for filename, _, file_size, mtime in self._iter_log_files():
+            total_size += file_size
+            files_info.append({
+                'filename': filename,
+                'size_mb': round(file_size / (1024 * 1024), 2),
+                'modified': datetime.fromtimestamp(mtime).isoformat()
+            })
+        
+        return total_size, files_info
+    
+    def _iter_log_files(self):
+        """
+        Iterar arquivos do diretório de logs com uma única leitura
+        
+        Yields:
+            Tupla (nome, caminho, tamanho em bytes, mtime)
+        """
+        with os.scandir(self.logs_dir) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    yield entry.name, entry.path, stat.st_size, stat.st_mtime
+    
+    def _get_stats_redis(self):
+        """Obter cliente Redis do CacheService (None se indisponível)"""
+        from src.services.cache_service import cache_service
+        
+        if cache_service.redis_available:
+            return cache_service.redis_client
+        return None
+    
+    @staticmethod
+    def _audit_row(entry: AuditEntry) -> Dict[str, Any]:
+        """Converter entrada de auditoria em linha da tabela audit_logs"""
+        details = {
+            'resource_id': entry.resource_id,
+            'old_values': entry.old_values or {},
+            'new_values': entry.new_values or {},
+            'session_id': entry.session_id,
+            'success': entry.success,
+            'error_message': entry.error_message,
+            'metadata': entry.metadata or {}
+        }
+        return {
+            'user_id': entry.user_id,
+            'action': entry.action_type.value,
+            'resource': entry.resource_type,
+            'details': json.dumps(details, ensure_ascii=False, default=str),
+            'ip_address': entry.ip_address,
+            'user_agent': entry.user_agent,
+            'created_at': entry.timestamp
+        }
+    
+    def _increment_audit_counters(self, entries: List[AuditEntry]) -> None:
+        """Incrementar contadores de auditoria no Redis"""
+        redis_client = self._get_stats_redis()
+        if redis_client is None:
+            return
+        
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.incrby(AUDIT_TOTAL_KEY, len(entries))
+            for entry in entries:
+                pipe.hincrby(AUDIT_ACTION_COUNTS_KEY,
+                             entry.action_type.value, 1)
+                pipe.hincrby(AUDIT_USER_COUNTS_KEY,
+                             '' if entry.user_id is None
+                             else str(entry.user_id), 1)
+            pipe.execute()
+        except Exception:
+            pass
+    
+    def _read_audit_counters(self):
+        """
+        Ler contadores de auditoria do Redis
+        
+        Returns:
+            Tupla (total, por tipo de ação, por usuário) ou None se os
+            contadores não estiverem disponíveis/sincronizados
+        """
+        redis_client = self._get_stats_redis()
+        if redis_client is None:
+            return None
+        
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.exists(AUDIT_COUNTERS_READY_KEY)
+            pipe.get(AUDIT_TOTAL_KEY)
+            pipe.hgetall(AUDIT_ACTION_COUNTS_KEY)
+            pipe.hgetall(AUDIT_USER_COUNTS_KEY)
+            ready, total, actions, users = pipe.execute()
+        except Exception:
+            return None
+        
+        if not ready:
+            return None
+        
+        action_counts = {
+            action.decode(): int(count) for action, count in actions.items()
+        }
+        user_counts = {
+            (int(user) if user else None): int(count)
+            for user, count in users.items()
+        }
+        return int(total or 0), action_counts, user_counts
+    
+    def _compute_audit_counters(self):
+        """
+        Calcular contadores de auditoria no banco e sincronizar o Redis
+        
+        Returns:
+            Tupla (total, por tipo de ação, por usuário)
+        """
+        redis_client = self._get_stats_redis()
+        
+        total = AuditLog.query.count()
+        
+        action_counts = dict(db.session.query(
+            AuditLog.action,
+            db.func.count(AuditLog.id).label('count')
+        ).group_by(AuditLog.action).all())
+        
+        user_query = db.session.query(
+            AuditLog.user_id,
+            db.func.count(AuditLog.id).label('count')
+        ).group_by(AuditLog.user_id)
+        if redis_client is None:
+            # Sem Redis não há o que sincronizar: apenas top 10
+            user_query = user_query.order_by(
+                db.func.count(AuditLog.id).desc()
+            ).limit(10)
+        user_counts = dict(user_query.all())
+        
+        if redis_client is not None:
+            try:
+                pipe = redis_client.pipeline(transaction=True)
+                pipe.delete(AUDIT_ACTION_COUNTS_KEY, AUDIT_USER_COUNTS_KEY)
+                pipe.set(AUDIT_TOTAL_KEY, total)
+                if action_counts:
+                    pipe.hset(AUDIT_ACTION_COUNTS_KEY, mapping=action_counts)
+                if user_counts:
+                    pipe.hset(AUDIT_USER_COUNTS_KEY, mapping={
+                        '' if user is None else str(user): count
+                        for user, count in user_counts.items()
+                    })
+                pipe.set(AUDIT_COUNTERS_READY_KEY, 1,
+                         ex=self.audit_counters_ttl)
+                pipe.execute()
+            except Exception:
+                pass
+        
+        return total, action_counts, user_counts
+    
+    def _invalidate_audit_counters(self) -> None:
+        """Forçar recálculo dos contadores na próxima consulta"""
+        redis_client = self._get_stats_redis()
+        if redis_client is None:
+            return
+        
+        try:
+            redis_client.delete(AUDIT_COUNTERS_READY_KEY)
+        except Exception:
+            pass
+    
+    def _delete_old_audit_logs(self, cutoff_date: datetime) -> int:
+        """
+        Remover registros de auditoria anteriores à data de corte em lotes
+        
+        Args:
+            cutoff_date: Data de corte
+            
+        Returns:
+            Número de registros removidos
+        """
+        batch_ids = db.select(AuditLog.id).where(
+            AuditLog.created_at < cutoff_date
+        ).limit(self.cleanup_batch_size)
+        stmt = AuditLog.__table__.delete().where(AuditLog.id.in_(batch_ids))
+        
+        deleted = 0
+        while True:
+            result = db.session.execute(stmt)
+            db.session.commit()
+            
+            if result.rowcount <= 0:
+                break
+            
+            deleted += result.rowcount
+            if result.rowcount < self.cleanup_batch_size:
+                break
+            
+            time.sleep(self.cleanup_batch_pause)
+        
+        # Atualizar estatísticas do planner após remoção em massa
+        if deleted:
+            try:
+                db.session.execute(db.text(
+                    f'ANALYZE {AuditLog.__tablename__}'))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+        
+        return deleted
+    
     def _setup_logging(self) -> None:
         """Configurar sistema de logging com handlers seguros"""
         try:
@@ -729,10 +1487,13 @@ class LoggingService:
             # Garantir que diretório de logs existe
             os.makedirs(self.logs_dir, exist_ok=True)
             
-            # Handler para arquivo com rotação
+            # Handler para arquivo com rotação e escrita bufferizada
             log_file = os.path.join(self.logs_dir, 'polaris.log')
-            file_handler = logging.handlers.RotatingFileHandler(
+            file_handler = BufferedRotatingFileHandler(
                 log_file,
+                buffer_size=self.log_buffer_size,
+                flush_interval=self.log_flush_interval,
+                index=True,
                 maxBytes=self.max_log_file_size,
                 backupCount=self.max_log_files,
                 encoding='utf-8'
@@ -743,13 +1504,13 @@ class LoggingService:
             console_handler = logging.StreamHandler()
             console_handler.setLevel(logging.WARNING)
             
-            # Formatter estruturado
-            formatter = logging.Formatter(
-                '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                datefmt='%Y-%m-%d %H:%M:%S'
-            )
-            file_handler.setFormatter(formatter)
-            console_handler.setFormatter(formatter)
+            # Formatters: registros JSON vão crus para o arquivo
+            log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            date_format = '%Y-%m-%d %H:%M:%S'
+            file_handler.setFormatter(
+                RawBytesFormatter(log_format, datefmt=date_format))
+            console_handler.setFormatter(
+                ConsoleFormatter(log_format, datefmt=date_format))
             
             # Adicionar handlers
             logger.addHandler(file_handler)
@@ -784,54 +1545,57 @@ def log_action(action_type: ActionType, resource_type: str):
         resource_type: Tipo de recurso
     """
     def decorator(func):
+        # Valores fixos por função: calculados uma vez na decoração
+        service_name = (getattr(func, '__module__', None) or
+                        'unknown').rsplit('.', 1)[-1]
+        action_name = func.__name__
+        base_metadata = {
+            'action_type': action_type.value,
+            'resource_type': resource_type,
+            'function': action_name
+        }
+        success_message = f"Action completed: {action_type.value} {resource_type}"
+        failure_message = f"Action failed: {action_type.value} {resource_type}"
+        
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            start_time = datetime.utcnow()
-            service_name = func.__module__.split('.')[-1] if hasattr(func, '__module__') else 'unknown'
+            start_time = time.perf_counter()
             
             try:
                 # Executar função
                 result = func(*args, **kwargs)
                 
                 # Calcular duração
-                duration = (datetime.utcnow() - start_time).total_seconds() * 1000
+                duration = (time.perf_counter() - start_time) * 1000
                 
                 # Log de sucesso
                 logging_service.log(
                     level=LogLevel.INFO,
                     service=service_name,
-                    action=func.__name__,
-                    message=f"Action completed: {action_type.value} {resource_type}",
+                    action=action_name,
+                    message=success_message,
                     duration_ms=duration,
-                    metadata={
-                        'action_type': action_type.value,
-                        'resource_type': resource_type,
-                        'function': func.__name__
-                    }
+                    metadata=base_metadata
                 )
                 
                 return result
                 
             except Exception as e:
                 # Calcular duração
-                duration = (datetime.utcnow() - start_time).total_seconds() * 1000
+                duration = (time.perf_counter() - start_time) * 1000
                 
                 # Log de erro
                 logging_service.log(
                     level=LogLevel.ERROR,
                     service=service_name,
-                    action=func.__name__,
-                    message=f"Action failed: {action_type.value} {resource_type}",
+                    action=action_name,
+                    message=failure_message,
                     duration_ms=duration,
                     error_details={
                         'error': str(e),
-                        'traceback': traceback.format_exc()
+                        'exc_info': sys.exc_info()
                     },
-                    metadata={
-                        'action_type': action_type.value,
-                        'resource_type': resource_type,
-                        'function': func.__name__
-                    }
+                    metadata=base_metadata
                 )
                 
                 raise
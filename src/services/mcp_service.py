@@ -6,15 +6,86 @@ com fontes jurídicas dos EUA e Brasil, incluindo web scraping e indexação.
 """
 
 import os
+import re
 import json
-import requests
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
-from urllib.parse import urljoin, urlparse
+import math
+import heapq
+import random
 import time
+import asyncio
+import hashlib
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Callable, Tuple
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, asdict, field, replace
+from urllib.parse import urlparse
+
+import httpx
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    etree = None
+    lxml_html = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None
+
+_json_loads = orjson.loads if orjson else json.loads
 
 from src.models import db, FonteJuridica
+from src.services.process_pool import get_process_pool
+
+# Cache de contexto jurídico e de extração (LRU local + Redis)
+LOCAL_CACHE_SIZE = 512
+REDIS_CACHE_TTL = 3600  # 1 hora
+
+# Intervalo mínimo entre coletas de uma mesma fonte
+UPDATE_INTERVAL = timedelta(hours=24)
+
+# Headers enviados em todas as requisições de scraping
+SCRAPER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Leitura de respostas em streaming, com teto de tamanho do corpo
+STREAM_CHUNK_SIZE = 64 * 1024
+MAX_RESPONSE_BYTES = 2_000_000
+
+# Novas tentativas em falhas transitórias (backoff exponencial com jitter)
+RETRY_INITIAL_DELAY = 1.0
+RETRY_MAX_DELAY = 10.0
+
+# Páginas menores que isto são extraídas no próprio processo (IPC não compensa)
+PARSE_POOL_MIN_SIZE = 16 * 1024
+
+
+def _cache_key(prefix: str, *parts: str) -> str:
+    """Chave de cache estável para os parâmetros informados"""
+    digest = hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+    return f"mcp:{prefix}:{digest}"
 
 
 @dataclass
@@ -40,83 +111,399 @@ class MCPDocument:
     relevance_score: float = 0.0
 
 
+@dataclass(frozen=True, slots=True)
+class SourceConfig:
+    """Configuração estática de uma fonte jurídica"""
+    country: str
+    key: str
+    name: str
+    base_url: str
+    endpoints: Tuple[str, ...]
+    category: str
+    urls: Tuple[str, ...] = field(init=False)
+    
+    def __post_init__(self):
+        # URLs absolutas resolvidas uma vez; os endpoints são relativos ao
+        # caminho de base_url (ex: https://www.gov.br/cvm + /pt-br/...)
+        base = self.base_url.rstrip('/')
+        object.__setattr__(self, 'urls', tuple(base + endpoint for endpoint in self.endpoints))
+    
+    @property
+    def source_key(self) -> str:
+        """Identificador completo da fonte (ex: 'usa_irs')"""
+        return f"{self.country}_{self.key}"
+
+
+# Fontes jurídicas configuradas (EUA e Brasil)
+SOURCES: Tuple[SourceConfig, ...] = (
+    SourceConfig(
+        country='usa',
+        key='irs',
+        name='IRS - Internal Revenue Service',
+        base_url='https://www.irs.gov',
+        endpoints=(
+            '/businesses/international-businesses',
+            '/individuals/international-taxpayers',
+            '/tax-professionals/international-tax-compliance'
+        ),
+        category='international_tax'
+    ),
+    SourceConfig(
+        country='usa',
+        key='sec',
+        name='SEC - Securities and Exchange Commission',
+        base_url='https://www.sec.gov',
+        endpoints=(
+            '/investment/investment-adviser-regulation',
+            '/rules/final',
+            '/divisions/investment'
+        ),
+        category='investment_regulation'
+    ),
+    SourceConfig(
+        country='usa',
+        key='treasury',
+        name='US Treasury Department',
+        base_url='https://home.treasury.gov',
+        endpoints=(
+            '/policy-issues/international',
+            '/policy-issues/tax-policy'
+        ),
+        category='international_tax'
+    ),
+    SourceConfig(
+        country='brazil',
+        key='receita_federal',
+        name='Receita Federal do Brasil',
+        base_url='https://www.gov.br/receitafederal',
+        endpoints=(
+            '/pt-br/assuntos/orientacao-tributaria/acordos-internacionais',
+            '/pt-br/assuntos/orientacao-tributaria/legislacao',
+            '/pt-br/assuntos/orientacao-tributaria/regimes-aduaneiros-especiais'
+        ),
+        category='tax_compliance'
+    ),
+    SourceConfig(
+        country='brazil',
+        key='cvm',
+        name='Comissão de Valores Mobiliários',
+        base_url='https://www.gov.br/cvm',
+        endpoints=(
+            '/pt-br/assuntos/regulacao',
+            '/pt-br/assuntos/orientacoes',
+            '/pt-br/assuntos/normas'
+        ),
+        category='investment_regulation'
+    ),
+    SourceConfig(
+        country='brazil',
+        key='bacen',
+        name='Banco Central do Brasil',
+        base_url='https://www.bcb.gov.br',
+        endpoints=(
+            '/estabilidadefinanceira/regulacao',
+            '/acessoinformacao/legis',
+            '/pre/normativos'
+        ),
+        category='financial_regulation'
+    ),
+)
+
+
+def _queued_logger(name: str) -> logging.Logger:
+    """Logger cujos registros são emitidos por uma thread de fundo (QueueListener)"""
+    logger = logging.getLogger(name)
+    if any(isinstance(h, logging.handlers.QueueHandler) for h in logger.handlers):
+        return logger
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('[%(levelname)s] %(name)s: %(message)s'))
+    
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.propagate = False
+    return logger
+
+
+def _is_transient(error: Exception) -> bool:
+    """Falhas de rede e respostas 5xx merecem nova tentativa; 4xx não"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> List[str]:
+    """Quebrar texto em termos minúsculos para indexação"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+# Declaração <?xml ...?> no início de páginas XHTML
+_XML_DECLARATION_RE = re.compile(r'^[\s\ufeff]*<\?xml[^>]*\?>')
+
+
+def _parse_markup(markup: str) -> Optional[Dict]:
+    """Extrair título e parágrafos principais de uma página HTML com lxml
+    
+    Retorna None quando não há documento a extrair, para que
+    ``_extract_content`` caia no resumo padrão da fonte.
+    """
+    if lxml_html is None or not markup.strip():
+        return None
+    
+    # O texto já está decodificado: a declaração XML (XHTML) com encoding
+    # faria o lxml rejeitar a string
+    markup = _XML_DECLARATION_RE.sub('', markup, count=1)
+    try:
+        tree = lxml_html.fromstring(markup)
+    except (ValueError, etree.ParserError):
+        # Documento vazio (ex.: apenas comentários) ou não parseável
+        return None
+    
+    title = (tree.findtext('.//title') or '').strip()
+    if not title:
+        heading = tree.find('.//h1')
+        title = heading.text_content().strip() if heading is not None else ''
+    
+    paragraphs = tree.xpath('//main//p | //article//p') or tree.xpath('//p')
+    content = ' '.join(
+        text for text in (p.text_content().strip() for p in paragraphs) if text
+    )
+    return {'title': title, 'content': content}
+
+
+def _parse_json_payload(payload: str) -> Optional[Dict]:
+    """Extrair título e conteúdo de endpoints que respondem JSON"""
+    data = _json_loads(payload)
+    if not isinstance(data, dict):
+        return None
+    
+    title = data.get('title') or data.get('name') or ''
+    content = data.get('content') or data.get('description') or data.get('body') or ''
+    return {'title': str(title), 'content': str(content)}
+
+
+# Resumo padrão por (host, primeira seção do caminho); '' vale para o host inteiro
+_DEFAULT_SUMMARIES: Dict[Tuple[str, str], Dict[str, str]] = {
+    ('www.irs.gov', ''): {
+        'title': 'IRS International Tax Guidance',
+        'content': 'Guidelines for international tax compliance, offshore structures, and reporting requirements for US taxpayers with foreign assets.'
+    },
+    ('www.gov.br', 'receitafederal'): {
+        'title': 'Orientações Tributárias - Receita Federal',
+        'content': 'Orientações sobre tributação internacional, acordos para evitar dupla tributação e compliance fiscal para residentes brasileiros.'
+    },
+    ('www.sec.gov', ''): {
+        'title': 'SEC Investment Adviser Regulations',
+        'content': 'Regulations and guidance for investment advisers, including international compliance requirements.'
+    },
+    ('www.gov.br', 'cvm'): {
+        'title': 'Regulamentação CVM',
+        'content': 'Normas e orientações da CVM sobre mercado de capitais, fundos de investimento e estruturas internacionais.'
+    }
+}
+
+
+@lru_cache(maxsize=1024)
+def _url_route(url: str) -> Tuple[str, str]:
+    """Host e primeira seção do caminho de uma URL (memoizado)"""
+    parsed = urlparse(url)
+    return parsed.netloc, parsed.path.lstrip('/').split('/', 1)[0]
+
+
+def _extract_content(markup: str, url: str, content_type: str = 'text/html') -> Optional[Dict]:
+    """Extrair título e conteúdo de uma resposta (executável no pool de processos)"""
+    if 'json' in content_type:
+        parsed = _parse_json_payload(markup)
+    else:
+        parsed = _parse_markup(markup)
+    
+    if parsed and parsed['content']:
+        parsed['title'] = parsed['title'] or 'Untitled'
+        return parsed
+    
+    # Sem texto extraível: resumo padrão da fonte, detectada pela URL
+    host, section = _url_route(url)
+    summary = _DEFAULT_SUMMARIES.get((host, section)) or _DEFAULT_SUMMARIES.get((host, ''))
+    if summary:
+        return dict(summary)
+    
+    return {
+        'title': f'Legal Document from {host}',
+        'content': 'Legal guidance and regulatory information relevant to wealth planning and international tax compliance.'
+    }
+
+
+class BM25Index:
+    """Índice BM25F em memória com pesos por campo (título e corpo)
+    
+    Os pesos BM25 de cada par (documento, termo) são pré-calculados; com
+    NumPy/SciPy disponíveis ficam em uma matriz esparsa e a pontuação de uma
+    consulta é uma soma de colunas vetorizada.
+    """
+    
+    def __init__(self, documents: List[Tuple[str, str]], k1: float = 1.5,
+                 b: float = 0.75, title_weight: float = 5.0, body_weight: float = 1.0):
+        self.k1 = k1
+        self.b = b
+        term_freqs: List[Dict[str, float]] = []
+        doc_lengths: List[float] = []
+        doc_freqs: Dict[str, int] = defaultdict(int)
+        
+        for title, body in documents:
+            freqs: Dict[str, float] = defaultdict(float)
+            title_tokens = _tokenize(title)
+            body_tokens = _tokenize(body)
+            for token in title_tokens:
+                freqs[token] += title_weight
+            for token in body_tokens:
+                freqs[token] += body_weight
+            
+            term_freqs.append(freqs)
+            doc_lengths.append(title_weight * len(title_tokens) + body_weight * len(body_tokens))
+            for token in freqs:
+                doc_freqs[token] += 1
+        
+        total = len(documents)
+        avg_length = (sum(doc_lengths) / total) if total else 0.0
+        avg_length = avg_length or 1.0
+        self.idf = {
+            token: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for token, df in doc_freqs.items()
+        }
+        
+        self.weights: List[Dict[str, float]] = []
+        for freqs, length in zip(term_freqs, doc_lengths):
+            norm = k1 * (1 - b + b * length / avg_length)
+            self.weights.append({
+                token: self.idf[token] * tf * (k1 + 1) / (tf + norm)
+                for token, tf in freqs.items()
+            })
+        
+        self.size = total
+        self._vocab: Dict[str, int] = {}
+        self._matrix = None
+        if np is not None and sparse is not None and total:
+            self._vocab = {token: i for i, token in enumerate(doc_freqs)}
+            rows, cols, data = [], [], []
+            for doc_id, weights in enumerate(self.weights):
+                for token, weight in weights.items():
+                    rows.append(doc_id)
+                    cols.append(self._vocab[token])
+                    data.append(weight)
+            self._matrix = sparse.csc_matrix(
+                (data, (rows, cols)), shape=(total, len(self._vocab)), dtype=np.float64
+            )
+    
+    def get_scores(self, query_tokens: List[str]) -> List[float]:
+        """Pontuar todos os documentos para os termos da consulta"""
+        terms = {token for token in query_tokens if token in self.idf}
+        
+        if self._matrix is not None:
+            if not terms:
+                return np.zeros(self.size)
+            columns = [self._vocab[token] for token in terms]
+            return np.asarray(self._matrix[:, columns].sum(axis=1)).ravel()
+        
+        return [
+            sum(weights.get(token, 0.0) for token in terms)
+            for weights in self.weights
+        ]
+    
+    def top(self, query_tokens: List[str], k: int) -> List[Tuple[int, float]]:
+        """Os k documentos de maior pontuação (> 0), em ordem decrescente"""
+        scores = self.get_scores(query_tokens)
+        
+        if self._matrix is None:
+            return heapq.nlargest(
+                k,
+                ((i, score) for i, score in enumerate(scores) if score > 0),
+                key=lambda item: item[1]
+            )
+        
+        candidates = np.argpartition(-scores, k)[:k] if k < len(scores) else np.arange(len(scores))
+        ranked = sorted(
+            ((int(i), float(scores[i])) for i in candidates if scores[i] > 0),
+            key=lambda item: item[1],
+            reverse=True
+        )
+        return ranked
+
+
+class RateLimiter:
+    """Token bucket assíncrono para limitar requisições por segundo"""
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Aguardar até haver um token disponível"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                wait_time = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait_time)
+
+
+class HostThrottle:
+    """Concorrência e taxa de requisições controladas por host"""
+    
+    def __init__(self, max_concurrency: int, request_delay: float):
+        self._sems: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(max_concurrency)
+        )
+        self._limiters: Dict[str, Optional[RateLimiter]] = defaultdict(
+            lambda: RateLimiter(1 / request_delay) if request_delay > 0 else None
+        )
+    
+    def semaphore(self, host: str) -> asyncio.Semaphore:
+        return self._sems[host]
+    
+    def limiter(self, host: str) -> Optional[RateLimiter]:
+        return self._limiters[host]
+
+
 class MCPService:
     """Service para Model Context Protocol"""
     
     def __init__(self):
-        self.sources_config = {
-            'usa': {
-                'irs': {
-                    'name': 'IRS - Internal Revenue Service',
-                    'base_url': 'https://www.irs.gov',
-                    'endpoints': [
-                        '/businesses/international-businesses',
-                        '/individuals/international-taxpayers',
-                        '/tax-professionals/international-tax-compliance'
-                    ],
-                    'category': 'international_tax'
-                },
-                'sec': {
-                    'name': 'SEC - Securities and Exchange Commission',
-                    'base_url': 'https://www.sec.gov',
-                    'endpoints': [
-                        '/investment/investment-adviser-regulation',
-                        '/rules/final',
-                        '/divisions/investment'
-                    ],
-                    'category': 'investment_regulation'
-                },
-                'treasury': {
-                    'name': 'US Treasury Department',
-                    'base_url': 'https://home.treasury.gov',
-                    'endpoints': [
-                        '/policy-issues/international',
-                        '/policy-issues/tax-policy'
-                    ],
-                    'category': 'international_tax'
-                }
-            },
-            'brazil': {
-                'receita_federal': {
-                    'name': 'Receita Federal do Brasil',
-                    'base_url': 'https://www.gov.br/receitafederal',
-                    'endpoints': [
-                        '/pt-br/assuntos/orientacao-tributaria/acordos-internacionais',
-                        '/pt-br/assuntos/orientacao-tributaria/legislacao',
-                        '/pt-br/assuntos/orientacao-tributaria/regimes-aduaneiros-especiais'
-                    ],
-                    'category': 'tax_compliance'
-                },
-                'cvm': {
-                    'name': 'Comissão de Valores Mobiliários',
-                    'base_url': 'https://www.gov.br/cvm',
-                    'endpoints': [
-                        '/pt-br/assuntos/regulacao',
-                        '/pt-br/assuntos/orientacoes',
-                        '/pt-br/assuntos/normas'
-                    ],
-                    'category': 'investment_regulation'
-                },
-                'bacen': {
-                    'name': 'Banco Central do Brasil',
-                    'base_url': 'https://www.bcb.gov.br',
-                    'endpoints': [
-                        '/estabilidadefinanceira/regulacao',
-                        '/acessoinformacao/legis',
-                        '/pre/normativos'
-                    ],
-                    'category': 'financial_regulation'
-                }
-            }
+        self.logger = _queued_logger(self.__class__.__name__)
+        
+        # Índice plano 'pais_fonte' -> configuração, resolvido uma única vez
+        self._source_index: Dict[str, SourceConfig] = {
+            source.source_key: source for source in SOURCES
         }
         
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self._corpus: Optional[List[MCPDocument]] = None
+        self._bm25: Optional[BM25Index] = None
         
-        self.request_delay = 2  # Segundos entre requisições
+        # Prazo (time.monotonic) até o qual cada fonte dispensa nova coleta
+        self._fresh_until: Dict[str, float] = {}
+        
+        self._local_cache: OrderedDict = OrderedDict()
+        self._local_cache_lock = threading.Lock()
+        
+        self.request_delay = 2  # Intervalo mínimo entre requisições ao mesmo host
         self.timeout = 30
+        self.max_retries = 3
+        self.max_concurrency_per_host = 5  # Requisições simultâneas por host
     
     def scrape_all_sources(self, force_update: bool = False) -> Dict[str, ScrapingResult]:
         """
@@ -128,29 +515,7 @@ class MCPService:
         Returns:
             Dict com resultados por fonte
         """
-        results = {}
-        
-        for country, sources in self.sources_config.items():
-            for source_key, source_config in sources.items():
-                try:
-                    # Verificar se precisa atualizar
-                    if not force_update and not self._needs_update(source_key):
-                        continue
-                    
-                    result = self._scrape_source(source_key, source_config)
-                    results[f"{country}_{source_key}"] = result
-                    
-                    # Delay entre fontes
-                    time.sleep(self.request_delay)
-                    
-                except Exception as e:
-                    results[f"{country}_{source_key}"] = ScrapingResult(
-                        success=False,
-                        source_name=source_config['name'],
-                        error=str(e)
-                    )
-        
-        return results
+        return asyncio.run(self._ascrape_all_sources(force_update))
     
     def scrape_source(self, source_key: str, force_update: bool = False) -> ScrapingResult:
         """
@@ -165,14 +530,7 @@ class MCPService:
         """
         try:
             # Encontrar configuração da fonte
-            source_config = None
-            for country, sources in self.sources_config.items():
-                for key, config in sources.items():
-                    if f"{country}_{key}" == source_key:
-                        source_config = config
-                        break
-                if source_config:
-                    break
+            source_config = self._source_index.get(source_key)
             
             if not source_config:
                 return ScrapingResult(
@@ -185,7 +543,7 @@ class MCPService:
             if not force_update and not self._needs_update(source_key):
                 return ScrapingResult(
                     success=True,
-                    source_name=source_config['name'],
+                    source_name=source_config.name,
                     documents_found=0,
                     content=[],
                     error="Fonte já atualizada recentemente"
@@ -212,44 +570,14 @@ class MCPService:
             Lista de documentos relevantes
         """
         try:
-            # Buscar documentos relevantes no banco
-            # Por enquanto, simulação com dados estáticos
-            mock_documents = [
-                MCPDocument(
-                    title="International Tax Compliance Guidelines",
-                    content="Guidelines for international tax compliance including offshore structures...",
-                    source="IRS",
-                    url="https://www.irs.gov/businesses/international-businesses",
-                    category="international_tax",
-                    metadata={"country": "USA", "type": "guideline"},
-                    relevance_score=0.95
-                ),
-                MCPDocument(
-                    title="Acordos Internacionais - Receita Federal",
-                    content="Informações sobre acordos internacionais para evitar dupla tributação...",
-                    source="Receita Federal",
-                    url="https://www.gov.br/receitafederal/pt-br/assuntos/orientacao-tributaria/acordos-internacionais",
-                    category="tax_compliance",
-                    metadata={"country": "Brazil", "type": "regulation"},
-                    relevance_score=0.88
-                ),
-                MCPDocument(
-                    title="Trust Structures and Tax Implications",
-                    content="Analysis of trust structures for wealth planning and tax optimization...",
-                    source="Treasury Department",
-                    url="https://home.treasury.gov/policy-issues/tax-policy",
-                    category="wealth_planning",
-                    metadata={"country": "USA", "type": "analysis"},
-                    relevance_score=0.82
-                )
-            ]
-            
-            # Filtrar por relevância e limitar resultados
-            relevant_docs = [doc for doc in mock_documents if doc.relevance_score > 0.7]
-            return relevant_docs[:max_results]
+            key = _cache_key('ctx', query, str(max_results))
+            cached = self._cached(key, lambda: [
+                asdict(doc) for doc in self._build_legal_context(query, max_results)
+            ])
+            return [MCPDocument(**doc) for doc in cached]
             
         except Exception as e:
-            self._log_error(f"Erro ao obter contexto jurídico: {str(e)}")
+            self.logger.exception("Erro ao obter contexto jurídico: %s", e)
             return []
     
     def get_source_status(self) -> Dict[str, Any]:
@@ -261,37 +589,33 @@ class MCPService:
         """
         try:
             status = {}
+            fontes = self._load_fontes()
             
-            for country, sources in self.sources_config.items():
-                status[country] = {}
+            for full_key, source_config in self._source_index.items():
+                country_status = status.setdefault(source_config.country, {})
+                fonte = fontes.get(full_key)
                 
-                for source_key, source_config in sources.items():
-                    # Buscar última atualização no banco
-                    fonte = FonteJuridica.query.filter_by(
-                        source_key=f"{country}_{source_key}"
-                    ).first()
-                    
-                    if fonte:
-                        status[country][source_key] = {
-                            'name': source_config['name'],
-                            'status': 'active' if fonte.active else 'inactive',
-                            'last_update': fonte.last_scraped.isoformat() if fonte.last_scraped else None,
-                            'documents_count': fonte.documents_count or 0,
-                            'category': source_config['category']
-                        }
-                    else:
-                        status[country][source_key] = {
-                            'name': source_config['name'],
-                            'status': 'not_initialized',
-                            'last_update': None,
-                            'documents_count': 0,
-                            'category': source_config['category']
-                        }
+                if fonte:
+                    country_status[source_config.key] = {
+                        'name': source_config.name,
+                        'status': 'active' if fonte.active else 'inactive',
+                        'last_update': fonte.last_scraped.isoformat() if fonte.last_scraped else None,
+                        'documents_count': fonte.documents_count or 0,
+                        'category': source_config.category
+                    }
+                else:
+                    country_status[source_config.key] = {
+                        'name': source_config.name,
+                        'status': 'not_initialized',
+                        'last_update': None,
+                        'documents_count': 0,
+                        'category': source_config.category
+                    }
             
             return status
             
         except Exception as e:
-            self._log_error(f"Erro ao obter status das fontes: {str(e)}")
+            self.logger.exception("Erro ao obter status das fontes: %s", e)
             return {}
     
     def update_source_config(self, source_key: str, config: Dict) -> bool:
@@ -333,7 +657,7 @@ class MCPService:
             
         except Exception as e:
             db.session.rollback()
-            self._log_error(f"Erro ao atualizar configuração: {str(e)}")
+            self.logger.exception("Erro ao atualizar configuração: %s", e)
             return False
     
     def get_categories_stats(self) -> Dict[str, Any]:
@@ -346,29 +670,26 @@ class MCPService:
         try:
             # Contar documentos por categoria
             categories = {}
+            fontes = self._load_fontes()
             
-            for country, sources in self.sources_config.items():
-                for source_key, source_config in sources.items():
-                    category = source_config['category']
-                    
-                    if category not in categories:
-                        categories[category] = {
-                            'name': category.replace('_', ' ').title(),
-                            'sources': 0,
-                            'documents': 0,
-                            'countries': set()
-                        }
-                    
-                    categories[category]['sources'] += 1
-                    categories[category]['countries'].add(country.upper())
-                    
-                    # Buscar contagem de documentos
-                    fonte = FonteJuridica.query.filter_by(
-                        source_key=f"{country}_{source_key}"
-                    ).first()
-                    
-                    if fonte and fonte.documents_count:
-                        categories[category]['documents'] += fonte.documents_count
+            for full_key, source_config in self._source_index.items():
+                category = source_config.category
+                
+                if category not in categories:
+                    categories[category] = {
+                        'name': category.replace('_', ' ').title(),
+                        'sources': 0,
+                        'documents': 0,
+                        'countries': set()
+                    }
+                
+                categories[category]['sources'] += 1
+                categories[category]['countries'].add(source_config.country.upper())
+                
+                # Contagem de documentos (carregada em lote)
+                fonte = fontes.get(full_key)
+                if fonte and fonte.documents_count:
+                    categories[category]['documents'] += fonte.documents_count
             
             # Converter sets para listas
             for category in categories.values():
@@ -377,7 +698,7 @@ class MCPService:
             return categories
             
         except Exception as e:
-            self._log_error(f"Erro nas estatísticas: {str(e)}")
+            self.logger.exception("Erro nas estatísticas: %s", e)
             return {}
     
     def health_check(self) -> Dict[str, Any]:
@@ -388,41 +709,21 @@ class MCPService:
             Dict com status do sistema
         """
         try:
-            # Testar conectividade com algumas fontes
-            connectivity_tests = {}
-            
-            test_sources = [
-                ('usa', 'irs'),
-                ('brazil', 'receita_federal')
-            ]
-            
-            for country, source_key in test_sources:
-                source_config = self.sources_config[country][source_key]
-                
-                try:
-                    response = self.session.head(
-                        source_config['base_url'],
-                        timeout=10
-                    )
-                    connectivity_tests[f"{country}_{source_key}"] = {
-                        'status': 'reachable' if response.status_code < 400 else 'unreachable',
-                        'response_code': response.status_code,
-                        'response_time': response.elapsed.total_seconds()
-                    }
-                except Exception as e:
-                    connectivity_tests[f"{country}_{source_key}"] = {
-                        'status': 'unreachable',
-                        'error': str(e)
-                    }
+            # Testar conectividade com algumas fontes (em paralelo)
+            test_sources = ['usa_irs', 'brazil_receita_federal']
+            connectivity_tests = asyncio.run(self._aprobe_sources(test_sources))
             
             # Estatísticas do banco
-            total_sources = FonteJuridica.query.count()
-            active_sources = FonteJuridica.query.filter_by(active=True).count()
+            total_sources, active_sources = db.session.query(
+                db.func.count(FonteJuridica.id),
+                db.func.sum(db.case((FonteJuridica.active, 1), else_=0))
+            ).one()
+            active_sources = active_sources or 0
             
             return {
                 "status": "healthy" if active_sources > 0 else "warning",
                 "sources": {
-                    "total_configured": sum(len(sources) for sources in self.sources_config.values()),
+                    "total_configured": len(self._source_index),
                     "total_in_db": total_sources,
                     "active": active_sources
                 },
@@ -430,7 +731,8 @@ class MCPService:
                 "config": {
                     "request_delay": self.request_delay,
                     "timeout": self.timeout,
-                    "countries": list(self.sources_config.keys())
+                    "max_retries": self.max_retries,
+                    "countries": list(dict.fromkeys(source.country for source in SOURCES))
                 },
                 "last_check": datetime.utcnow().isoformat()
             }
@@ -444,124 +746,454 @@ class MCPService:
     
     # Métodos privados auxiliares
     
-    def _scrape_source(self, source_key: str, source_config: Dict) -> ScrapingResult:
+    def _scrape_source(self, source_key: str, source_config: SourceConfig) -> ScrapingResult:
         """Fazer scraping de uma fonte específica"""
+        return asyncio.run(self._ascrape_single_source(source_key, source_config))
+    
+    def _async_client(self) -> httpx.AsyncClient:
+        """Criar cliente HTTP assíncrono com os headers de scraping"""
+        return httpx.AsyncClient(
+            headers=SCRAPER_HEADERS,
+            timeout=self.timeout,
+            follow_redirects=True,
+            http2=h2 is not None,  # HTTP/2 multiplexa os endpoints de um host
+            limits=httpx.Limits(
+                max_keepalive_connections=32,
+                max_connections=64,
+                keepalive_expiry=60
+            )
+        )
+    
+    async def _ascrape_all_sources(self, force_update: bool) -> Dict[str, ScrapingResult]:
+        """Executar o scraping de todas as fontes concorrentemente"""
+        pending = [
+            (source_key, source_config)
+            for source_key, source_config in self._source_index.items()
+            # Verificar se precisa atualizar
+            if force_update or self._needs_update(source_key)
+        ]
+        
+        if not pending:
+            return {}
+        
+        previous = self._load_previous_documents([source_key for source_key, _ in pending])
+        throttle = self._host_throttle()
+        async with self._async_client() as client:
+            outcomes = await asyncio.gather(
+                *[
+                    self._ascrape_source(client, throttle, source_key, source_config, previous)
+                    for source_key, source_config in pending
+                ],
+                return_exceptions=True
+            )
+        
+        results = {}
+        for (source_key, source_config), outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                outcome = ScrapingResult(
+                    success=False,
+                    source_name=source_config.name,
+                    error=str(outcome)
+                )
+            results[source_key] = outcome
+        
+        # Salvar no banco de dados, em uma única transação
+        self._save_scraped_batch([
+            (source_key, source_config, results[source_key])
+            for source_key, source_config in pending
+            if results[source_key].success
+        ])
+        
+        return results
+    
+    async def _ascrape_single_source(self, source_key: str, source_config: SourceConfig) -> ScrapingResult:
+        """Executar o scraping de uma única fonte com cliente próprio"""
+        previous = self._load_previous_documents([source_key])
+        async with self._async_client() as client:
+            result = await self._ascrape_source(
+                client, self._host_throttle(), source_key, source_config, previous
+            )
+        
+        if result.success:
+            self._save_scraped_batch([(source_key, source_config, result)])
+        return result
+    
+    async def _aprobe_sources(self, source_keys: List[str]) -> Dict[str, Dict]:
+        """Testar conectividade das fontes com requisições HEAD simultâneas"""
+        async def probe(client: httpx.AsyncClient, source_key: str) -> Dict:
+            start = time.perf_counter()
+            try:
+                response = await client.head(self._source_index[source_key].base_url, timeout=10)
+                return {
+                    'status': 'reachable' if response.status_code < 400 else 'unreachable',
+                    'response_code': response.status_code,
+                    'response_time': time.perf_counter() - start
+                }
+            except Exception as e:
+                return {
+                    'status': 'unreachable',
+                    'error': str(e)
+                }
+        
+        async with self._async_client() as client:
+            results = await asyncio.gather(*[probe(client, key) for key in source_keys])
+        
+        return dict(zip(source_keys, results))
+    
+    def _host_throttle(self) -> HostThrottle:
+        """Criar controle de taxa por host para uma execução do event loop"""
+        return HostThrottle(self.max_concurrency_per_host, self.request_delay)
+    
+    async def _afetch(self, client: httpx.AsyncClient, throttle: HostThrottle,
+                      url: str, previous: Optional[Dict] = None
+                      ) -> Optional[Tuple[httpx.Response, str]]:
+        """Baixar uma URL (GET condicional se houver coleta anterior) com corpo limitado
+        
+        Falhas transitórias (timeout, conexão, 5xx) são repetidas com backoff
+        exponencial; 4xx não. Retorna (resposta, texto) ou None em caso de falha.
+        """
+        headers = {}
+        if previous:
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+        
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return await self._afetch_once(client, throttle, url, headers)
+            except httpx.HTTPError as e:
+                if attempt == self.max_retries or not _is_transient(e):
+                    self.logger.error("Erro ao acessar %s: %s", url, e)
+                    return None
+                
+                delay = min(RETRY_MAX_DELAY, RETRY_INITIAL_DELAY * 2 ** (attempt - 1))
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+        
+        return None
+    
+    async def _afetch_once(self, client: httpx.AsyncClient, throttle: HostThrottle,
+                           url: str, headers: Dict[str, str]) -> Tuple[httpx.Response, str]:
+        """Uma tentativa de download, respeitando os limites do host"""
+        host, _ = _url_route(url)
+        
+        async with throttle.semaphore(host):
+            limiter = throttle.limiter(host)
+            if limiter:
+                await limiter.acquire()
+            
+            async with client.stream('GET', url, headers=headers, timeout=self.timeout) as response:
+                if response.status_code == 304:
+                    return response, ''
+                response.raise_for_status()
+                
+                body = bytearray()
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                    body.extend(chunk)
+                    if len(body) >= MAX_RESPONSE_BYTES:
+                        del body[MAX_RESPONSE_BYTES:]
+                        break
+        
         try:
+            return response, body.decode(response.charset_encoding or 'utf-8', errors='replace')
+        except LookupError:
+            # Charset desconhecido no Content-Type: decodificar como UTF-8
+            return response, body.decode('utf-8', errors='replace')
+    
+    async def _ascrape_source(self, client: httpx.AsyncClient, throttle: HostThrottle,
+                              source_key: str, source_config: SourceConfig,
+                              previous: Optional[Dict[str, Dict]] = None) -> ScrapingResult:
+        """Fazer scraping dos endpoints de uma fonte em paralelo"""
+        try:
+            # Um único timestamp para todos os documentos desta coleta
+            now = datetime.utcnow()
+            now_iso = now.isoformat()
+            previous = previous or {}
+            urls = source_config.urls
+            
+            responses = await asyncio.gather(
+                *[self._afetch(client, throttle, url, previous.get(url)) for url in urls]
+            )
+            
             documents = []
-            base_url = source_config['base_url']
-            
-            for endpoint in source_config['endpoints']:
-                try:
-                    url = urljoin(base_url, endpoint)
-                    
-                    response = self.session.get(url, timeout=self.timeout)
-                    response.raise_for_status()
-                    
-                    # Extrair conteúdo (simulação)
-                    content = self._extract_content_from_html(response.text, url)
-                    
-                    if content:
-                        documents.append({
-                            'title': content.get('title', 'Untitled'),
-                            'content': content.get('content', ''),
-                            'url': url,
-                            'category': source_config['category'],
-                            'scraped_at': datetime.utcnow().isoformat()
-                        })
-                    
-                    # Delay entre requisições
-                    time.sleep(self.request_delay)
-                    
-                except requests.exceptions.RequestException as e:
-                    self._log_error(f"Erro ao acessar {url}: {str(e)}")
+            for url, fetched in zip(urls, responses):
+                if fetched is None:
                     continue
-            
-            # Salvar no banco de dados
-            self._save_scraped_data(source_key, source_config, documents)
+                response, text = fetched
+                
+                # 304 Not Modified: reaproveitar o documento da coleta anterior
+                if response.status_code == 304:
+                    if url in previous:
+                        documents.append(previous[url])
+                    continue
+                
+                # Extrair conteúdo
+                content = await self._aextract_content(
+                    text, url, response.headers.get('content-type', 'text/html')
+                )
+                
+                if content:
+                    documents.append({
+                        'title': content.get('title', 'Untitled'),
+                        'content': content.get('content', ''),
+                        'url': url,
+                        'category': source_config.category,
+                        'scraped_at': now_iso,
+                        'etag': response.headers.get('etag'),
+                        'last_modified': response.headers.get('last-modified')
+                    })
             
             return ScrapingResult(
                 success=True,
-                source_name=source_config['name'],
+                source_name=source_config.name,
                 documents_found=len(documents),
                 content=documents,
-                last_updated=datetime.utcnow()
+                last_updated=now
             )
             
         except Exception as e:
             return ScrapingResult(
                 success=False,
-                source_name=source_config['name'],
+                source_name=source_config.name,
                 error=str(e)
             )
     
-    def _extract_content_from_html(self, html: str, url: str) -> Optional[Dict]:
+    def _build_legal_context(self, query: str, max_results: int) -> List[MCPDocument]:
+        """Ranquear documentos do corpus para a consulta via BM25 (sem cache)"""
+        if self._bm25 is None:
+            self._corpus = self._load_corpus()
+            self._bm25 = BM25Index([(doc.title, doc.content) for doc in self._corpus])
+        
+        top = self._bm25.top(_tokenize(query), max_results)
+        if not top:
+            return []
+        
+        best = top[0][1]
+        return [
+            replace(self._corpus[i], relevance_score=round(score / best, 4))
+            for i, score in top
+        ]
+    
+    def _load_corpus(self) -> List[MCPDocument]:
+        """Carregar corpus de documentos jurídicos indexados"""
+        # Por enquanto, simulação com dados estáticos
+        return [
+            MCPDocument(
+                title="International Tax Compliance Guidelines",
+                content="Guidelines for international tax compliance including offshore structures...",
+                source="IRS",
+                url="https://www.irs.gov/businesses/international-businesses",
+                category="international_tax",
+                metadata={"country": "USA", "type": "guideline"}
+            ),
+            MCPDocument(
+                title="Acordos Internacionais - Receita Federal",
+                content="Informações sobre acordos internacionais para evitar dupla tributação...",
+                source="Receita Federal",
+                url="https://www.gov.br/receitafederal/pt-br/assuntos/orientacao-tributaria/acordos-internacionais",
+                category="tax_compliance",
+                metadata={"country": "Brazil", "type": "regulation"}
+            ),
+            MCPDocument(
+                title="Trust Structures and Tax Implications",
+                content="Analysis of trust structures for wealth planning and tax optimization...",
+                source="Treasury Department",
+                url="https://home.treasury.gov/policy-issues/tax-policy",
+                category="wealth_planning",
+                metadata={"country": "USA", "type": "analysis"}
+            )
+        ]
+    
+    def _cached(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Cache-aside em dois níveis: LRU em memória e depois Redis"""
+        value = self._cache_get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self._cache_put(key, value)
+        return value
+    
+    def _cache_get(self, key: str) -> Any:
+        """Buscar valor no LRU local e, em seguida, no Redis"""
+        with self._local_cache_lock:
+            if key in self._local_cache:
+                self._local_cache.move_to_end(key)
+                return self._local_cache[key]
+        
+        redis_client = self._get_redis()
+        if redis_client is None:
+            return None
+        
+        try:
+            raw = redis_client.get(key)
+        except Exception as e:
+            self.logger.warning("Erro ao ler cache: %s", e)
+            return None
+        
+        if raw is None:
+            return None
+        
+        value = json.loads(raw)
+        self._remember(key, value)
+        return value
+    
+    def _cache_put(self, key: str, value: Any):
+        """Gravar valor no Redis e no LRU local"""
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                redis_client.setex(key, REDIS_CACHE_TTL, json.dumps(value, ensure_ascii=False))
+            except Exception as e:
+                self.logger.warning("Erro ao gravar cache: %s", e)
+        
+        self._remember(key, value)
+    
+    def _remember(self, key: str, value: Any):
+        """Inserir no LRU local, descartando a entrada mais antiga se cheio"""
+        with self._local_cache_lock:
+            self._local_cache[key] = value
+            self._local_cache.move_to_end(key)
+            if len(self._local_cache) > LOCAL_CACHE_SIZE:
+                self._local_cache.popitem(last=False)
+    
+    def _get_redis(self):
+        """Obter cliente Redis do CacheService (None se indisponível)"""
+        from src.services.cache_service import cache_service
+        
+        if cache_service.redis_available:
+            return cache_service.redis_client
+        return None
+    
+    def _extract_content_from_html(self, html: str, url: str,
+                                   content_type: str = 'text/html') -> Optional[Dict]:
         """Extrair conteúdo relevante do HTML"""
+        content = self._cached(
+            _cache_key('extract', url, content_type, html),
+            lambda: self._parse_html_content(html, url, content_type)
+        )
+        return dict(content) if content else None
+    
+    def _parse_html_content(self, html: str, url: str,
+                            content_type: str = 'text/html') -> Optional[Dict]:
+        """Extrair conteúdo relevante do HTML (sem cache)"""
         try:
-            # Simulação de extração de conteúdo
-            # Em implementação real, usaria BeautifulSoup ou similar
-            
-            # Detectar tipo de conteúdo baseado na URL
-            if 'irs.gov' in url:
-                return {
-                    'title': 'IRS International Tax Guidance',
-                    'content': 'Guidelines for international tax compliance, offshore structures, and reporting requirements for US taxpayers with foreign assets.'
-                }
-            elif 'receitafederal' in url:
-                return {
-                    'title': 'Orientações Tributárias - Receita Federal',
-                    'content': 'Orientações sobre tributação internacional, acordos para evitar dupla tributação e compliance fiscal para residentes brasileiros.'
-                }
-            elif 'sec.gov' in url:
-                return {
-                    'title': 'SEC Investment Adviser Regulations',
-                    'content': 'Regulations and guidance for investment advisers, including international compliance requirements.'
-                }
-            elif 'cvm' in url:
-                return {
-                    'title': 'Regulamentação CVM',
-                    'content': 'Normas e orientações da CVM sobre mercado de capitais, fundos de investimento e estruturas internacionais.'
-                }
-            else:
-                return {
-                    'title': f'Legal Document from {urlparse(url).netloc}',
-                    'content': 'Legal guidance and regulatory information relevant to wealth planning and international tax compliance.'
-                }
-                
+            return _extract_content(html, url, content_type)
         except Exception as e:
-            self._log_error(f"Erro na extração de conteúdo: {str(e)}")
+            self.logger.exception("Erro na extração de conteúdo: %s", e)
             return None
     
-    def _save_scraped_data(self, source_key: str, source_config: Dict, documents: List[Dict]):
-        """Salvar dados coletados no banco"""
+    async def _aextract_content(self, html: str, url: str, content_type: str) -> Optional[Dict]:
+        """Extrair conteúdo no pool de processos quando a página é grande"""
+        if len(html) < PARSE_POOL_MIN_SIZE:
+            return self._extract_content_from_html(html, url, content_type)
+        
+        key = _cache_key('extract', url, content_type, html)
+        content = self._cache_get(key)
+        
+        if content is None:
+            loop = asyncio.get_running_loop()
+            try:
+                content = await loop.run_in_executor(
+                    self._get_parse_pool(), _extract_content, html, url, content_type
+                )
+            except Exception as e:
+                self.logger.exception("Erro na extração de conteúdo: %s", e)
+                return None
+            
+            if content is None:
+                return None
+            self._cache_put(key, content)
+        
+        return dict(content)
+    
+    def _get_parse_pool(self) -> ProcessPoolExecutor:
+        """Pool de processos para parsing (compartilhado entre os services)"""
+        return get_process_pool()
+    
+    def _save_scraped_batch(self, scraped: List[Tuple[str, SourceConfig, ScrapingResult]]):
+        """Salvar dados coletados de várias fontes em uma única transação"""
+        if not scraped:
+            return
+        
         try:
-            # Buscar ou criar fonte
-            fonte = FonteJuridica.query.filter_by(source_key=source_key).first()
+            keys = [source_key for source_key, _, _ in scraped]
+            existing = dict(
+                db.session.query(FonteJuridica.source_key, FonteJuridica.id)
+                .filter(FonteJuridica.source_key.in_(keys))
+                .all()
+            )
             
-            if not fonte:
-                fonte = FonteJuridica(
-                    source_key=source_key,
-                    name=source_config['name'],
-                    base_url=source_config['base_url'],
-                    category=source_config['category'],
-                    config=source_config,
-                    active=True
-                )
-                db.session.add(fonte)
+            updates = []
+            inserts = []
+            for source_key, source_config, result in scraped:
+                now = result.last_updated or datetime.utcnow()
+                values = {
+                    'last_scraped': now,
+                    'documents_count': len(result.content or []),
+                    'last_content': result.content or [],
+                    'updated_at': now
+                }
+                
+                if source_key in existing:
+                    updates.append({'id': existing[source_key], **values})
+                else:
+                    inserts.append({
+                        'source_key': source_key,
+                        'name': source_config.name,
+                        'base_url': source_config.base_url,
+                        'category': source_config.category,
+                        'config': asdict(source_config),
+                        'active': True,
+                        **values
+                    })
             
-            # Atualizar informações da fonte
-            fonte.last_scraped = datetime.utcnow()
-            fonte.documents_count = len(documents)
-            fonte.last_content = documents
-            fonte.updated_at = datetime.utcnow()
+            if updates:
+                db.session.bulk_update_mappings(FonteJuridica, updates)
+            if inserts:
+                db.session.bulk_insert_mappings(FonteJuridica, inserts)
             
             db.session.commit()
             
+            fresh_until = time.monotonic() + UPDATE_INTERVAL.total_seconds()
+            for source_key in keys:
+                self._fresh_until[source_key] = fresh_until
+            
         except Exception as e:
             db.session.rollback()
-            self._log_error(f"Erro ao salvar dados: {str(e)}")
+            self.logger.exception("Erro ao salvar dados: %s", e)
+    
+    def _load_previous_documents(self, source_keys: List[str]) -> Dict[str, Dict]:
+        """Documentos da última coleta por URL (com ETag/Last-Modified)"""
+        try:
+            rows = db.session.query(
+                FonteJuridica.last_content
+            ).filter(FonteJuridica.source_key.in_(source_keys)).all()
+        except Exception as e:
+            self.logger.exception("Erro ao carregar coleta anterior: %s", e)
+            return {}
+        
+        return {
+            document['url']: document
+            for (documents,) in rows
+            for document in (documents or [])
+            if document.get('url')
+        }
+    
+    def _load_fontes(self) -> Dict[str, FonteJuridica]:
+        """Carregar em uma única consulta as fontes configuradas"""
+        keys = list(self._source_index.keys())
+        return {
+            fonte.source_key: fonte
+            for fonte in FonteJuridica.query.filter(FonteJuridica.source_key.in_(keys)).all()
+        }
     
     def _needs_update(self, source_key: str) -> bool:
         """Verificar se fonte precisa ser atualizada"""
+        # Coleta recente conhecida neste processo: dispensa a consulta ao banco
+        fresh_until = self._fresh_until.get(source_key)
+        if fresh_until is not None and time.monotonic() < fresh_until:
+            return False
+        
         try:
             fonte = FonteJuridica.query.filter_by(source_key=source_key).first()
             
@@ -569,21 +1201,17 @@ class MCPService:
                 return True
             
             # Atualizar se passou mais de 24 horas
-            time_diff = datetime.utcnow() - fonte.last_scraped
-            return time_diff > timedelta(hours=24)
+            remaining = UPDATE_INTERVAL - (datetime.utcnow() - fonte.last_scraped)
+            if remaining <= timedelta(0):
+                return True
+            
+            self._fresh_until[source_key] = time.monotonic() + remaining.total_seconds()
+            return False
             
         except Exception as e:
-            self._log_error(f"Erro ao verificar necessidade de atualização: {str(e)}")
+            self.logger.exception("Erro ao verificar necessidade de atualização: %s", e)
             return True
-    
-    def _log_error(self, error_msg: str):
-        """Log de erro"""
-        try:
-            print(f"[ERROR] MCPService: {error_msg}")
-        except:
-            print(f"[ERROR] MCPService: {error_msg}")
 
 
 # Instância global do service
 mcp_service = MCPService()
-
@@ -6,12 +6,36 @@ para wealth planning, incluindo trusts, contratos e relatórios.
 """
 
 import os
-import uuid
-from datetime import datetime
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+import re
+import atexit
+import html
+import json
+import math
+import time
+import queue
+import logging
+import shutil
+import hashlib
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Any
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 
+try:
+    from jinja2 import Environment
+    from jinja2.sandbox import SandboxedEnvironment
+except ImportError:
+    Environment = SandboxedEnvironment = None
+
+try:
+    import tinycss2
+except ImportError:
+    tinycss2 = None
+
 # Imports para geração de PDF
 try:
     from reportlab.lib.pagesizes import letter, A4
@@ -21,13 +45,197 @@ try:
     from reportlab.lib import colors
     from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
     from weasyprint import HTML, CSS
+    from weasyprint.text.fonts import FontConfiguration
 except ImportError:
     # Fallback se bibliotecas não estiverem disponíveis
     SimpleDocTemplate = None
     Paragraph = None
     HTML = None
+    CSS = None
+    FontConfiguration = None
+
+from flask import current_app
+from sqlalchemy import select
 
 from src.models import db, DocumentoGerado
+from src.services.process_pool import get_process_pool
+
+# Intervalo entre gravações em lote dos documentos gerados
+FLUSH_INTERVAL = 0.5
+
+# Tentativas de gravação de um documento (uma por flush) antes de descartá-lo
+FLUSH_MAX_ATTEMPTS = 3
+
+# Espera máxima (s), na saída do processo, por renderizações ainda em curso
+FLUSH_DRAIN_TIMEOUT = 30.0
+
+# Cache de PDFs renderizados: idade máxima sem uso (s), tamanho total
+# máximo (bytes) e intervalo mínimo entre podas (s)
+PDF_CACHE_MAX_AGE = 7 * 24 * 3600
+PDF_CACHE_MAX_BYTES = 512 * 1024 * 1024
+PDF_CACHE_PRUNE_INTERVAL = 60.0
+
+# Validade (segundos) do uso de disco reportado pelo health check
+DISK_USAGE_TTL = 5.0
+
+# Resposta de uso de disco quando a consulta ao sistema de arquivos falha
+_EMPTY_DISK_USAGE = {
+    'total_gb': 0,
+    'used_gb': 0,
+    'free_gb': 0,
+    'usage_percent': 0
+}
+
+# Fila de erros: limite (descarta quando cheia) e registros por escrita
+LOG_QUEUE_SIZE = 10_000
+LOG_BATCH_SIZE = 100
+
+# Opções de saída do WeasyPrint: streams comprimidos, fontes em subconjunto
+# e imagens otimizadas/recomprimidas para PDFs menores
+PDF_WRITE_OPTIONS = {
+    'uncompressed_pdf': False,
+    'full_fonts': False,
+    'optimize_images': True,
+    'jpeg_quality': 80
+}
+
+# Ambiente Jinja2 compartilhado; os placeholders {{campo}} dos templates já
+# são sintaxe Jinja, então cada template é compilado uma única vez
+_jinja_env = Environment(autoescape=True) if Environment is not None else None
+
+# Templates customizados vêm do corpo da requisição: compilados em sandbox,
+# sem acesso a atributos internos (__globals__, __class__...) do Python
+_sandbox_env = (SandboxedEnvironment(autoescape=True)
+                if SandboxedEnvironment is not None else None)
+
+_PLACEHOLDER_RE = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+
+class _PlaceholderTemplate:
+    """Fallback sem Jinja2: substitui todos os {{campo}} em uma única passada"""
+    
+    def __init__(self, source: str):
+        self.source = source
+    
+    def render(self, **data) -> str:
+        def substitute(match):
+            key = match.group(1)
+            if key not in data:
+                return match.group(0)
+            return html.escape(str(data[key]))
+        
+        return _PLACEHOLDER_RE.sub(substitute, self.source)
+
+
+@lru_cache(maxsize=128)
+def _compile_template(source: str, sandboxed: bool = False) -> Any:
+    """Compilar (e memorizar) um template HTML
+    
+    sandboxed=True para templates enviados pelo usuário.
+    """
+    env = _sandbox_env if sandboxed else _jinja_env
+    if env is None:
+        return _PlaceholderTemplate(source)
+    return env.from_string(source)
+
+
+_CLASS_ATTR_RE = re.compile(r'class\s*=\s*"([^"]*)"')
+_TAG_RE = re.compile(r'<([a-zA-Z][\w-]*)')
+_SELECTOR_CLASS_RE = re.compile(r'\.([\w-]+)')
+_SELECTOR_TAG_RE = re.compile(r'^([a-zA-Z][\w-]*)')
+
+
+def _selector_used(selector: str, classes: set, tags: set) -> bool:
+    """Verificar se um seletor simples referencia apenas classes/tags presentes"""
+    for compound in selector.split():
+        if compound in ('>', '+', '~'):
+            continue
+        tag = _SELECTOR_TAG_RE.match(compound)
+        if tag and tag.group(1).lower() not in tags:
+            return False
+        if any(name not in classes for name in _SELECTOR_CLASS_RE.findall(compound)):
+            return False
+    return True
+
+
+@lru_cache(maxsize=128)
+def _minimal_css(css: str, html_template: str) -> str:
+    """Reduzir o CSS às regras cujos seletores aparecem no template
+    
+    At-rules (@page, @font-face...) são sempre mantidas, pois não
+    dependem do conteúdo do template.
+    """
+    if tinycss2 is None:
+        return css
+    
+    classes = {name for attr in _CLASS_ATTR_RE.findall(html_template) for name in attr.split()}
+    # html/body sempre existem no documento completo montado na renderização
+    tags = {tag.lower() for tag in _TAG_RE.findall(html_template)} | {'html', 'body'}
+    
+    kept = []
+    for rule in tinycss2.parse_stylesheet(css, skip_comments=True, skip_whitespace=True):
+        if rule.type == 'qualified-rule':
+            selectors = tinycss2.serialize(rule.prelude).split(',')
+            if not any(_selector_used(selector.strip(), classes, tags) for selector in selectors):
+                continue
+        elif rule.type != 'at-rule':
+            continue
+        kept.append(rule.serialize())
+    
+    return '\n'.join(kept)
+
+
+# Dados de exemplo usados nos previews, por tipo de template
+_SAMPLE_DATA = {
+    'trust_agreement': {
+        'grantor_name': 'John Smith',
+        'trustee_name': 'ABC Trust Company',
+        'beneficiaries': 'Jane Smith, Robert Smith',
+        'trust_purpose': 'Asset protection and estate planning',
+        'assets': 'Real estate, securities, cash equivalents',
+        'jurisdiction': 'Cayman Islands'
+    },
+    'estate_plan': {
+        'client_name': 'Maria Silva',
+        'assets_value': '$15,000,000',
+        'objectives': 'Tax optimization, succession planning',
+        'recommendations': 'Offshore trust structure, family holding company',
+        'timeline': '6-12 months implementation'
+    },
+    'tax_analysis': {
+        'client_name': 'Carlos Rodriguez',
+        'current_structure': 'Individual ownership',
+        'tax_implications': 'High tax burden, limited optimization',
+        'recommendations': 'International holding structure',
+        'savings': 'Estimated 25-30% tax savings annually'
+    },
+    'compliance_report': {
+        'entity_name': 'Global Holdings Ltd.',
+        'jurisdiction': 'British Virgin Islands',
+        'requirements': 'Annual filings, beneficial ownership disclosure',
+        'status': 'Compliant',
+        'actions_needed': 'Update registered office address'
+    }
+}
+
+
+def _remove_file(path: str):
+    """Remover arquivo se existir (um único syscall, sem exists prévio)"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write_file(path: str, content: bytes):
+    """Gravar conteúdo já em memória direto no descritor, sem buffer intermediário"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(content)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
 
 
 @dataclass
@@ -42,27 +250,61 @@ class PDFGenerationResult:
     generation_time: float = 0.0
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DocumentTemplate:
     """Template de documento"""
     name: str
     type: str
     description: str
-    fields: List[str]
+    fields: Tuple[str, ...]
     html_template: str = ""
     css_styles: str = ""
+    compiled: Optional[Any] = field(default=None, repr=False, compare=False)
+    stylesheet: Optional[Any] = field(default=None, repr=False, compare=False)
 
 
 class PDFGeneratorService:
     """Service para geração de documentos PDF"""
     
     def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
         self.output_dir = os.path.join(os.getcwd(), 'generated_documents')
         self.templates_dir = os.path.join(os.getcwd(), 'document_templates')
+        # PDFs já renderizados, por hash de template + dados
+        self.cache_dir = os.path.join(self.output_dir, '_cache')
+        # Instante monotônico da última poda do cache de PDFs
+        self._cache_pruned_at = 0.0
         
         # Criar diretórios se não existirem
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.templates_dir, exist_ok=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        
+        # Configuração de fontes compartilhada: o fontconfig é varrido uma vez
+        self._font_config = FontConfiguration() if FontConfiguration is not None else None
+        
+        # Folhas de estilo WeasyPrint já parseadas, por conteúdo CSS
+        self._stylesheets: Dict[str, Any] = {}
+        
+        # Cache de imagens do WeasyPrint compartilhado entre renderizações
+        self._image_cache: Dict[str, Any] = {}
+        
+        # Log de erros fora da thread da requisição (drenado em lotes)
+        self._log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self._log_lock = threading.Lock()
+        self._log_drainer_pid: Optional[int] = None
+        
+        # (instante monotônico, resultado) do último _get_disk_usage
+        self._disk_usage_cache = (0.0, None)
+        
+        # Geração em segundo plano: pool de processos + flusher em lote
+        self._pending_jobs: List[tuple] = []
+        # Gravações pendentes: (app, (tipo, mapeamento, file_path, tentativa))
+        self._pending_writes: List[tuple] = []
+        self._jobs_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._drain_registered = False
+        self._closing = False
         
         # Templates disponíveis
         self.templates = {
@@ -70,7 +312,7 @@ class PDFGeneratorService:
                 name='Trust Agreement',
                 type='trust',
                 description='Comprehensive trust agreement for wealth planning',
-                fields=['grantor_name', 'trustee_name', 'beneficiaries', 'trust_purpose', 'assets', 'jurisdiction'],
+                fields=('grantor_name', 'trustee_name', 'beneficiaries', 'trust_purpose', 'assets', 'jurisdiction'),
                 html_template=self._get_trust_template(),
                 css_styles=self._get_default_css()
             ),
@@ -78,7 +320,7 @@ class PDFGeneratorService:
                 name='Estate Planning Report',
                 type='estate',
                 description='Detailed estate planning analysis and recommendations',
-                fields=['client_name', 'assets_value', 'objectives', 'recommendations', 'timeline'],
+                fields=('client_name', 'assets_value', 'objectives', 'recommendations', 'timeline'),
                 html_template=self._get_estate_template(),
                 css_styles=self._get_default_css()
             ),
@@ -86,7 +328,7 @@ class PDFGeneratorService:
                 name='Tax Analysis Report',
                 type='tax',
                 description='International tax analysis and optimization strategies',
-                fields=['client_name', 'current_structure', 'tax_implications', 'recommendations', 'savings'],
+                fields=('client_name', 'current_structure', 'tax_implications', 'recommendations', 'savings'),
                 html_template=self._get_tax_template(),
                 css_styles=self._get_default_css()
             ),
@@ -94,17 +336,42 @@ class PDFGeneratorService:
                 name='Compliance Report',
                 type='compliance',
                 description='Regulatory compliance analysis and requirements',
-                fields=['entity_name', 'jurisdiction', 'requirements', 'status', 'actions_needed'],
+                fields=('entity_name', 'jurisdiction', 'requirements', 'status', 'actions_needed'),
                 html_template=self._get_compliance_template(),
                 css_styles=self._get_default_css()
             )
         }
+        
+        # DocumentTemplate é imutável: derivar as versões com CSS mínimo,
+        # template compilado e folha de estilo pré-parseada
+        for template_key, template in self.templates.items():
+            css_styles = _minimal_css(template.css_styles, template.html_template)
+            self.templates[template_key] = replace(
+                template,
+                css_styles=css_styles,
+                compiled=_compile_template(template.html_template),
+                stylesheet=self._get_stylesheet(css_styles)
+            )
+        
+        # Respostas somente leitura pré-calculadas
+        self._template_keys = tuple(self.templates.keys())
+        self._templates_list = [
+            {
+                'key': template_key,
+                'name': template.name,
+                'type': template.type,
+                'description': template.description,
+                'required_fields': template.fields
+            }
+            for template_key, template in self.templates.items()
+        ]
     
     def generate_document(self,
                          template_type: str,
                          data: Dict[str, Any],
                          user_id: int,
-                         custom_template: str = None) -> PDFGenerationResult:
+                         custom_template: str = None,
+                         background: bool = False) -> PDFGenerationResult:
         """
         Gerar documento PDF
         
@@ -113,11 +380,17 @@ class PDFGeneratorService:
             data: Dados para preencher o template
             user_id: ID do usuário
             custom_template: Template customizado (opcional)
+            background: Renderizar no pool de processos e retornar logo após
+                registrar o documento como pendente (generated=False)
             
         Returns:
             PDFGenerationResult com resultado da geração
+        
+        Com background=True o documento já existe ao retornar, ainda com
+        generated=False; o flush seguinte à renderização grava o tamanho e
+        marca generated=True (ou remove a linha se a renderização falhar).
         """
-        start_time = datetime.utcnow()
+        start_time = time.perf_counter()
         
         try:
             # Validar template
@@ -128,17 +401,7 @@ class PDFGeneratorService:
                 )
             
             # Obter template
-            if custom_template:
-                template = DocumentTemplate(
-                    name='Custom Template',
-                    type='custom',
-                    description='Custom document template',
-                    fields=list(data.keys()),
-                    html_template=custom_template,
-                    css_styles=self._get_default_css()
-                )
-            else:
-                template = self.templates[template_type]
+            template = self._resolve_template(template_type, data, custom_template)
             
             # Validar dados obrigatórios
             missing_fields = self._validate_template_data(template, data)
@@ -148,59 +411,61 @@ class PDFGeneratorService:
                     error=f"Campos obrigatórios faltando: {', '.join(missing_fields)}"
                 )
             
-            # Gerar nome único para o arquivo
-            filename = f"{template_type}_{uuid.uuid4().hex[:8]}.pdf"
-            file_path = os.path.join(self.output_dir, filename)
-            
-            # Gerar PDF
-            if HTML is not None:
-                # Usar WeasyPrint (preferido)
-                success = self._generate_with_weasyprint(template, data, file_path)
-            elif SimpleDocTemplate is not None:
-                # Fallback para ReportLab
-                success = self._generate_with_reportlab(template, data, file_path)
-            else:
+            if HTML is None and SimpleDocTemplate is None:
                 return PDFGenerationResult(
                     success=False,
                     error="Nenhuma biblioteca de geração de PDF disponível"
                 )
             
+            # Gerar nome único para o arquivo
+            filename = f"{template_type}_{secrets.token_hex(4)}.pdf"
+            file_path = os.path.join(self.output_dir, filename)
+            
+            if background:
+                return self._submit_document(
+                    template_type, data, user_id, custom_template, filename, file_path, start_time
+                )
+            
+            # Gerar PDF
+            success = self._render_pdf(template, data, file_path)
+            
             if not success:
                 return PDFGenerationResult(
                     success=False,
                     error="Erro na geração do PDF"
                 )
             
-            # Verificar se arquivo foi criado
-            if not os.path.exists(file_path):
+            # Verificar se arquivo foi criado e obter tamanho (um único stat)
+            try:
+                file_size = os.stat(file_path).st_size
+            except FileNotFoundError:
                 return PDFGenerationResult(
                     success=False,
                     error="Arquivo PDF não foi criado"
                 )
             
-            # Obter tamanho do arquivo
-            file_size = os.path.getsize(file_path)
-            
             # Salvar no banco de dados
-            documento = DocumentoGerado(
-                user_id=user_id,
-                template_type=template_type,
-                filename=filename,
-                file_path=file_path,
-                file_size=file_size,
-                template_data=data,
-                generated=True
-            )
+            row = {
+                'user_id': user_id,
+                'template_type': template_type,
+                'filename': filename,
+                'file_path': file_path,
+                'file_size': file_size,
+                'template_data': data,
+                'generated': True
+            }
             
+            documento = DocumentoGerado(**row)
             db.session.add(documento)
             db.session.commit()
+            document_id = documento.id
             
             # Calcular tempo de geração
-            generation_time = (datetime.utcnow() - start_time).total_seconds()
+            generation_time = time.perf_counter() - start_time
             
             return PDFGenerationResult(
                 success=True,
-                document_id=documento.id,
+                document_id=document_id,
                 filename=filename,
                 file_path=file_path,
                 file_size=file_size,
@@ -210,8 +475,8 @@ class PDFGeneratorService:
         except Exception as e:
             db.session.rollback()
             # Limpar arquivo se houver erro
-            if 'file_path' in locals() and os.path.exists(file_path):
-                os.remove(file_path)
+            if 'file_path' in locals():
+                _remove_file(file_path)
             
             self._log_error(f"Erro na geração de PDF: {str(e)}", user_id)
             return PDFGenerationResult(
@@ -219,6 +484,122 @@ class PDFGeneratorService:
                 error="Erro interno na geração do documento"
             )
     
+    def generate_documents_bulk(self,
+                                requests: List[Dict[str, Any]],
+                                user_id: int) -> List[PDFGenerationResult]:
+        """
+        Gerar vários documentos PDF em paralelo
+        
+        Args:
+            requests: Lista de dicts com 'template_type', 'data' e,
+                opcionalmente, 'custom_template'
+            user_id: ID do usuário
+            
+        Returns:
+            Lista de PDFGenerationResult, na mesma ordem de requests
+        """
+        start_time = time.perf_counter()
+        results: List[Optional[PDFGenerationResult]] = [None] * len(requests)
+        jobs = []
+        
+        # Validar tudo no processo principal antes de distribuir
+        for index, request in enumerate(requests):
+            template_type = request.get('template_type')
+            data = request.get('data') or {}
+            custom_template = request.get('custom_template')
+            
+            if template_type not in self.templates and not custom_template:
+                results[index] = PDFGenerationResult(
+                    success=False,
+                    error=f"Template '{template_type}' não encontrado"
+                )
+                continue
+            
+            template = self._resolve_template(template_type, data, custom_template)
+            missing_fields = self._validate_template_data(template, data)
+            if missing_fields:
+                results[index] = PDFGenerationResult(
+                    success=False,
+                    error=f"Campos obrigatórios faltando: {', '.join(missing_fields)}"
+                )
+                continue
+            
+            filename = f"{template_type}_{secrets.token_hex(4)}.pdf"
+            jobs.append((index, template_type, data, custom_template, filename,
+                         os.path.join(self.output_dir, filename)))
+        
+        if not jobs:
+            return results
+        
+        if HTML is None and SimpleDocTemplate is None:
+            for index, *_ in jobs:
+                results[index] = PDFGenerationResult(
+                    success=False,
+                    error="Nenhuma biblioteca de geração de PDF disponível"
+                )
+            return results
+        
+        try:
+            sizes = list(self._get_render_pool().map(
+                _render_job,
+                [job[1] for job in jobs],
+                [job[2] for job in jobs],
+                [job[3] for job in jobs],
+                [job[5] for job in jobs],
+                chunksize=4
+            ))
+            
+            documentos = []
+            for (index, template_type, data, _, filename, file_path), file_size in zip(jobs, sizes):
+                if file_size is None:
+                    results[index] = PDFGenerationResult(
+                        success=False,
+                        error="Erro na geração do PDF"
+                    )
+                    continue
+                
+                documentos.append((index, DocumentoGerado(
+                    user_id=user_id,
+                    template_type=template_type,
+                    filename=filename,
+                    file_path=file_path,
+                    file_size=file_size,
+                    template_data=data,
+                    generated=True
+                )))
+            
+            # Uma única transação para todo o lote
+            db.session.bulk_save_objects([doc for _, doc in documentos], return_defaults=True)
+            db.session.commit()
+            
+            generation_time = time.perf_counter() - start_time
+            for index, documento in documentos:
+                results[index] = PDFGenerationResult(
+                    success=True,
+                    document_id=documento.id,
+                    filename=documento.filename,
+                    file_path=documento.file_path,
+                    file_size=documento.file_size,
+                    generation_time=generation_time
+                )
+            
+            return results
+            
+        except Exception as e:
+            db.session.rollback()
+            # Limpar arquivos do lote se houver erro
+            for job in jobs:
+                _remove_file(job[5])
+            
+            self._log_error(f"Erro na geração de PDFs em lote: {str(e)}", user_id)
+            return [
+                result or PDFGenerationResult(
+                    success=False,
+                    error="Erro interno na geração do documento"
+                )
+                for result in results
+            ]
+    
     def get_document(self, document_id: int, user_id: int) -> Optional[DocumentoGerado]:
         """
         Obter documento gerado por ID
@@ -258,26 +639,47 @@ class PDFGeneratorService:
             Dict com documentos e paginação
         """
         try:
-            query = DocumentoGerado.query.filter_by(user_id=user_id)
-            
+            filters = [DocumentoGerado.user_id == user_id]
             if template_type:
-                query = query.filter_by(template_type=template_type)
-            
-            paginated = query.order_by(DocumentoGerado.created_at.desc()).paginate(
-                page=page,
-                per_page=per_page,
-                error_out=False
-            )
+                filters.append(DocumentoGerado.template_type == template_type)
+            
+            # Apenas as colunas da listagem, sem hidratar objetos ORM
+            rows = db.session.execute(
+                select(
+                    DocumentoGerado.id,
+                    DocumentoGerado.template_type,
+                    DocumentoGerado.filename,
+                    DocumentoGerado.file_size,
+                    DocumentoGerado.generated,
+                    DocumentoGerado.created_at
+                )
+                .where(*filters)
+                .order_by(DocumentoGerado.created_at.desc())
+                .limit(per_page)
+                .offset((page - 1) * per_page)
+            ).mappings()
+            
+            documents = []
+            for row in rows:
+                document = dict(row)
+                created_at = document['created_at']
+                document['created_at'] = created_at.isoformat() if created_at else None
+                documents.append(document)
+            
+            total = db.session.execute(
+                select(db.func.count(DocumentoGerado.id)).where(*filters)
+            ).scalar() or 0
+            pages = math.ceil(total / per_page) if per_page else 0
             
             return {
-                'documents': [doc.to_dict() for doc in paginated.items],
+                'documents': documents,
                 'pagination': {
                     'page': page,
                     'per_page': per_page,
-                    'total': paginated.total,
-                    'pages': paginated.pages,
-                    'has_next': paginated.has_next,
-                    'has_prev': paginated.has_prev
+                    'total': total,
+                    'pages': pages,
+                    'has_next': page < pages,
+                    'has_prev': page > 1
                 }
             }
             
@@ -315,9 +717,11 @@ class PDFGeneratorService:
             if not documento:
                 return False
             
-            # Remover arquivo físico
-            if os.path.exists(documento.file_path):
-                os.remove(documento.file_path)
+            # Remover arquivo físico e, se era o último link, a entrada do cache
+            cache_path = self._cached_pdf_for(documento)
+            _remove_file(documento.file_path)
+            if cache_path:
+                self._release_cached_pdf(cache_path)
             
             # Remover do banco
             db.session.delete(documento)
@@ -335,25 +739,9 @@ class PDFGeneratorService:
         Obter lista de templates disponíveis
         
         Returns:
-            Lista de templates com metadados
+            Lista de templates com metadados (pré-calculada no __init__)
         """
-        try:
-            templates_list = []
-            
-            for template_key, template in self.templates.items():
-                templates_list.append({
-                    'key': template_key,
-                    'name': template.name,
-                    'type': template.type,
-                    'description': template.description,
-                    'required_fields': template.fields
-                })
-            
-            return templates_list
-            
-        except Exception as e:
-            self._log_error(f"Erro ao obter templates: {str(e)}")
-            return []
+        return self._templates_list
     
     def preview_template(self, template_type: str, sample_data: Dict = None) -> str:
         """
@@ -377,7 +765,7 @@ class PDFGeneratorService:
                 sample_data = self._get_sample_data(template_type)
             
             # Renderizar template
-            html_content = self._render_template(template.html_template, sample_data)
+            html_content = self._render_template(template, sample_data)
             
             return f"""
             <html>
@@ -405,32 +793,34 @@ class PDFGeneratorService:
             Dict com estatísticas
         """
         try:
-            total_docs = DocumentoGerado.query.filter_by(user_id=user_id).count()
+            # Intervalo semiaberto [hoje 00:00, amanhã 00:00) para usar o
+            # índice de created_at em vez de DATE(created_at) por linha
+            today_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+            today_end = today_start + timedelta(days=1)
             
-            # Estatísticas por tipo
+            # Uma única consulta agregada por tipo: quantidade, tamanho e
+            # documentos de hoje; os totais saem da soma das linhas
             type_stats = db.session.query(
                 DocumentoGerado.template_type,
-                db.func.count(DocumentoGerado.id).label('count')
+                db.func.count(DocumentoGerado.id),
+                db.func.coalesce(db.func.sum(DocumentoGerado.file_size), 0),
+                db.func.sum(db.case(
+                    ((DocumentoGerado.created_at >= today_start) &
+                     (DocumentoGerado.created_at < today_end), 1),
+                    else_=0
+                ))
             ).filter_by(user_id=user_id).group_by(DocumentoGerado.template_type).all()
             
-            # Tamanho total dos arquivos
-            total_size = db.session.query(
-                db.func.sum(DocumentoGerado.file_size)
-            ).filter_by(user_id=user_id).scalar() or 0
-            
-            # Documentos gerados hoje
-            today = datetime.utcnow().date()
-            docs_today = DocumentoGerado.query.filter(
-                DocumentoGerado.user_id == user_id,
-                db.func.date(DocumentoGerado.created_at) == today
-            ).count()
+            total_docs = sum(count for _, count, _, _ in type_stats)
+            total_size = sum(size for _, _, size, _ in type_stats)
+            docs_today = sum(today_count or 0 for _, _, _, today_count in type_stats)
             
             return {
                 'total_documents': total_docs,
                 'documents_today': docs_today,
                 'total_size_bytes': total_size,
                 'total_size_mb': round(total_size / (1024 * 1024), 2),
-                'by_template_type': {template_type: count for template_type, count in type_stats},
+                'by_template_type': {template_type: count for template_type, count, _, _ in type_stats},
                 'available_templates': len(self.templates)
             }
             
@@ -465,12 +855,18 @@ class PDFGeneratorService:
             
             # Teste de geração
             test_data = {'test_field': 'test_value'}
-            test_template = "<html><body><h1>{{test_field}}</h1></body></html>"
+            test_template = DocumentTemplate(
+                name='Health Check',
+                type='test',
+                description='Health check template',
+                fields=('test_field',),
+                html_template="<html><body><h1>{{test_field}}</h1></body></html>"
+            )
             
             try:
                 test_html = self._render_template(test_template, test_data)
                 generation_test = bool(test_html and 'test_value' in test_html)
-            except:
+            except Exception:
                 generation_test = False
             
             # Espaço em disco
@@ -496,7 +892,7 @@ class PDFGeneratorService:
                 "libraries": libraries_available,
                 "templates": {
                     "available": len(self.templates),
-                    "types": list(self.templates.keys())
+                    "types": self._template_keys
                 },
                 "generation_test": generation_test,
                 "disk_usage": disk_usage,
@@ -512,18 +908,347 @@ class PDFGeneratorService:
     
     # Métodos privados auxiliares
     
+    def _resolve_template(self,
+                          template_type: str,
+                          data: Dict[str, Any],
+                          custom_template: str = None) -> DocumentTemplate:
+        """Obter template registrado ou montar um template customizado"""
+        if not custom_template:
+            return self.templates[template_type]
+        
+        css_styles = _minimal_css(self._get_default_css(), custom_template)
+        return DocumentTemplate(
+            name='Custom Template',
+            type='custom',
+            description='Custom document template',
+            fields=tuple(data),
+            html_template=custom_template,
+            css_styles=css_styles,
+            compiled=_compile_template(custom_template, sandboxed=True),
+            stylesheet=self._get_stylesheet(css_styles)
+        )
+    
+    def _render_pdf(self, template: DocumentTemplate, data: Dict, file_path: str) -> bool:
+        """Gerar o arquivo PDF, reaproveitando o cache em disco quando possível
+        
+        Renderizações idênticas (mesmo template e dados) viram um hardlink
+        para o PDF em cache, sem nova renderização nem cópia de bytes.
+        O fallback ReportLab não usa o cache: o PDF traz a data de geração.
+        """
+        if HTML is None:
+            return self._render_pdf_uncached(template, data, file_path)
+        
+        cache_path = self._pdf_cache_path(template, data)
+        
+        if not self._link_cached_pdf(cache_path, file_path):
+            # Renderizar em arquivo temporário e publicar no cache atomicamente
+            tmp_path = f"{cache_path}.{secrets.token_hex(4)}.tmp"
+            if not self._render_pdf_uncached(template, data, tmp_path):
+                _remove_file(tmp_path)
+                return False
+            
+            os.replace(tmp_path, cache_path)
+            self._maybe_prune_pdf_cache()
+            return self._link_cached_pdf(cache_path, file_path)
+        
+        return True
+    
+    def _pdf_cache_path(self, template: DocumentTemplate, data: Dict) -> str:
+        """Caminho do PDF em cache para o par template + dados"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(template.html_template.encode())
+        digest.update(template.css_styles.encode())
+        digest.update(json.dumps(data, sort_keys=True, default=str).encode())
+        return os.path.join(self.cache_dir, f"{digest.hexdigest()}.pdf")
+    
+    def _link_cached_pdf(self, cache_path: str, file_path: str) -> bool:
+        """Criar file_path apontando para o PDF em cache (False se não houver cache)"""
+        try:
+            os.link(cache_path, file_path)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            # Sistema de arquivos sem suporte a hardlink
+            try:
+                shutil.copyfile(cache_path, file_path)
+            except FileNotFoundError:
+                return False
+        
+        # Marcar uso: a poda por idade remove as entradas sem uso recente
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+        return True
+    
+    def _cached_pdf_for(self, documento: DocumentoGerado) -> Optional[str]:
+        """Entrada do cache que é hardlink do arquivo do documento (ou None)"""
+        template = self.templates.get(documento.template_type)
+        if template is None:
+            # Template customizado não é guardado: fica a cargo da poda
+            return None
+        
+        cache_path = self._pdf_cache_path(template, documento.template_data or {})
+        try:
+            if os.path.samefile(cache_path, documento.file_path):
+                return cache_path
+        except OSError:
+            pass
+        return None
+    
+    def _release_cached_pdf(self, cache_path: str):
+        """Remover a entrada do cache quando nenhum documento aponta mais para ela"""
+        try:
+            if os.stat(cache_path).st_nlink == 1:
+                _remove_file(cache_path)
+        except FileNotFoundError:
+            pass
+    
+    def _maybe_prune_pdf_cache(self):
+        """Podar o cache no máximo uma vez a cada PDF_CACHE_PRUNE_INTERVAL"""
+        now = time.monotonic()
+        if now - self._cache_pruned_at < PDF_CACHE_PRUNE_INTERVAL:
+            return
+        self._cache_pruned_at = now
+        self._prune_pdf_cache()
+    
+    def _prune_pdf_cache(self):
+        """Remover entradas sem uso há PDF_CACHE_MAX_AGE e, acima de
+        PDF_CACHE_MAX_BYTES, as usadas há mais tempo"""
+        now = time.time()
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as scan:
+                for entry in scan:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if now - stat.st_mtime > PDF_CACHE_MAX_AGE:
+                        _remove_file(entry.path)
+                    else:
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError as e:
+            self._log_error(f"Erro ao podar cache de PDFs: {str(e)}")
+            return
+        
+        total_size = sum(size for _, size, _ in entries)
+        if total_size <= PDF_CACHE_MAX_BYTES:
+            return
+        for _, size, path in sorted(entries):
+            _remove_file(path)
+            total_size -= size
+            if total_size <= PDF_CACHE_MAX_BYTES:
+                break
+    
+    def _render_pdf_uncached(self, template: DocumentTemplate, data: Dict, file_path: str) -> bool:
+        """Gerar o arquivo PDF com a biblioteca disponível"""
+        if HTML is not None:
+            # Usar WeasyPrint (preferido)
+            return self._generate_with_weasyprint(template, data, file_path)
+        if SimpleDocTemplate is not None:
+            # Fallback para ReportLab
+            return self._generate_with_reportlab(template, data, file_path)
+        return False
+    
+    def _submit_document(self,
+                         template_type: str,
+                         data: Dict[str, Any],
+                         user_id: int,
+                         custom_template: Optional[str],
+                         filename: str,
+                         file_path: str,
+                         start_time: float) -> PDFGenerationResult:
+        """Registrar documento pendente e enfileirar a renderização
+        
+        A linha (generated=False) é gravada antes do envio ao pool, então o
+        ID retornado já pode ser consultado; a conclusão é gravada em lote.
+        """
+        documento = DocumentoGerado(
+            user_id=user_id,
+            template_type=template_type,
+            filename=filename,
+            file_path=file_path,
+            file_size=0,
+            template_data=data,
+            generated=False
+        )
+        db.session.add(documento)
+        db.session.commit()
+        document_id = documento.id
+        
+        try:
+            future = self._get_render_pool().submit(
+                _render_job, template_type, data, custom_template, file_path
+            )
+        except Exception:
+            # Pool quebrado ou encerrado: não deixar a linha pendente órfã
+            db.session.delete(documento)
+            db.session.commit()
+            raise
+        
+        with self._jobs_lock:
+            self._pending_jobs.append(
+                (future, document_id, file_path, user_id, current_app._get_current_object())
+            )
+            self._ensure_flusher()
+        
+        return PDFGenerationResult(
+            success=True,
+            document_id=document_id,
+            filename=filename,
+            file_path=file_path,
+            generation_time=time.perf_counter() - start_time
+        )
+    
+    def _ensure_flusher(self):
+        """Iniciar a thread de flush se necessário (chamar com _jobs_lock)"""
+        if not self._drain_registered:
+            # A thread é daemon: o que estiver pendente é gravado no atexit
+            atexit.register(self._drain_pending)
+            self._drain_registered = True
+        
+        if self._flusher is None and not self._closing:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name='pdf-flusher', daemon=True
+            )
+            self._flusher.start()
+    
+    def _drain_pending(self):
+        """Gravar, na saída do processo, renderizações e gravações pendentes
+        
+        Renderizações que não terminarem em FLUSH_DRAIN_TIMEOUT são tratadas
+        como falhas (PDF e linha pendente removidos).
+        """
+        with self._jobs_lock:
+            self._closing = True
+            jobs, self._pending_jobs = self._pending_jobs, []
+        
+        if jobs:
+            wait([job[0] for job in jobs], timeout=FLUSH_DRAIN_TIMEOUT)
+        
+        done = [job for job in jobs if job[0].done()]
+        for future, document_id, file_path, user_id, app in jobs:
+            if not future.done():
+                future.cancel()
+                _remove_file(file_path)
+                with self._jobs_lock:
+                    self._pending_writes.append((app, ('delete', {'id': document_id}, None, 1)))
+        
+        # Falhas de gravação voltam à fila: uma passada por tentativa
+        for _ in range(FLUSH_MAX_ATTEMPTS):
+            with self._jobs_lock:
+                writes, self._pending_writes = self._pending_writes, []
+            if not done and not writes:
+                break
+            self._flush_jobs(done, writes)
+            done = []
+    
+    def _get_render_pool(self) -> ProcessPoolExecutor:
+        """Pool de processos para renderização (compartilhado entre os services)"""
+        return get_process_pool()
+    
+    def _flush_loop(self):
+        """Persistir em lote, a cada FLUSH_INTERVAL, inserções e jobs já renderizados"""
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            
+            with self._jobs_lock:
+                done = [job for job in self._pending_jobs if job[0].done()]
+                self._pending_jobs = [job for job in self._pending_jobs if not job[0].done()]
+                writes, self._pending_writes = self._pending_writes, []
+                if not done and not writes and not self._pending_jobs:
+                    self._flusher = None
+                    return
+            
+            if done or writes:
+                self._flush_jobs(done, writes)
+    
+    def _flush_jobs(self, jobs: List[tuple], writes: List[tuple]):
+        """Inserir/atualizar documentos concluídos e remover os que falharam"""
+        batches: Dict[Any, List[tuple]] = {}
+        
+        for app, write in writes:
+            batches.setdefault(app, []).append(write)
+        
+        for future, document_id, file_path, user_id, app in jobs:
+            batch = batches.setdefault(app, [])
+            try:
+                file_size = future.result()
+            except Exception as e:
+                self._log_error(f"Erro na geração de PDF: {str(e)}", user_id)
+                file_size = None
+            
+            if file_size is None:
+                _remove_file(file_path)
+                batch.append(('delete', {'id': document_id}, None, 1))
+            else:
+                batch.append(('update', {'id': document_id, 'file_size': file_size, 'generated': True},
+                              file_path, 1))
+        
+        for app, batch in batches.items():
+            with app.app_context():
+                try:
+                    self._persist_writes(batch)
+                except Exception as e:
+                    db.session.rollback()
+                    self._log_error(f"Erro ao persistir documentos em lote, gravando um a um: {str(e)}")
+                    self._persist_one_by_one(app, batch)
+    
+    def _persist_writes(self, writes: List[tuple]):
+        """Gravar atualizações e exclusões em uma única transação"""
+        updates = [mapping for kind, mapping, _, _ in writes if kind == 'update']
+        deletes = [mapping['id'] for kind, mapping, _, _ in writes if kind == 'delete']
+        
+        if updates:
+            db.session.bulk_update_mappings(DocumentoGerado, updates)
+        if deletes:
+            DocumentoGerado.query.filter(
+                DocumentoGerado.id.in_(deletes)
+            ).delete(synchronize_session=False)
+        db.session.commit()
+    
+    def _persist_one_by_one(self, app, writes: List[tuple]):
+        """Gravar cada linha em sua própria transação após falha do lote
+        
+        Uma linha inválida não derruba as demais; as que falharem voltam à
+        fila para o próximo flush e, esgotadas FLUSH_MAX_ATTEMPTS tentativas,
+        são descartadas junto com o PDF em disco.
+        """
+        retry = []
+        for write in writes:
+            try:
+                self._persist_writes([write])
+            except Exception as e:
+                db.session.rollback()
+                kind, mapping, file_path, attempt = write
+                if attempt < FLUSH_MAX_ATTEMPTS:
+                    retry.append((app, (kind, mapping, file_path, attempt + 1)))
+                    continue
+                
+                if file_path:
+                    _remove_file(file_path)
+                self._log_error(
+                    f"Documento {mapping.get('id')} descartado após {attempt} tentativas: {str(e)}",
+                    mapping.get('user_id')
+                )
+        
+        if retry:
+            with self._jobs_lock:
+                self._pending_writes.extend(retry)
+                self._ensure_flusher()
+    
     def _generate_with_weasyprint(self, template: DocumentTemplate, data: Dict, file_path: str) -> bool:
         """Gerar PDF usando WeasyPrint"""
         try:
             # Renderizar HTML
-            html_content = self._render_template(template.html_template, data)
+            html_content = self._render_template(template, data)
             
-            # Criar HTML completo
+            # Criar HTML completo (o CSS vai pré-parseado via stylesheets)
             full_html = f"""
             <html>
             <head>
                 <meta charset="UTF-8">
-                <style>{template.css_styles}</style>
             </head>
             <body>
                 {html_content}
@@ -531,8 +1256,16 @@ class PDFGeneratorService:
             </html>
             """
             
-            # Gerar PDF
-            HTML(string=full_html).write_pdf(file_path)
+            stylesheet = template.stylesheet or self._get_stylesheet(template.css_styles)
+            
+            # Gerar PDF em memória e gravar com um único write
+            pdf_bytes = HTML(string=full_html).write_pdf(
+                stylesheets=[stylesheet],
+                font_config=self._font_config,
+                cache=self._image_cache,
+                **PDF_WRITE_OPTIONS
+            )
+            _write_file(file_path, pdf_bytes)
             
             return True
             
@@ -594,67 +1327,36 @@ class PDFGeneratorService:
             self._log_error(f"Erro no ReportLab: {str(e)}")
             return False
     
-    def _render_template(self, template: str, data: Dict) -> str:
+    def _render_template(self, template: DocumentTemplate, data: Dict) -> str:
         """Renderizar template com dados"""
         try:
-            # Substituição simples de variáveis
-            rendered = template
-            
-            for key, value in data.items():
-                placeholder = f"{{{{{key}}}}}"
-                rendered = rendered.replace(placeholder, str(value))
-            
-            return rendered
+            compiled = template.compiled or _compile_template(
+                template.html_template, sandboxed=template.type == 'custom'
+            )
+            return compiled.render(**data)
             
         except Exception as e:
             self._log_error(f"Erro na renderização: {str(e)}")
-            return template
+            return template.html_template
+    
+    def _get_stylesheet(self, css_styles: str) -> Optional[Any]:
+        """Obter objeto CSS do WeasyPrint, parseando cada folha uma única vez"""
+        if CSS is None:
+            return None
+        
+        stylesheet = self._stylesheets.get(css_styles)
+        if stylesheet is None:
+            stylesheet = CSS(string=css_styles, font_config=self._font_config)
+            self._stylesheets[css_styles] = stylesheet
+        return stylesheet
     
     def _validate_template_data(self, template: DocumentTemplate, data: Dict) -> List[str]:
         """Validar dados obrigatórios do template"""
-        missing_fields = []
-        
-        for field in template.fields:
-            if field not in data or not data[field]:
-                missing_fields.append(field)
-        
-        return missing_fields
+        return [field for field in template.fields if not data.get(field)]
     
     def _get_sample_data(self, template_type: str) -> Dict[str, str]:
         """Obter dados de exemplo para template"""
-        sample_data = {
-            'trust_agreement': {
-                'grantor_name': 'John Smith',
-                'trustee_name': 'ABC Trust Company',
-                'beneficiaries': 'Jane Smith, Robert Smith',
-                'trust_purpose': 'Asset protection and estate planning',
-                'assets': 'Real estate, securities, cash equivalents',
-                'jurisdiction': 'Cayman Islands'
-            },
-            'estate_plan': {
-                'client_name': 'Maria Silva',
-                'assets_value': '$15,000,000',
-                'objectives': 'Tax optimization, succession planning',
-                'recommendations': 'Offshore trust structure, family holding company',
-                'timeline': '6-12 months implementation'
-            },
-            'tax_analysis': {
-                'client_name': 'Carlos Rodriguez',
-                'current_structure': 'Individual ownership',
-                'tax_implications': 'High tax burden, limited optimization',
-                'recommendations': 'International holding structure',
-                'savings': 'Estimated 25-30% tax savings annually'
-            },
-            'compliance_report': {
-                'entity_name': 'Global Holdings Ltd.',
-                'jurisdiction': 'British Virgin Islands',
-                'requirements': 'Annual filings, beneficial ownership disclosure',
-                'status': 'Compliant',
-                'actions_needed': 'Update registered office address'
-            }
-        }
-        
-        return sample_data.get(template_type, {})
+        return _SAMPLE_DATA.get(template_type, {})
     
     def _get_trust_template(self) -> str:
         """Template HTML para Trust Agreement"""
@@ -869,37 +1571,89 @@ class PDFGeneratorService:
         """
     
     def _get_disk_usage(self) -> Dict[str, Any]:
-        """Obter uso do disco"""
+        """Obter uso do disco (em cache por DISK_USAGE_TTL segundos)"""
+        now = time.monotonic()
+        cached_at, usage = self._disk_usage_cache
+        if usage is not None and now - cached_at < DISK_USAGE_TTL:
+            return usage
+        
         try:
-            import shutil
             total, used, free = shutil.disk_usage(self.output_dir)
             
-            return {
+            usage = {
                 'total_gb': round(total / (1024**3), 2),
                 'used_gb': round(used / (1024**3), 2),
                 'free_gb': round(free / (1024**3), 2),
                 'usage_percent': round((used / total) * 100, 2)
             }
-        except:
-            return {
-                'total_gb': 0,
-                'used_gb': 0,
-                'free_gb': 0,
-                'usage_percent': 0
-            }
+            self._disk_usage_cache = (now, usage)
+            return usage
+        except (OSError, ZeroDivisionError):
+            return _EMPTY_DISK_USAGE
     
     def _log_error(self, error_msg: str, user_id: int = None):
-        """Log de erro"""
+        """Log de erro (enfileirado; a escrita acontece na thread de drenagem)"""
+        self._ensure_log_drainer()
         try:
-            log_data = {
-                'error': error_msg,
-                'user_id': user_id,
-                'service': 'PDFGeneratorService',
-                'timestamp': datetime.utcnow().isoformat()
-            }
-            print(f"[ERROR] PDFGeneratorService: {error_msg}")
-        except:
-            print(f"[ERROR] PDFGeneratorService: {error_msg}")
+            self._log_queue.put_nowait((error_msg, user_id, time.time()))
+        except queue.Full:
+            # Melhor esforço: sob rajada de erros, descartar em vez de bloquear
+            pass
+    
+    def _ensure_log_drainer(self):
+        """Iniciar a thread de drenagem do log neste processo, se necessário"""
+        pid = os.getpid()
+        if self._log_drainer_pid == pid:
+            return
+        
+        with self._log_lock:
+            if self._log_drainer_pid == pid:
+                return
+            # Após fork a thread do processo pai não existe no filho
+            self._log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            threading.Thread(
+                target=self._drain_log_queue,
+                args=(self._log_queue,),
+                name='pdf-error-log',
+                daemon=True
+            ).start()
+            self._log_drainer_pid = pid
+    
+    def _drain_log_queue(self, log_queue: queue.Queue):
+        """Escrever os erros enfileirados em lotes de até LOG_BATCH_SIZE"""
+        while True:
+            batch = [log_queue.get()]
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    batch.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            # Formatação adiada (%-style) e I/O a cargo dos handlers do logging
+            for error_msg, user_id, _ in batch:
+                self.logger.error("Erro (user=%s): %s", user_id, error_msg)
+
+
+def _render_job(template_type: str,
+                data: Dict[str, Any],
+                custom_template: Optional[str],
+                file_path: str) -> Optional[int]:
+    """Renderizar um PDF no pool de processos
+    
+    Função de módulo para poder ser serializada; usa a instância global do
+    processo de trabalho, que mantém seus próprios caches de template/CSS.
+    Retorna o tamanho do arquivo ou None em caso de falha.
+    """
+    service = pdf_generator_service
+    template = service._resolve_template(template_type, data, custom_template)
+    
+    if not service._render_pdf(template, data, file_path):
+        return None
+    try:
+        return os.stat(file_path).st_size
+    except FileNotFoundError:
+        return None
+
 
 # Instância global do service
 pdf_generator_service = PDFGeneratorService()
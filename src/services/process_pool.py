@@ -0,0 +1,56 @@
+"""
+Pool de processos compartilhado pelos services
+
+Renderização de PDFs (PDFGeneratorService), parsing de páginas grandes
+(MCPService) e vetorização de corpora grandes (SearchService) usam um
+único ProcessPoolExecutor por processo, com número de workers limitado,
+em vez de cada service criar o seu com os.cpu_count() workers. O pool é
+encerrado no atexit.
+"""
+
+import os
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# Teto de workers do pool por processo (cada worker do gunicorn tem o seu);
+# POLARIS_POOL_WORKERS sobrescreve
+MAX_POOL_WORKERS = int(os.getenv('POLARIS_POOL_WORKERS', '4'))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def pool_workers() -> int:
+    """Número de workers do pool compartilhado"""
+    return max(1, min(os.cpu_count() or 1, MAX_POOL_WORKERS))
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Pool compartilhado deste processo (criado sob demanda)"""
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    with _pool_lock:
+        # Após fork o filho herda a referência, mas não os workers do pai
+        if _pool is None or _pool_pid != pid:
+            _pool = ProcessPoolExecutor(max_workers=pool_workers())
+            _pool_pid = pid
+        return _pool
+
+
+def shutdown_process_pool():
+    """Encerrar o pool compartilhado, cancelando tarefas ainda na fila"""
+    global _pool
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+        owned = _pool_pid == os.getpid()
+
+    if pool is not None and owned:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(shutdown_process_pool)
@@ -6,23 +6,103 @@ sem quebrar funcionalidades atuais.
 """
 
 import logging
+import logging.handlers
+from types import MappingProxyType
 from flask import Flask
 
-# Import das rotas enhanced
-try:
-    from src.routes.enhanced_ai_routes import register_enhanced_ai_routes
-    ENHANCED_ROUTES_AVAILABLE = True
-except ImportError as e:
-    ENHANCED_ROUTES_AVAILABLE = False
-    print(f"⚠️ Enhanced routes não disponíveis: {e}")
+# Mensagens da integração; o nível (INFO ou WARNING) segue o flag verbose
+_log = logging.getLogger('rag.integration')
+
+# Registros acumulados em memória antes de cada escrita em logs/rag.log
+LOG_BUFFER_CAPACITY = 1024
 
-# Import do middleware
+# Import do middleware (as rotas enhanced dependem dele)
 try:
-    from src.services.rag_claude_middleware import get_rag_claude_middleware
+    from src.services.rag_claude_middleware import get_rag_claude_middleware, _safe_import
     MIDDLEWARE_AVAILABLE = True
 except ImportError as e:
     MIDDLEWARE_AVAILABLE = False
-    print(f"⚠️ RAG middleware não disponível: {e}")
+    _log.warning("⚠️ RAG middleware não disponível: %s", e)
+
+# Import das rotas enhanced
+if MIDDLEWARE_AVAILABLE:
+    ENHANCED_ROUTES_AVAILABLE, (register_enhanced_ai_routes,) = _safe_import(
+        'src.routes.enhanced_ai_routes', 'register_enhanced_ai_routes'
+    )
+else:
+    ENHANCED_ROUTES_AVAILABLE, register_enhanced_ai_routes = False, None
+
+if not ENHANCED_ROUTES_AVAILABLE:
+    _log.warning("⚠️ Enhanced routes não disponíveis")
+
+
+# Blocos fixos do resumo da integração, montados uma vez na importação
+_SEP = "=" * 60
+
+_SUMMARY_HEADER = "\n".join([
+    "",
+    _SEP,
+    "📋 RESUMO DA INTEGRAÇÃO RAG-CLAUDE",
+    _SEP,
+    "",
+    "🚀 NOVAS FUNCIONALIDADES DISPONÍVEIS:",
+])
+
+_SUMMARY_ENDPOINTS = "\n".join([
+    "",
+    "📡 ENDPOINTS ENHANCED:",
+    "   POST /api/v1/enhanced-ai/chat-smart",
+    "        → Chat inteligente com RAG automático",
+    "   POST /api/v1/enhanced-ai/chat-rag",
+    "        → Chat garantindo uso do RAG",
+    "   POST /api/v1/enhanced-ai/chat-fallback",
+    "        → Chat com fallback robusto",
+    "   GET  /api/v1/enhanced-ai/status",
+    "        → Status do sistema RAG-Claude",
+    "   GET  /api/v1/enhanced-ai/usage-tips",
+    "        → Dicas de uso otimizado",
+])
+
+_SUMMARY_COMPONENTS = "\n".join([
+    "",
+    "🔧 COMPONENTES ATIVOS:",
+    "   Claude AI: ✅ Sempre disponível",
+    "   RAG: {rag}",
+    "   Cache: {cache}",
+])
+
+_SUMMARY_USAGE = "\n".join([
+    "",
+    "📊 STATUS DA INTEGRAÇÃO:",
+    "   GET /api/v1/integration-status",
+    "        → Verificar status completo da integração",
+    "",
+    "💡 COMO USAR:",
+    "   1. Para chat geral: POST /api/v1/enhanced-ai/chat-smart",
+    "   2. Para consultas jurídicas: POST /api/v1/enhanced-ai/chat-rag",
+    "   3. Para sistemas críticos: POST /api/v1/enhanced-ai/chat-fallback",
+])
+
+_SUMMARY_ENABLE_RAG = "\n".join([
+    "",
+    "🔧 PARA ATIVAR RAG COMPLETO:",
+    "   pip install -r requirements_rag.txt",
+    "   (Sistema funciona sem RAG usando Claude puro)",
+])
+
+_SUMMARY_FOOTER = "\n".join([
+    "",
+    "✅ COMPATIBILIDADE:",
+    "   • Rotas originais /api/v1/ai/* mantidas intactas",
+    "   • Funcionalidades existentes preservadas",
+    "   • Fallback automático para Claude original",
+    _SEP,
+])
+
+
+def _status_label(enabled: bool, active: str, inactive: str) -> str:
+    """Rótulo de status para as mensagens de integração"""
+    return active if enabled else inactive
 
 
 def integrate_rag_claude_to_app(app: Flask) -> dict:
@@ -45,29 +125,34 @@ def integrate_rag_claude_to_app(app: Flask) -> dict:
         'warnings': []
     }
     
+    # Referência única ao middleware, capturada pelo endpoint de status
+    middleware = get_rag_claude_middleware() if MIDDLEWARE_AVAILABLE else None
+    
     try:
         # 1. Registrar rotas enhanced se disponível
         if ENHANCED_ROUTES_AVAILABLE:
             register_enhanced_ai_routes(app)
             integration_status['enhanced_routes_registered'] = True
-            print("✅ Enhanced AI routes registradas em /api/v1/enhanced-ai/*")
+            _log.info("✅ Enhanced AI routes registradas em /api/v1/enhanced-ai/*")
         else:
             integration_status['warnings'].append(
                 "Enhanced routes não disponíveis - routes originais mantidas"
             )
         
         # 2. Verificar middleware
-        if MIDDLEWARE_AVAILABLE:
-            middleware = get_rag_claude_middleware()
+        if middleware is not None:
             middleware_status = middleware.get_status()
             
             integration_status['middleware_available'] = True
             integration_status['rag_enabled'] = middleware_status.get('rag_enabled', False)
             integration_status['cache_enabled'] = middleware_status.get('cache_enabled', False)
             
-            print(f"✅ Middleware RAG-Claude inicializado")
-            print(f"   RAG: {'✅ Ativo' if integration_status['rag_enabled'] else '⚠️ Indisponível'}")
-            print(f"   Cache: {'✅ Ativo' if integration_status['cache_enabled'] else '⚠️ Indisponível'}")
+            if _log.isEnabledFor(logging.INFO):
+                _log.info("✅ Middleware RAG-Claude inicializado")
+                _log.info("   RAG: %s", _status_label(
+                    integration_status['rag_enabled'], '✅ Ativo', '⚠️ Indisponível'))
+                _log.info("   Cache: %s", _status_label(
+                    integration_status['cache_enabled'], '✅ Ativo', '⚠️ Indisponível'))
             
         else:
             integration_status['warnings'].append(
@@ -75,36 +160,46 @@ def integrate_rag_claude_to_app(app: Flask) -> dict:
             )
         
         # 3. Adicionar endpoint de status da integração
+        # Base imutável congelada no primeiro acesso (a integração já terminou);
+        # a resposta só é refeita quando o middleware recalcula seu status
+        cached = {'base': None, 'middleware_status': None, 'body': None}
+        
         @app.route('/api/v1/integration-status', methods=['GET'])
         def integration_status_endpoint():
             """Endpoint para verificar status da integração RAG-Claude"""
             
-            current_status = integration_status.copy()
+            if cached['base'] is None:
+                cached['base'] = MappingProxyType(dict(integration_status))
+                cached['body'] = dict(cached['base'])
+            
+            if middleware is None:
+                return cached['body']
             
-            if MIDDLEWARE_AVAILABLE:
-                middleware = get_rag_claude_middleware()
-                current_status.update(middleware.get_status())
+            middleware_status = middleware.get_status()
+            if middleware_status is not cached['middleware_status']:
+                cached['body'] = {**cached['base'], **middleware_status}
+                cached['middleware_status'] = middleware_status
             
-            return current_status
+            return cached['body']
         
-        print("✅ Endpoint de status criado em /api/v1/integration-status")
+        _log.info("✅ Endpoint de status criado em /api/v1/integration-status")
         
         # 4. Verificar se integração foi bem-sucedida
         if integration_status['enhanced_routes_registered'] or integration_status['middleware_available']:
             integration_status['success'] = True
-            print("🎉 Integração RAG-Claude concluída com sucesso!")
+            _log.info("🎉 Integração RAG-Claude concluída com sucesso!")
         else:
             integration_status['errors'].append(
                 "Nenhum componente RAG-Claude foi integrado"
             )
-            print("❌ Falha na integração RAG-Claude")
+            _log.error("❌ Falha na integração RAG-Claude")
         
         return integration_status
         
     except Exception as e:
         error_msg = f"Erro na integração: {str(e)}"
         integration_status['errors'].append(error_msg)
-        print(f"❌ {error_msg}")
+        _log.error("❌ %s", error_msg)
         return integration_status
 
 
@@ -120,72 +215,59 @@ def setup_rag_logging(app: Flask):
         rag_logger = logging.getLogger('rag')
         rag_logger.setLevel(logging.INFO)
         
-        # Handler para arquivo se app em debug
+        # Handler para arquivo se app em debug; registros INFO/WARNING ficam
+        # em memória e vão ao arquivo em bloco (ou imediatamente se ERROR)
         if app.debug:
             handler = logging.FileHandler('logs/rag.log')
             formatter = logging.Formatter(
                 '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
             )
             handler.setFormatter(formatter)
-            rag_logger.addHandler(handler)
+            
+            buffered = logging.handlers.MemoryHandler(
+                capacity=LOG_BUFFER_CAPACITY,
+                flushLevel=logging.ERROR,
+                target=handler
+            )
+            # logging.shutdown() fecha o MemoryHandler antes do FileHandler
+            # (ordem inversa de criação), descarregando o buffer no encerramento
+            rag_logger.addHandler(buffered)
         
-        print("✅ Logging RAG configurado")
+        _log.info("✅ Logging RAG configurado")
         
     except Exception as e:
-        print(f"⚠️ Erro ao configurar logging RAG: {e}")
+        _log.warning("⚠️ Erro ao configurar logging RAG: %s", e)
 
 
 def print_integration_summary():
     """Imprime resumo das funcionalidades integradas"""
     
-    print("\n" + "="*60)
-    print("📋 RESUMO DA INTEGRAÇÃO RAG-CLAUDE")
-    print("="*60)
+    # Nada é montado quando o nível INFO está desligado (verbose=False)
+    if not _log.isEnabledFor(logging.INFO):
+        return
     
-    print("\n🚀 NOVAS FUNCIONALIDADES DISPONÍVEIS:")
+    middleware = get_rag_claude_middleware() if MIDDLEWARE_AVAILABLE else None
+    parts = [_SUMMARY_HEADER]
     
     if ENHANCED_ROUTES_AVAILABLE:
-        print("\n📡 ENDPOINTS ENHANCED:")
-        print("   POST /api/v1/enhanced-ai/chat-smart")
-        print("        → Chat inteligente com RAG automático")
-        print("   POST /api/v1/enhanced-ai/chat-rag") 
-        print("        → Chat garantindo uso do RAG")
-        print("   POST /api/v1/enhanced-ai/chat-fallback")
-        print("        → Chat com fallback robusto")
-        print("   GET  /api/v1/enhanced-ai/status")
-        print("        → Status do sistema RAG-Claude")
-        print("   GET  /api/v1/enhanced-ai/usage-tips")
-        print("        → Dicas de uso otimizado")
+        parts.append(_SUMMARY_ENDPOINTS)
     
-    if MIDDLEWARE_AVAILABLE:
-        middleware = get_rag_claude_middleware()
+    if middleware is not None:
         status = middleware.get_status()
-        
-        print("\n🔧 COMPONENTES ATIVOS:")
-        print(f"   Claude AI: ✅ Sempre disponível")
-        print(f"   RAG: {'✅ Ativo' if status.get('rag_enabled') else '❌ Instalar requirements_rag.txt'}")
-        print(f"   Cache: {'✅ Redis ativo' if status.get('cache_enabled') else '⚠️ Memória apenas'}")
-    
-    print("\n📊 STATUS DA INTEGRAÇÃO:")
-    print("   GET /api/v1/integration-status")
-    print("        → Verificar status completo da integração")
+        parts.append(_SUMMARY_COMPONENTS.format(
+            rag=_status_label(status.get('rag_enabled'), '✅ Ativo', '❌ Instalar requirements_rag.txt'),
+            cache=_status_label(status.get('cache_enabled'), '✅ Redis ativo', '⚠️ Memória apenas')
+        ))
     
-    print("\n💡 COMO USAR:")
-    print("   1. Para chat geral: POST /api/v1/enhanced-ai/chat-smart")
-    print("   2. Para consultas jurídicas: POST /api/v1/enhanced-ai/chat-rag")
-    print("   3. Para sistemas críticos: POST /api/v1/enhanced-ai/chat-fallback")
+    parts.append(_SUMMARY_USAGE)
     
-    if not MIDDLEWARE_AVAILABLE or not get_rag_claude_middleware().rag_enabled:
-        print("\n🔧 PARA ATIVAR RAG COMPLETO:")
-        print("   pip install -r requirements_rag.txt")
-        print("   (Sistema funciona sem RAG usando Claude puro)")
+    if middleware is None or not middleware.rag_enabled:
+        parts.append(_SUMMARY_ENABLE_RAG)
     
-    print("\n✅ COMPATIBILIDADE:")
-    print("   • Rotas originais /api/v1/ai/* mantidas intactas")
-    print("   • Funcionalidades existentes preservadas")
-    print("   • Fallback automático para Claude original")
+    parts.append(_SUMMARY_FOOTER)
     
-    print("="*60)
+    # Um único registro (uma escrita) para o resumo inteiro
+    _log.info("\n".join(parts))
 
 
 def verify_integration_health() -> bool:
@@ -197,7 +279,7 @@ def verify_integration_health() -> bool:
     """
     health_status = True
     
-    print("\n🔍 VERIFICANDO SAÚDE DA INTEGRAÇÃO...")
+    _log.info("🔍 VERIFICANDO SAÚDE DA INTEGRAÇÃO...")
     
     # Verificar middleware
     if MIDDLEWARE_AVAILABLE:
@@ -206,36 +288,38 @@ def verify_integration_health() -> bool:
             status = middleware.get_status()
             
             if status.get('claude_enabled', False):
-                print("   ✅ Claude service funcionando")
+                _log.info("   ✅ Claude service funcionando")
             else:
-                print("   ❌ Claude service com problemas")
+                _log.warning("   ❌ Claude service com problemas")
                 health_status = False
                 
             if status.get('rag_enabled', False):
-                print("   ✅ RAG funcionando")
+                _log.info("   ✅ RAG funcionando")
             else:
-                print("   ⚠️ RAG não disponível (esperado se requirements_rag.txt não instalado)")
+                _log.info("   ⚠️ RAG não disponível (esperado se requirements_rag.txt não instalado)")
                 
             if status.get('cache_enabled', False):
-                print("   ✅ Cache funcionando")
+                _log.info("   ✅ Cache funcionando")
             else:
-                print("   ⚠️ Cache limitado (Redis não disponível)")
+                _log.info("   ⚠️ Cache limitado (Redis não disponível)")
                 
         except Exception as e:
-            print(f"   ❌ Erro no middleware: {e}")
+            _log.error("   ❌ Erro no middleware: %s", e)
             health_status = False
     else:
-        print("   ❌ Middleware não disponível")
+        _log.warning("   ❌ Middleware não disponível")
         health_status = False
     
     # Verificar rotas
     if ENHANCED_ROUTES_AVAILABLE:
-        print("   ✅ Enhanced routes disponíveis")
+        _log.info("   ✅ Enhanced routes disponíveis")
     else:
-        print("   ⚠️ Enhanced routes não disponíveis")
+        _log.info("   ⚠️ Enhanced routes não disponíveis")
     
-    status_msg = "✅ INTEGRAÇÃO SAUDÁVEL" if health_status else "⚠️ INTEGRAÇÃO COM PROBLEMAS"
-    print(f"\n{status_msg}")
+    if health_status:
+        _log.info("✅ INTEGRAÇÃO SAUDÁVEL")
+    else:
+        _log.warning("⚠️ INTEGRAÇÃO COM PROBLEMAS")
     
     return health_status
 
@@ -252,8 +336,10 @@ def initialize_rag_claude_integration(app: Flask, verbose: bool = True) -> dict:
     Returns:
         Dict com status da integração
     """
-    if verbose:
-        print("\n🚀 INICIANDO INTEGRAÇÃO RAG-CLAUDE...")
+    # verbose controla o nível do logger em vez de condicionais espalhadas
+    _log.setLevel(logging.INFO if verbose else logging.WARNING)
+    
+    _log.info("🚀 INICIANDO INTEGRAÇÃO RAG-CLAUDE...")
     
     # Configurar logging
     setup_rag_logging(app)
@@ -261,10 +347,10 @@ def initialize_rag_claude_integration(app: Flask, verbose: bool = True) -> dict:
     # Integrar componentes
     status = integrate_rag_claude_to_app(app)
     
-    # Verificar saúde
+    # Verificar saúde (saídas informativas somem com verbose=False)
     if verbose:
         verify_integration_health()
-        print_integration_summary()
+    print_integration_summary()
     
     return status
 
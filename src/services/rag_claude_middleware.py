@@ -5,34 +5,170 @@ Middleware simples para integrar RAG ao ClaudeAIService existente
 sem quebrar compatibilidade. Para uso nas rotas.
 """
 
+import os
+import re
+import json
+import zlib
+import time
+import queue
+import atexit
+import functools
+import importlib
+import threading
 import logging
-from typing import Dict, Any, Optional
-from datetime import datetime
+import logging.handlers
+from dataclasses import dataclass, fields
+from hashlib import blake2b
+from typing import Dict, Any, List, Optional
 
-# Import seguro do service Claude existente
 try:
-    from src.services.claude_ai_service import ClaudeAIService, AIResponse
-    CLAUDE_AVAILABLE = True
+    import orjson
 except ImportError:
-    CLAUDE_AVAILABLE = False
-    ClaudeAIService = None
-    AIResponse = None
+    orjson = None
 
-# Import seguro do módulo RAG
 try:
-    from rag.mcp_integration import MCPRAGIntegration
-    RAG_AVAILABLE = True
+    import zstandard
 except ImportError:
-    RAG_AVAILABLE = False
-    MCPRAGIntegration = None
+    zstandard = None
+
+# Arquivo de log do middleware (escrito por uma thread de fundo)
+LOG_FILE = os.path.join('logs', 'rag.log')
+
+# Validade (segundos) do status em cache; protege o RAG de polling de monitores
+STATUS_TTL = 5.0
+
+# Idade máxima (segundos) do get_rag_status() reaproveitado entre status
+RAG_STATUS_MAX_AGE = 30.0
+
+# Respostas em cache acima deste tamanho (bytes de JSON) são comprimidas
+CACHE_COMPRESS_MIN_BYTES = 1024
+
+# Pré-filtro do RAG: prompts curtos ou sem termos jurídicos vão direto ao Claude
+RAG_MIN_PROMPT_CHARS = int(os.getenv('RAG_MIN_PROMPT_CHARS', '20'))
+
+# Parâmetros da consulta RAG, fixados na inicialização da integração
+RAG_MAX_CHUNKS = int(os.getenv('RAG_MAX_CHUNKS', '5'))
+RAG_SIMILARITY_THRESHOLD = float(os.getenv('RAG_SIMILARITY_THRESHOLD', '0.6'))
+
+_LEGAL_KEYWORDS = frozenset({
+    'lei', 'leis', 'artigo', 'código', 'cláusula', 'contrato', 'processo',
+    'jurisprudência', 'acórdão', 'tribunal', 'stj', 'stf', 'cpc', 'cc', 'clt',
+    'decreto', 'norma', 'instrução', 'tributário', 'tributação', 'imposto',
+    'fiscal', 'trust', 'regulamentação', 'compliance'
+})
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _looks_juridical(prompt: str) -> bool:
+    """Filtro barato antes da busca vetorial do RAG"""
+    if len(prompt) < RAG_MIN_PROMPT_CHARS:
+        return False
+    return not _LEGAL_KEYWORDS.isdisjoint(_WORD_RE.findall(prompt.lower()))
+
+
+_log = logging.getLogger(__name__)
+
+
+def _safe_import(path: str, *names: str):
+    """
+    Importa atributos opcionais de um módulo.
+    
+    Returns:
+        (disponível, tupla com os atributos ou None para cada nome)
+    """
+    try:
+        module = importlib.import_module(path)
+        return True, tuple(getattr(module, name) for name in names)
+    except ImportError as e:
+        _log.info("Dependência %s indisponível: %s", path, e)
+        return False, (None,) * len(names)
+
+
+# Imports seguros do service Claude existente, do módulo RAG e do cache
+CLAUDE_AVAILABLE, (ClaudeAIService, AIResponse) = _safe_import(
+    'src.services.claude_ai_service', 'ClaudeAIService', 'AIResponse'
+)
+RAG_AVAILABLE, (MCPRAGIntegration,) = _safe_import(
+    'rag.mcp_integration', 'MCPRAGIntegration'
+)
+CACHE_AVAILABLE, (CacheService,) = _safe_import(
+    'src.services.cache_service', 'CacheService'
+)
+
+
+# Campos do AIResponse lidos diretamente em _claude_chat
+_AIRESPONSE_FIELDS = frozenset({'success', 'content', 'usage', 'error'})
 
-# Import seguro do cache
-try:
-    from src.services.cache_service import CacheService
-    CACHE_AVAILABLE = True
-except ImportError:
-    CACHE_AVAILABLE = False
-    CacheService = None
+
+# Disponibilidade dos componentes: fixa após os imports acima, montada uma vez.
+# dict comum (e não MappingProxyType) porque o status é serializado pelo Flask
+_COMPONENTS = {
+    'claude_available': CLAUDE_AVAILABLE,
+    'rag_available': RAG_AVAILABLE,
+    'cache_available': CACHE_AVAILABLE
+}
+
+_zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+_zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+
+def _pack_cached_response(response: Dict[str, Any]) -> bytes:
+    """Serializa a resposta em JSON e comprime payloads grandes
+    
+    O primeiro byte indica o formato: R (JSON cru), Z (zstd) ou D (zlib,
+    quando zstandard não está instalado).
+    """
+    if orjson is not None:
+        blob = orjson.dumps(response, default=str)
+    else:
+        blob = json.dumps(response, default=str).encode('utf-8')
+    
+    if len(blob) <= CACHE_COMPRESS_MIN_BYTES:
+        return b'R' + blob
+    if _zstd_compressor is not None:
+        return b'Z' + _zstd_compressor.compress(blob)
+    return b'D' + zlib.compress(blob, 6)
+
+
+def _unpack_cached_response(blob: bytes) -> Dict[str, Any]:
+    """Inverso de _pack_cached_response"""
+    kind, payload = blob[:1], blob[1:]
+    if kind == b'Z':
+        payload = _zstd_decompressor.decompress(payload)
+    elif kind == b'D':
+        payload = zlib.decompress(payload)
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+
+@dataclass(slots=True)
+class ChatResult:
+    """Resultado interno de um chat; vira dict só na fronteira pública"""
+    success: bool
+    content: str = ''
+    mode: str = ''
+    error: str = ''
+    usage: Optional[Dict[str, Any]] = None
+    timestamp: float = 0.0
+    rag_sources: Optional[List[Any]] = None
+    rag_chunks: int = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Formato de resposta das rotas (o mesmo guardado no cache)"""
+        data = {
+            'success': self.success,
+            'content': self.content,
+            'mode': self.mode
+        }
+        if self.success:
+            data['usage'] = self.usage
+            data['timestamp'] = self.timestamp
+        else:
+            data['error'] = self.error
+        if self.rag_sources is not None:
+            data['rag_sources'] = self.rag_sources
+            data['rag_chunks'] = self.rag_chunks
+        return data
 
 
 class RAGClaudeMiddleware:
@@ -43,62 +179,152 @@ class RAGClaudeMiddleware:
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        self._setup_queue_logging()
         
-        # Inicializar componentes
+        # Componentes criados sob demanda (ver _ensure_*)
         self.claude_service = None
         self.rag_integration = None
         self.cache_service = None
+        self._rag_query = None
+        
+        # Status dos componentes (None = ainda não inicializado)
+        self._claude_enabled: Optional[bool] = None
+        self._rag_enabled: Optional[bool] = None
+        self._cache_enabled: Optional[bool] = None
+        self._init_lock = threading.Lock()
         
-        # Status dos componentes
-        self.claude_enabled = False
-        self.rag_enabled = False
-        self.cache_enabled = False
+        # Último status calculado e instante monotônico do cálculo
+        self._status_cache: Optional[Dict[str, Any]] = None
+        self._status_ts = 0.0
         
-        self._initialize_components()
+        # Último get_rag_status(); refeito após falha do RAG ou RAG_STATUS_MAX_AGE
+        self._rag_status_cache: Optional[Dict[str, Any]] = None
+        self._rag_status_ts = 0.0
+        self._rag_status_dirty = True
     
-    def _initialize_components(self):
-        """Inicializa componentes disponíveis"""
-        
-        # Claude service (obrigatório)
-        if CLAUDE_AVAILABLE:
-            try:
-                self.claude_service = ClaudeAIService()
-                self.claude_enabled = True
-                self.logger.info("✅ Claude service inicializado")
-            except Exception as e:
-                self.logger.error(f"❌ Falha ao inicializar Claude: {e}")
-        else:
-            self.logger.error("❌ Claude service não disponível")
+    @property
+    def claude_enabled(self) -> bool:
+        return self._ensure_claude()
+    
+    @property
+    def rag_enabled(self) -> bool:
+        return self._ensure_rag()
+    
+    @property
+    def cache_enabled(self) -> bool:
+        return self._ensure_cache()
+    
+    def _ensure_claude(self) -> bool:
+        """Inicializa o Claude service no primeiro uso (obrigatório)"""
+        if self._claude_enabled is not None:
+            return self._claude_enabled
         
-        # RAG integration (opcional)
-        if RAG_AVAILABLE:
-            try:
-                self.rag_integration = MCPRAGIntegration()
-                self.rag_enabled = self.rag_integration.is_rag_available()
-                
-                if self.rag_enabled:
-                    self.logger.info("✅ RAG integration ativada")
+        with self._init_lock:
+            if self._claude_enabled is None:
+                enabled = False
+                missing = _AIRESPONSE_FIELDS.difference(
+                    f.name for f in fields(AIResponse)
+                ) if CLAUDE_AVAILABLE else ()
+                if missing:
+                    # Versão incompatível do AIResponse: falha aqui, não a cada chat
+                    self.logger.error(
+                        f"❌ AIResponse sem os campos {sorted(missing)}"
+                    )
+                elif CLAUDE_AVAILABLE:
+                    try:
+                        self.claude_service = ClaudeAIService()
+                        enabled = True
+                        self.logger.info("✅ Claude service inicializado")
+                    except Exception as e:
+                        self.logger.error(f"❌ Falha ao inicializar Claude: {e}")
                 else:
-                    self.logger.info("⚠️ RAG disponível mas não funcional")
-                    
-            except Exception as e:
-                self.logger.warning(f"⚠️ RAG integration falhou: {e}")
-        else:
-            self.logger.info("📦 RAG não instalado - usando Claude puro")
-        
-        # Cache service (opcional)
-        if CACHE_AVAILABLE:
-            try:
-                self.cache_service = CacheService()
-                self.cache_enabled = True
-                self.logger.info("✅ Cache service ativado")
-            except Exception as e:
-                self.logger.warning(f"⚠️ Cache falhou: {e}")
-        else:
-            self.logger.info("📦 Cache não disponível")
+                    self.logger.error("❌ Claude service não disponível")
+                self._claude_enabled = enabled
+        
+        return self._claude_enabled
+    
+    def _ensure_rag(self) -> bool:
+        """Inicializa a integração RAG no primeiro uso (opcional)"""
+        if self._rag_enabled is not None:
+            return self._rag_enabled
+        
+        with self._init_lock:
+            if self._rag_enabled is None:
+                enabled = False
+                if RAG_AVAILABLE:
+                    try:
+                        self.rag_integration = MCPRAGIntegration()
+                        self._rag_query = functools.partial(
+                            self.rag_integration.juridical_query,
+                            max_chunks=RAG_MAX_CHUNKS,
+                            similarity_threshold=RAG_SIMILARITY_THRESHOLD
+                        )
+                        enabled = self.rag_integration.is_rag_available()
+                        
+                        if enabled:
+                            self.logger.info("✅ RAG integration ativada")
+                        else:
+                            self.logger.info("⚠️ RAG disponível mas não funcional")
+                            
+                    except Exception as e:
+                        self.logger.warning(f"⚠️ RAG integration falhou: {e}")
+                else:
+                    self.logger.info("📦 RAG não instalado - usando Claude puro")
+                self._rag_enabled = enabled
+        
+        return self._rag_enabled
+    
+    def _ensure_cache(self) -> bool:
+        """Inicializa o cache service no primeiro uso (opcional)"""
+        if self._cache_enabled is not None:
+            return self._cache_enabled
+        
+        with self._init_lock:
+            if self._cache_enabled is None:
+                enabled = False
+                if CACHE_AVAILABLE:
+                    try:
+                        self.cache_service = CacheService()
+                        enabled = True
+                        self.logger.info("✅ Cache service ativado")
+                    except Exception as e:
+                        self.logger.warning(f"⚠️ Cache falhou: {e}")
+                else:
+                    self.logger.info("📦 Cache não disponível")
+                self._cache_enabled = enabled
+        
+        return self._cache_enabled
+    
+    def _setup_queue_logging(self):
+        """
+        Desacopla o logging do caminho da requisição: emit() apenas
+        enfileira o registro e um QueueListener grava o arquivo.
+        """
+        if any(isinstance(h, logging.handlers.QueueHandler) for h in self.logger.handlers):
+            return
+        
+        try:
+            os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+            file_handler = logging.FileHandler(LOG_FILE)
+        except OSError as e:
+            self.logger.warning(f"⚠️ Log em arquivo indisponível: {e}")
+            return
+        
+        file_handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        ))
+        
+        log_queue: queue.Queue = queue.Queue(-1)
+        listener = logging.handlers.QueueListener(log_queue, file_handler)
+        listener.start()
+        atexit.register(listener.stop)
+        
+        self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        self.logger.propagate = False
     
     def chat(self, prompt: str, user_id: int = None,
-             use_rag: bool = True, use_cache: bool = True) -> Dict[str, Any]:
+             use_rag: bool = True, use_cache: bool = True,
+             force_rag: bool = False) -> Dict[str, Any]:
         """
         Chat inteligente com RAG opcional.
         
@@ -107,6 +333,7 @@ class RAGClaudeMiddleware:
             user_id: ID do usuário
             use_rag: Se deve tentar usar RAG
             use_cache: Se deve usar cache
+            force_rag: Consultar o RAG mesmo que o prompt não pareça jurídico
             
         Returns:
             Dict com resposta e metadados
@@ -120,40 +347,43 @@ class RAGClaudeMiddleware:
                 'mode': 'error'
             }
         
-        # Verificar cache primeiro
+        # Chave calculada uma vez; blake2b é estável entre processos, ao
+        # contrário de hash(), então workers diferentes compartilham o cache
+        cache_key = None
         if use_cache and self.cache_enabled:
-            cached = self._get_from_cache(prompt, user_id, use_rag)
+            cache_key = self._cache_key(prompt, user_id, use_rag)
+        
+        # Verificar cache primeiro
+        if cache_key:
+            cached = self._get_from_cache(cache_key)
             if cached:
                 return cached
         
-        # Tentar RAG se solicitado e disponível
-        if use_rag and self.rag_enabled:
+        # Tentar RAG se solicitado, disponível e o prompt parecer jurídico
+        if use_rag and self.rag_enabled and (force_rag or _looks_juridical(prompt)):
             rag_result = self._try_rag_chat(prompt, user_id)
-            if rag_result['success']:
+            if rag_result.success:
+                response = rag_result.to_dict()
                 # Cache o resultado
-                if use_cache and self.cache_enabled:
-                    self._save_to_cache(prompt, user_id, rag_result, True)
-                return rag_result
+                if cache_key:
+                    self._save_to_cache(cache_key, response)
+                return response
         
         # Fallback para Claude tradicional
-        claude_result = self._claude_chat(prompt, user_id)
+        response = self._claude_chat(prompt, user_id).to_dict()
         
         # Cache o resultado
-        if use_cache and self.cache_enabled:
-            self._save_to_cache(prompt, user_id, claude_result, False)
+        if cache_key:
+            self._save_to_cache(cache_key, response)
         
-        return claude_result
+        return response
     
-    def _try_rag_chat(self, prompt: str, user_id: int) -> Dict[str, Any]:
+    def _try_rag_chat(self, prompt: str, user_id: int) -> ChatResult:
         """Tenta chat com RAG"""
         
         try:
             # Consulta RAG
-            rag_response = self.rag_integration.juridical_query(
-                query=prompt,
-                max_chunks=5,
-                similarity_threshold=0.6
-            )
+            rag_response = self._rag_query(query=prompt)
             
             if rag_response.get('success', False):
                 # RAG funcionou, usar contexto enriquecido
@@ -166,34 +396,33 @@ class RAGClaudeMiddleware:
                 )
                 
                 if claude_response.success:
-                    return {
-                        'success': True,
-                        'content': claude_response.content,
-                        'mode': 'rag_enhanced',
-                        'rag_sources': rag_response.get('sources', []),
-                        'rag_chunks': len(
-                            rag_response.get('context_chunks', [])
-                        ),
-                        'usage': claude_response.usage,
-                        'timestamp': datetime.now().isoformat()
-                    }
+                    return ChatResult(
+                        success=True,
+                        content=claude_response.content,
+                        mode='rag_enhanced',
+                        rag_sources=rag_response.get('sources', []),
+                        rag_chunks=len(rag_response.get('context_chunks', [])),
+                        usage=claude_response.usage,
+                        timestamp=time.time()
+                    )
             
             # RAG não encontrou contexto relevante
-            return {
-                'success': False,
-                'error': 'RAG não encontrou contexto relevante',
-                'mode': 'rag_failed'
-            }
+            return ChatResult(
+                success=False,
+                error='RAG não encontrou contexto relevante',
+                mode='rag_failed'
+            )
             
         except Exception as e:
             self.logger.warning(f"Erro no RAG chat: {e}")
-            return {
-                'success': False,
-                'error': f'Erro no RAG: {str(e)}',
-                'mode': 'rag_error'
-            }
+            self.mark_rag_dirty()
+            return ChatResult(
+                success=False,
+                error=f'Erro no RAG: {str(e)}',
+                mode='rag_error'
+            )
     
-    def _claude_chat(self, prompt: str, user_id: int) -> Dict[str, Any]:
+    def _claude_chat(self, prompt: str, user_id: int) -> ChatResult:
         """Chat Claude tradicional"""
         
         try:
@@ -203,41 +432,45 @@ class RAGClaudeMiddleware:
             )
             
             if claude_response.success:
-                return {
-                    'success': True,
-                    'content': claude_response.content,
-                    'mode': 'claude_only',
-                    'usage': getattr(claude_response, 'usage', {}),
-                    'timestamp': datetime.now().isoformat()
-                }
+                return ChatResult(
+                    success=True,
+                    content=claude_response.content,
+                    mode='claude_only',
+                    usage=claude_response.usage,
+                    timestamp=time.time()
+                )
             else:
-                return {
-                    'success': False,
-                    'error': getattr(
-                        claude_response, 'error', 'Erro desconhecido'
-                    ),
-                    'content': '',
-                    'mode': 'claude_error'
-                }
+                return ChatResult(
+                    success=False,
+                    error=claude_response.error or 'Erro desconhecido',
+                    mode='claude_error'
+                )
                 
         except Exception as e:
             self.logger.error(f"Erro no Claude chat: {e}")
-            return {
-                'success': False,
-                'error': 'Erro interno na IA',
-                'content': ('Sistema temporariamente indisponível. '
-                           'Tente novamente.'),
-                'mode': 'critical_error'
-            }
+            return ChatResult(
+                success=False,
+                error='Erro interno na IA',
+                content=('Sistema temporariamente indisponível. '
+                         'Tente novamente.'),
+                mode='critical_error'
+            )
+    
+    @staticmethod
+    def _cache_key(prompt: str, user_id: int, with_rag: bool) -> str:
+        """Chave de cache estável para o par prompt/usuário"""
+        digest = blake2b(prompt.encode('utf-8'), digest_size=8).hexdigest()
+        return f"middleware_chat:{digest}:{user_id}:{with_rag}"
     
-    def _get_from_cache(self, prompt: str, user_id: int,
-                        with_rag: bool) -> Optional[Dict[str, Any]]:
+    def _get_from_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """Busca no cache"""
         
         try:
-            cache_key = f"middleware_chat:{hash(prompt)}:{user_id}:{with_rag}"
             cached_data = self.cache_service.get(cache_key)
             
+            if isinstance(cached_data, bytes):
+                cached_data = _unpack_cached_response(cached_data)
+            
             if cached_data:
                 cached_data['mode'] = 'cache_hit'
                 cached_data['cache_hit'] = True
@@ -248,62 +481,73 @@ class RAGClaudeMiddleware:
         
         return None
     
-    def _save_to_cache(self, prompt: str, user_id: int,
-                       response: Dict[str, Any], with_rag: bool):
+    def _save_to_cache(self, cache_key: str, response: Dict[str, Any]):
         """Salva no cache"""
         
         try:
             if response.get('success', False):
-                cache_key = f"middleware_chat:{hash(prompt)}:{user_id}:{with_rag}"
-                
                 # Cache por 30 minutos
-                self.cache_service.set(cache_key, response, ttl=1800)
+                self.cache_service.set(
+                    cache_key, _pack_cached_response(response), ttl=1800
+                )
                 
         except Exception as e:
             self.logger.warning(f"Erro ao salvar cache: {e}")
     
     def get_status(self) -> Dict[str, Any]:
-        """Status do middleware"""
+        """Status do middleware (em cache por STATUS_TTL segundos)"""
+        
+        now = time.monotonic()
+        if self._status_cache is not None and now - self._status_ts < STATUS_TTL:
+            return self._status_cache
         
         status = {
             'claude_enabled': self.claude_enabled,
             'rag_enabled': self.rag_enabled,
             'cache_enabled': self.cache_enabled,
-            'components': {
-                'claude_available': CLAUDE_AVAILABLE,
-                'rag_available': RAG_AVAILABLE,
-                'cache_available': CACHE_AVAILABLE
-            },
-            'timestamp': datetime.now().isoformat()
+            'components': _COMPONENTS,
+            'timestamp': time.time()
         }
         
-        # Detalhes do RAG se disponível
+        # Detalhes do RAG se disponível (sem nova sondagem enquanto válidos)
         if self.rag_integration:
-            try:
-                rag_status = self.rag_integration.get_rag_status()
-                status['rag_details'] = rag_status
-            except Exception as e:
-                status['rag_error'] = str(e)
+            if (self._rag_status_dirty
+                    or now - self._rag_status_ts >= RAG_STATUS_MAX_AGE):
+                try:
+                    self._rag_status_cache = {
+                        'rag_details': self.rag_integration.get_rag_status()
+                    }
+                except Exception as e:
+                    self._rag_status_cache = {'rag_error': str(e)}
+                self._rag_status_ts = now
+                self._rag_status_dirty = False
+            status.update(self._rag_status_cache)
         
+        self._status_cache = status
+        self._status_ts = now
         return status
     
+    def mark_rag_dirty(self):
+        """Força nova consulta ao get_rag_status() no próximo get_status()"""
+        self._rag_status_dirty = True
+        self._status_cache = None
+    
     def chat_with_fallback(self, prompt: str, user_id: int = None) -> Dict[str, Any]:
         """
         Chat com fallback robusto.
         Garante que sempre retorna uma resposta válida.
         """
         
-        # Tentar RAG primeiro
-        if self.rag_enabled:
-            result = self.chat(prompt, user_id, use_rag=True)
-            if result['success']:
-                return result
+        # chat() já cai para Claude puro quando o RAG falha; uma única chamada
+        result = self.chat(prompt, user_id, use_rag=self.rag_enabled)
+        if result['success']:
+            return result
         
-        # Fallback para Claude puro
-        if self.claude_enabled:
-            result = self.chat(prompt, user_id, use_rag=False)
-            if result['success']:
-                return result
+        # Nova tentativa direta só se a falha não foi uma resposta de erro do Claude
+        if self.claude_enabled and result.get('mode') != 'claude_error':
+            retry = self._claude_chat(prompt, user_id)
+            if retry.success:
+                return retry.to_dict()
         
         # Fallback final
         return {
@@ -314,16 +558,16 @@ class RAGClaudeMiddleware:
         }
 
 
-# Instância global para uso nas rotas
-rag_claude_middleware = RAGClaudeMiddleware()
-
-
+@functools.cache
 def get_rag_claude_middleware() -> RAGClaudeMiddleware:
     """
     Função para obter o middleware RAG-Claude.
     Use esta função nas rotas para chat inteligente.
+    
+    A instância é criada no primeiro uso, e cada componente (Claude, RAG,
+    cache) só é inicializado quando necessário.
     """
-    return rag_claude_middleware
+    return RAGClaudeMiddleware()
 
 
 def smart_chat(prompt: str, user_id: int = None, 
@@ -339,7 +583,7 @@ def smart_chat(prompt: str, user_id: int = None,
     Returns:
         Dict com resposta e metadados
     """
-    return rag_claude_middleware.chat(
+    return get_rag_claude_middleware().chat(
         prompt=prompt,
         user_id=user_id,
         use_rag=prefer_rag,
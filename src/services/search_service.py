@@ -6,7 +6,12 @@ e recuperação de contexto relevante para o sistema RAG.
 """
 
 import os
+import re
+import time
 import json
+import string
+import bisect
+import functools
 import numpy as np
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Tuple
@@ -14,18 +19,39 @@ from dataclasses import dataclass
 import hashlib
 import pickle
 
-# Imports para processamento de texto e embeddings
+# Imports para vetorização (sklearn/scipy)
+try:
+    from sklearn.feature_extraction.text import (HashingVectorizer, TfidfTransformer,
+                                                 ENGLISH_STOP_WORDS)
+    from sklearn.decomposition import TruncatedSVD
+    from scipy import sparse
+except ImportError:
+    HashingVectorizer = None
+    TfidfTransformer = None
+    TruncatedSVD = None
+    ENGLISH_STOP_WORDS = frozenset()
+    sparse = None
+
+# Índice ANN opcional sobre os embeddings LSA
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Autômato Aho-Corasick opcional para os highlights
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Imports para processamento de texto (NLTK)
 try:
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.metrics.pairwise import cosine_similarity
     import nltk
     from nltk.corpus import stopwords
     from nltk.tokenize import word_tokenize, sent_tokenize
     from nltk.stem import PorterStemmer
 except ImportError:
     # Fallback se bibliotecas não estiverem disponíveis
-    TfidfVectorizer = None
-    cosine_similarity = None
     nltk = None
     stopwords = None
     word_tokenize = None
@@ -33,6 +59,145 @@ except ImportError:
     PorterStemmer = None
 
 from src.models import db, DocumentoUpload, SearchIndex
+from src.services.process_pool import get_process_pool, pool_workers
+
+
+_NON_ALNUM_RE = re.compile(r'[^a-zA-Z0-9\s]')
+
+# Mesma limpeza do _NON_ALNUM_RE como tabela, para textos ASCII (fast path
+# do str.translate); textos com acentos seguem pelo regex
+_ASCII_CLEAN_TABLE = str.maketrans({
+    chr(code): ' ' for code in range(128)
+    if chr(code) not in string.ascii_letters + string.digits
+    and not chr(code).isspace()
+})
+
+_SENTENCE_END_RE = re.compile(r'[.!?]+\s+')
+
+_STEMMER = PorterStemmer() if PorterStemmer else None
+
+
+@functools.lru_cache(maxsize=None)
+def _stop_words() -> frozenset:
+    """Stopwords em inglês e português (lidas do NLTK uma única vez)"""
+    return frozenset(stopwords.words('english')) | frozenset(stopwords.words('portuguese'))
+
+
+@functools.lru_cache(maxsize=200_000)
+def _stem(token: str) -> str:
+    """Stemming com cache: o vocabulário se repete muito entre documentos"""
+    return _STEMMER.stem(token)
+
+
+@functools.lru_cache(maxsize=1024)
+def _sentence_starts(content: str) -> Tuple[int, ...]:
+    """Offsets de início de cada sentença (calculados uma vez por conteúdo)"""
+    return (0,) + tuple(m.end() for m in _SENTENCE_END_RE.finditer(content))
+
+
+def _is_word_char(char: str) -> bool:
+    """Equivalente a \\w do re"""
+    return char.isalnum() or char == '_'
+
+
+def _query_match_starts(content: str, query_words: set):
+    """
+    Offsets das ocorrências (palavras inteiras) das palavras da query.
+    
+    Com pyahocorasick, uma passada do autômato sobre o texto; sem ele (ou se
+    lower() alterar o tamanho do texto), uma alternação regex compilada.
+    """
+    lowered = content.lower()
+    
+    if ahocorasick is not None and len(lowered) == len(content):
+        automaton = ahocorasick.Automaton()
+        for word in query_words:
+            automaton.add_word(word, len(word))
+        automaton.make_automaton()
+        
+        last = len(lowered) - 1
+        for end, length in automaton.iter(lowered):
+            start = end - length + 1
+            if start > 0 and _is_word_char(lowered[start - 1]):
+                continue
+            if end < last and _is_word_char(lowered[end + 1]):
+                continue
+            yield start
+        return
+    
+    pattern = re.compile(
+        r'\b(?:' + '|'.join(map(re.escape, query_words)) + r')\b',
+        re.IGNORECASE
+    )
+    for match in pattern.finditer(content):
+        yield match.start()
+
+
+def _analyze(text: str) -> List[str]:
+    """
+    Termos (unigramas e bigramas) de um texto já pré-processado.
+    
+    O _preprocess_text já deixa só tokens [a-z0-9] separados por espaço;
+    basta um split, sem o regex e o lowercase do analisador do sklearn
+    (mesmos termos: tokens de 1 caractere e stopwords do sklearn fora).
+    """
+    tokens = [t for t in text.split() if len(t) > 1 and t not in ENGLISH_STOP_WORDS]
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def _content_hash(content: str) -> str:
+    """Hash do conteúdo (prefixo b2: distingue dos MD5 gravados antes)"""
+    return 'b2:' + hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _same_content(stored_hash: Optional[str], content: str, content_hash: str) -> bool:
+    """Compara com o hash gravado, aceitando o formato MD5 legado"""
+    if stored_hash and not stored_hash.startswith('b2:'):
+        return stored_hash == hashlib.md5(content.encode('utf-8')).hexdigest()
+    return stored_hash == content_hash
+
+
+def _replace_atomically(path: str, write) -> None:
+    """
+    Escreve em <path>.tmp e troca com os.replace: uma falha no meio da
+    escrita nunca deixa um arquivo de índice pela metade.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb', buffering=1 << 20) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _atomic_dump(obj: Any, path: str) -> None:
+    """pickle.dump atômico, no protocolo binário mais recente"""
+    _replace_atomically(
+        path, lambda f: pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    )
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normalização L2 por linha (linhas nulas permanecem nulas)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def _ranked_indices(scores: np.ndarray, candidates: np.ndarray, k: int):
+    """
+    Índices de candidates em ordem decrescente de score.
+    
+    Os k melhores saem de um argpartition (O(N)); o restante só é
+    ordenado se o consumidor pedir mais que k itens.
+    """
+    if k >= len(candidates):
+        yield from candidates[np.argsort(-scores[candidates], kind='stable')]
+        return
+    
+    top = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+    yield from top[np.argsort(-scores[top], kind='stable')]
+    
+    rest = np.setdiff1d(candidates, top, assume_unique=True)
+    yield from rest[np.argsort(-scores[rest], kind='stable')]
 
 
 @dataclass
@@ -64,9 +229,15 @@ class SearchService:
     
     def __init__(self):
         self.index_dir = os.path.join(os.getcwd(), 'search_index')
+        # Pesos IDF (TfidfTransformer); o vectorizer em si não tem estado
         self.vectorizer_path = os.path.join(self.index_dir, 'vectorizer.pkl')
-        self.index_path = os.path.join(self.index_dir, 'tfidf_index.pkl')
+        # Contagens de termos por documento (linhas na ordem de documents_data)
+        self.index_path = os.path.join(self.index_dir, 'tfidf_index.npz')
         self.documents_path = os.path.join(self.index_dir, 'documents.pkl')
+        # Projeção LSA e embeddings densos dos documentos
+        self.svd_path = os.path.join(self.index_dir, 'svd.pkl')
+        self.embeddings_path = os.path.join(self.index_dir, 'embeddings.npy')
+        self.ann_path = os.path.join(self.index_dir, 'ann.faiss')
         
         # Criar diretório se não existir
         os.makedirs(self.index_dir, exist_ok=True)
@@ -76,10 +247,52 @@ class SearchService:
         self.min_score_threshold = 0.1
         self.max_results = 20
         
+        # Alterações incrementais toleradas antes de recalcular o IDF:
+        # max(idf_refit_min, idf_refit_ratio * documentos)
+        self.idf_refit_min = 50
+        self.idf_refit_ratio = 0.1
+        
+        # Corpus a partir do qual a vetorização completa usa todos os núcleos
+        self.parallel_min_docs = 2000
+        
+        # Dimensões do embedding LSA; só usado com mais documentos que isso
+        # (0 desativa e a busca usa a matriz TF-IDF esparsa)
+        self.lsa_components = 128
+        
+        # Corpus a partir do qual a busca usa o índice HNSW (faiss) em vez da
+        # varredura completa dos embeddings
+        self.ann_min_docs = 50000
+        self.ann_ef_search = 64
+        
+        # Corpus a partir do qual a busca esparsa percorre só as listas de
+        # postings dos termos da query (cópia CSC do TF-IDF)
+        self.postings_min_docs = 5000
+        
+        # Validade (segundos) das estatísticas do índice em cache
+        self.stats_ttl = 30.0
+        self._stats_cache: Optional[IndexStats] = None
+        self._stats_ts = 0.0
+        
+        # Validade (segundos) do teste de busca completo do health check
+        self.deep_check_ttl = 60.0
+        self._deep_check_cache: Optional[int] = None
+        self._deep_check_ts = 0.0
+        
         # Inicializar componentes
-        self.vectorizer = None
+        self.vectorizer = self._create_vectorizer()
+        self.transformer = None
+        self.counts_matrix = None
         self.tfidf_matrix = None
+        self.svd = None
+        self.embeddings = None
+        self.ann = None
+        # Cópia CSC do TF-IDF e a matriz da qual foi gerada
+        self._postings = None
+        self._postings_src = None
         self.documents_data = []
+        # Posição de cada document_id em documents_data (= linha das matrizes)
+        self._id_to_idx: Dict[int, int] = {}
+        self._pending_changes = 0
         
         # Carregar índice existente
         self._load_index()
@@ -109,15 +322,26 @@ class SearchService:
             True se indexado com sucesso
         """
         try:
-            # Verificar se documento já está indexado
-            existing_index = SearchIndex.query.filter_by(
+            # Calcular hash do conteúdo
+            content_hash = _content_hash(content)
+            
+            # Verificar se documento já está indexado (só o hash é lido)
+            stored = db.session.query(SearchIndex.content_hash).filter_by(
                 document_id=document_id
             ).first()
             
-            if existing_index:
+            if stored is not None:
+                # Reenvio idêntico: nada a fazer
+                if _same_content(stored[0], content, content_hash):
+                    return True
+                
                 # Atualizar índice existente
+                existing_index = SearchIndex.query.filter_by(
+                    document_id=document_id
+                ).first()
                 return self._update_document_index(
-                    existing_index, title, content, source, category, metadata
+                    existing_index, title, content, source, category, metadata,
+                    content_hash=content_hash
                 )
             
             # Processar conteúdo
@@ -129,9 +353,6 @@ class SearchService:
             # Criar chunks do documento
             chunks = self._create_text_chunks(content)
             
-            # Calcular hash do conteúdo
-            content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
-            
             # Salvar no banco de dados
             search_index = SearchIndex(
                 document_id=document_id,
@@ -160,10 +381,8 @@ class SearchService:
                 'chunks': chunks
             }
             
-            self.documents_data.append(doc_data)
-            
-            # Reconstruir índice TF-IDF
-            self._rebuild_tfidf_index()
+            # Vetorizar só o novo documento (sem refazer o corpus)
+            self._append_to_index(doc_data)
             
             return True
             
@@ -172,6 +391,92 @@ class SearchService:
             self._log_error(f"Erro na indexação: {str(e)}")
             return False
     
+    def bulk_index_documents(self, items: List[Dict]) -> int:
+        """
+        Indexar vários documentos com um único commit
+        
+        Args:
+            items: Dicts com document_id, title e content (e opcionalmente
+                   source, category e metadata, como em index_document)
+            
+        Returns:
+            Número de documentos indexados
+        """
+        try:
+            ids = [item['document_id'] for item in items]
+            
+            # Documentos já indexados seguem o caminho de atualização
+            existing = {
+                document_id for (document_id,) in SearchIndex.query.with_entities(
+                    SearchIndex.document_id
+                ).filter(SearchIndex.document_id.in_(ids))
+            }
+            
+            rows = []
+            new_docs = []
+            updates = []
+            
+            for item in items:
+                document_id = item['document_id']
+                
+                if document_id in existing:
+                    updates.append(item)
+                    continue
+                
+                title = item['title']
+                content = item['content']
+                metadata = item.get('metadata') or {}
+                
+                processed_content = self._preprocess_text(f"{title} {content}")
+                
+                if not processed_content.strip():
+                    continue
+                
+                existing.add(document_id)
+                chunks = self._create_text_chunks(content)
+                
+                rows.append({
+                    'document_id': document_id,
+                    'title': title,
+                    'content_hash': _content_hash(content),
+                    'processed_content': processed_content,
+                    'source': item.get('source', 'unknown'),
+                    'category': item.get('category', 'general'),
+                    'metadata': metadata,
+                    'chunks': chunks,
+                    'indexed': True
+                })
+                
+                new_docs.append({
+                    'id': document_id,
+                    'title': title,
+                    'content': content,
+                    'processed_content': processed_content,
+                    'source': item.get('source', 'unknown'),
+                    'category': item.get('category', 'general'),
+                    'metadata': metadata,
+                    'chunks': chunks
+                })
+            
+            if rows:
+                db.session.bulk_insert_mappings(SearchIndex, rows)
+                db.session.commit()
+            
+            # Uma única atualização do índice para o lote inteiro
+            self._extend_index(new_docs)
+            
+            indexed = len(new_docs)
+            for item in updates:
+                if self.index_document(**item):
+                    indexed += 1
+            
+            return indexed
+            
+        except Exception as e:
+            db.session.rollback()
+            self._log_error(f"Erro na indexação em lote: {str(e)}")
+            return 0
+    
     def search(self, 
                query: str,
                category: str = None,
@@ -202,20 +507,37 @@ class SearchService:
                 return []
             
             # Verificar se índice está carregado
-            if self.vectorizer is None or self.tfidf_matrix is None:
+            if self.transformer is None or self.tfidf_matrix is None:
                 self._load_index()
             
-            if self.vectorizer is None:
+            if self.vectorizer is None or self.transformer is None or self.tfidf_matrix is None:
                 return []
             
             # Vetorizar query
-            query_vector = self.vectorizer.transform([processed_query])
-            
-            # Calcular similaridades
-            similarities = cosine_similarity(query_vector, self.tfidf_matrix).flatten()
+            query_vector = self.transformer.transform(
+                self.vectorizer.transform([processed_query])
+            )
             
-            # Obter índices dos documentos mais similares
-            similar_indices = similarities.argsort()[::-1]
+            # Com filtros, mais candidatos são ordenados de início
+            k = max_results * 4 if (category or source) else max_results
+            
+            if self.ann is not None:
+                # Vizinhos aproximados (HNSW), já ordenados por produto interno
+                scores, ids = self.ann.search(self._project(query_vector), k)
+                found = (ids[0] >= 0) & (scores[0] >= self.min_score_threshold)
+                similar_indices = ids[0][found].tolist()
+                similarities = dict(zip(similar_indices, scores[0][found].tolist()))
+            else:
+                # Linhas e query já normalizadas (L2): cosseno = produto escalar,
+                # denso (GEMV) com LSA ou esparso sobre o TF-IDF
+                if self.embeddings is not None:
+                    similarities = self.embeddings @ self._project(query_vector).ravel()
+                else:
+                    similarities = self._sparse_scores(query_vector)
+                
+                # Obter índices dos documentos mais similares acima do limiar
+                candidates = np.flatnonzero(similarities >= self.min_score_threshold)
+                similar_indices = _ranked_indices(similarities, candidates, k)
             
             results = []
             
@@ -225,9 +547,6 @@ class SearchService:
                 
                 score = similarities[idx]
                 
-                if score < self.min_score_threshold:
-                    break
-                
                 if idx >= len(self.documents_data):
                     continue
                 
@@ -277,16 +596,9 @@ class SearchService:
         """
         try:
             # Buscar documento de referência
-            ref_doc = None
-            ref_idx = None
+            ref_idx = self._id_to_idx.get(document_id)
             
-            for idx, doc_data in enumerate(self.documents_data):
-                if doc_data['id'] == document_id:
-                    ref_doc = doc_data
-                    ref_idx = idx
-                    break
-            
-            if not ref_doc:
+            if ref_idx is None:
                 return []
             
             # Verificar se índice está carregado
@@ -297,23 +609,27 @@ class SearchService:
                 return []
             
             # Calcular similaridades com o documento de referência
-            ref_vector = self.tfidf_matrix[ref_idx:ref_idx+1]
-            similarities = cosine_similarity(ref_vector, self.tfidf_matrix).flatten()
+            if self.embeddings is not None:
+                similarities = self.embeddings @ self.embeddings[ref_idx]
+            else:
+                ref_vector = self.tfidf_matrix[ref_idx:ref_idx+1]
+                similarities = (self.tfidf_matrix @ ref_vector.T).toarray().ravel()
             
             # Remover o próprio documento
             similarities[ref_idx] = 0
             
-            # Obter documentos mais similares
-            similar_indices = similarities.argsort()[::-1][:max_results]
+            # Obter documentos mais similares acima do limiar
+            candidates = np.flatnonzero(similarities >= self.min_score_threshold)
+            similar_indices = _ranked_indices(similarities, candidates, max_results)
             
             results = []
             
             for idx in similar_indices:
-                score = similarities[idx]
-                
-                if score < self.min_score_threshold:
+                if len(results) >= max_results:
                     break
                 
+                score = similarities[idx]
+                
                 doc_data = self.documents_data[idx]
                 
                 result = SearchResult(
@@ -362,6 +678,8 @@ class SearchService:
                 
                 self.documents_data.append(doc_data)
             
+            self._reindex_ids()
+            
             # Reconstruir índice TF-IDF
             return self._rebuild_tfidf_index()
             
@@ -389,14 +707,8 @@ class SearchService:
                 db.session.delete(search_index)
                 db.session.commit()
             
-            # Remover dos dados em memória
-            self.documents_data = [
-                doc for doc in self.documents_data 
-                if doc['id'] != document_id
-            ]
-            
-            # Reconstruir índice
-            self._rebuild_tfidf_index()
+            # Remover dos dados em memória (e a linha correspondente do índice)
+            self._remove_from_index(document_id)
             
             return True
             
@@ -407,48 +719,58 @@ class SearchService:
     
     def get_index_stats(self) -> IndexStats:
         """
-        Obter estatísticas do índice
+        Obter estatísticas do índice (em cache por stats_ttl segundos)
         
         Returns:
             IndexStats com estatísticas
         """
+        now = time.monotonic()
+        if self._stats_cache is not None and now - self._stats_ts < self.stats_ttl:
+            return self._stats_cache
+        
         try:
             # Estatísticas do banco
             total_docs = DocumentoUpload.query.count()
-            indexed_docs = SearchIndex.query.filter_by(indexed=True).count()
             
-            # Contar chunks
-            total_chunks = db.session.query(
-                db.func.sum(db.func.json_array_length(SearchIndex.chunks))
-            ).scalar() or 0
-            
-            # Estatísticas por categoria
+            # Uma única agregação por categoria; totais somados aqui
             category_stats = db.session.query(
                 SearchIndex.category,
-                db.func.count(SearchIndex.id).label('count')
+                db.func.count(SearchIndex.id),
+                db.func.sum(db.case((SearchIndex.indexed == True, 1), else_=0)),
+                db.func.sum(db.func.json_array_length(SearchIndex.chunks)),
+                db.func.max(SearchIndex.updated_at)
             ).group_by(SearchIndex.category).all()
             
-            categories = {cat: count for cat, count in category_stats}
+            categories = {}
+            indexed_docs = 0
+            total_chunks = 0
+            last_update = None
+            
+            for category, count, indexed, chunks, updated_at in category_stats:
+                categories[category] = count
+                indexed_docs += indexed or 0
+                total_chunks += chunks or 0
+                if updated_at and (last_update is None or updated_at > last_update):
+                    last_update = updated_at
             
             # Tamanho do índice
             index_size = 0
             if os.path.exists(self.index_path):
                 index_size = os.path.getsize(self.index_path) / (1024 * 1024)  # MB
             
-            # Última atualização
-            last_update = db.session.query(
-                db.func.max(SearchIndex.updated_at)
-            ).scalar() or datetime.utcnow()
-            
-            return IndexStats(
+            stats = IndexStats(
                 total_documents=total_docs,
                 indexed_documents=indexed_docs,
                 total_chunks=total_chunks,
                 index_size_mb=round(index_size, 2),
-                last_update=last_update,
+                last_update=last_update or datetime.utcnow(),
                 categories=categories
             )
             
+            self._stats_cache = stats
+            self._stats_ts = now
+            return stats
+            
         except Exception as e:
             self._log_error(f"Erro nas estatísticas: {str(e)}")
             return IndexStats(
@@ -460,19 +782,30 @@ class SearchService:
                 categories={}
             )
     
-    def health_check(self) -> Dict[str, Any]:
+    def health_check(self, deep: bool = False) -> Dict[str, Any]:
         """
         Verificar saúde do sistema de busca
         
+        Args:
+            deep: Executar também uma busca real (em cache por deep_check_ttl)
+            
         Returns:
             Dict com status do sistema
         """
         try:
             stats = self.get_index_stats()
             
-            # Testar busca
-            test_results = self.search("test query", max_results=1)
-            search_working = True
+            # Verificação barata: índice carregado e não vazio
+            indexed_rows = self.tfidf_matrix.shape[0] if self.tfidf_matrix is not None else 0
+            search_working = self.vectorizer is not None and indexed_rows > 0
+            
+            search_test = {
+                "working": search_working,
+                "results_count": indexed_rows
+            }
+            
+            if deep:
+                search_test["deep_results_count"] = self._deep_search_check()
             
             # Verificar arquivos de índice
             index_files_exist = {
@@ -483,7 +816,7 @@ class SearchService:
             
             # Verificar bibliotecas
             libraries_available = {
-                'sklearn': TfidfVectorizer is not None,
+                'sklearn': HashingVectorizer is not None,
                 'nltk': nltk is not None
             }
             
@@ -504,14 +837,13 @@ class SearchService:
                 },
                 "index_files": index_files_exist,
                 "libraries": libraries_available,
-                "search_test": {
-                    "working": search_working,
-                    "results_count": len(test_results)
-                },
+                "search_test": search_test,
                 "config": {
                     "max_features": self.max_features,
                     "min_score_threshold": self.min_score_threshold,
-                    "max_results": self.max_results
+                    "max_results": self.max_results,
+                    "lsa_components": self.lsa_components if self.embeddings is not None else 0,
+                    "ann_enabled": self.ann is not None
                 },
                 "last_check": datetime.utcnow().isoformat()
             }
@@ -525,6 +857,37 @@ class SearchService:
     
     # Métodos privados auxiliares
     
+    def _sparse_scores(self, query_vector) -> np.ndarray:
+        """
+        Cosseno entre a query e todas as linhas do TF-IDF.
+        
+        Em corpora grandes acumula apenas as colunas dos termos da query;
+        documentos sem termo em comum ficam com score 0, como no produto
+        completo, sem percorrer suas linhas.
+        """
+        if self.tfidf_matrix.shape[0] < self.postings_min_docs:
+            return (self.tfidf_matrix @ query_vector.T).toarray().ravel()
+        
+        # A matriz é sempre substituída (nunca alterada in-place) nas
+        # atualizações, então a identidade basta para invalidar a cópia
+        if self._postings_src is not self.tfidf_matrix:
+            self._postings = self.tfidf_matrix.tocsc()
+            self._postings_src = self.tfidf_matrix
+        
+        return self._postings[:, query_vector.indices] @ query_vector.data
+    
+    def _deep_search_check(self) -> int:
+        """Busca de teste ponta a ponta, em cache por deep_check_ttl segundos"""
+        now = time.monotonic()
+        if self._deep_check_cache is not None and now - self._deep_check_ts < self.deep_check_ttl:
+            return self._deep_check_cache
+        
+        results = self.search("test query", max_results=1)
+        
+        self._deep_check_cache = len(results)
+        self._deep_check_ts = now
+        return self._deep_check_cache
+    
     def _init_nltk(self):
         """Inicializar NLTK se disponível"""
         if nltk is None:
@@ -547,8 +910,10 @@ class SearchService:
             text = text.lower()
             
             # Remover caracteres especiais (manter apenas letras, números e espaços)
-            import re
-            text = re.sub(r'[^a-zA-Z0-9\s]', ' ', text)
+            if text.isascii():
+                text = text.translate(_ASCII_CLEAN_TABLE)
+            else:
+                text = _NON_ALNUM_RE.sub(' ', text)
             
             # Remover espaços extras
             text = ' '.join(text.split())
@@ -559,16 +924,13 @@ class SearchService:
                     # Tokenizar
                     tokens = word_tokenize(text)
                     
-                    # Remover stopwords
-                    stop_words = set(stopwords.words('english'))
-                    stop_words.update(set(stopwords.words('portuguese')))
-                    
-                    tokens = [token for token in tokens if token not in stop_words]
+                    # Remover stopwords e aplicar stemming
+                    stop_words = _stop_words()
                     
-                    # Stemming
-                    if PorterStemmer:
-                        stemmer = PorterStemmer()
-                        tokens = [stemmer.stem(token) for token in tokens]
+                    if _STEMMER:
+                        tokens = [_stem(token) for token in tokens if token not in stop_words]
+                    else:
+                        tokens = [token for token in tokens if token not in stop_words]
                     
                     text = ' '.join(tokens)
                 except:
@@ -591,18 +953,26 @@ class SearchService:
         if sent_tokenize:
             try:
                 sentences = sent_tokenize(text)
-                current_chunk = ""
+                
+                # Sentenças acumuladas em lista; o tamanho (com o espaço
+                # separador) é mantido num contador
+                buffer = []
+                buffer_len = 0
                 
                 for sentence in sentences:
-                    if len(current_chunk) + len(sentence) <= chunk_size:
-                        current_chunk += sentence + " "
+                    if buffer_len + len(sentence) <= chunk_size:
+                        buffer.append(sentence)
+                        buffer_len += len(sentence) + 1
                     else:
-                        if current_chunk.strip():
-                            chunks.append(current_chunk.strip())
-                        current_chunk = sentence + " "
+                        chunk = ' '.join(buffer).strip()
+                        if chunk:
+                            chunks.append(chunk)
+                        buffer = [sentence]
+                        buffer_len = len(sentence) + 1
                 
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
+                chunk = ' '.join(buffer).strip()
+                if chunk:
+                    chunks.append(chunk)
                 
                 return chunks
             except:
@@ -616,8 +986,22 @@ class SearchService:
         
         return chunks
     
+    def _create_vectorizer(self):
+        """Vectorizer sem estado: não precisa de fit para novos documentos"""
+        if HashingVectorizer is None:
+            return None
+        
+        return HashingVectorizer(
+            n_features=self.max_features,
+            analyzer=_analyze,
+            alternate_sign=False,
+            norm=None,
+            # float32 basta para o ranking e reduz à metade memória e banda
+            dtype=np.float32
+        )
+    
     def _rebuild_tfidf_index(self) -> bool:
-        """Reconstruir índice TF-IDF"""
+        """Reconstruir índice TF-IDF a partir de todo o corpus"""
         try:
             if not self.documents_data:
                 return True
@@ -628,45 +1012,240 @@ class SearchService:
             if not corpus:
                 return True
             
-            # Criar ou atualizar vectorizer
-            if TfidfVectorizer is None:
-                self._log_error("TfidfVectorizer não disponível")
+            if self.vectorizer is None:
+                self._log_error("HashingVectorizer não disponível")
                 return False
             
-            self.vectorizer = TfidfVectorizer(
-                max_features=self.max_features,
-                stop_words='english',
-                ngram_range=(1, 2),
-                min_df=1,
-                max_df=0.95
-            )
+            # Contagens de termos e pesos IDF
+            self.counts_matrix = self._vectorize_corpus(corpus)
             
-            # Criar matriz TF-IDF
-            self.tfidf_matrix = self.vectorizer.fit_transform(corpus)
-            
-            # Salvar índice
-            self._save_index()
-            
-            return True
+            return self._refit_idf()
             
         except Exception as e:
             self._log_error(f"Erro na reconstrução do TF-IDF: {str(e)}")
             return False
     
+    def _vectorize_corpus(self, corpus: List[str]):
+        """Contagens do corpus; em corpora grandes, em blocos paralelos"""
+        workers = pool_workers()
+        
+        if len(corpus) < self.parallel_min_docs or workers < 2:
+            return self.vectorizer.transform(corpus)
+        
+        # O HashingVectorizer não tem estado: os blocos são independentes
+        size = -(-len(corpus) // workers)
+        chunks = [corpus[i:i + size] for i in range(0, len(corpus), size)]
+        
+        parts = list(get_process_pool().map(self.vectorizer.transform, chunks))
+        
+        return sparse.vstack(parts, format='csr')
+    
+    def _refit_idf(self) -> bool:
+        """Recalcular o IDF sobre as contagens já vetorizadas e salvar"""
+        # norm='l2' deixa as linhas unitárias; a busca usa o produto escalar
+        self.transformer = TfidfTransformer(norm='l2').fit(self.counts_matrix)
+        self.tfidf_matrix = self.transformer.transform(self.counts_matrix)
+        self._pending_changes = 0
+        
+        self._fit_embeddings()
+        self._fit_ann()
+        self._save_index()
+        
+        return True
+    
+    def _fit_embeddings(self):
+        """Ajustar a projeção LSA quando o corpus comporta lsa_components"""
+        if (TruncatedSVD is None or not self.lsa_components
+                or self.tfidf_matrix.shape[0] <= self.lsa_components):
+            self.svd = None
+            self.embeddings = None
+            return
+        
+        self.svd = TruncatedSVD(n_components=self.lsa_components, random_state=0)
+        self.embeddings = _normalize_rows(
+            self.svd.fit_transform(self.tfidf_matrix).astype(np.float32)
+        )
+    
+    def _fit_ann(self):
+        """Construir o índice HNSW sobre os embeddings em corpora grandes"""
+        self.ann = None
+        
+        if (faiss is None or self.embeddings is None
+                or self.embeddings.shape[0] < self.ann_min_docs):
+            return
+        
+        # Produto interno em vetores unitários = similaridade de cosseno
+        ann = faiss.IndexHNSWFlat(self.embeddings.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        ann.hnsw.efConstruction = 200
+        ann.hnsw.efSearch = self.ann_ef_search
+        ann.add(np.ascontiguousarray(self.embeddings))
+        
+        self.ann = ann
+    
+    def _project(self, tfidf_rows) -> np.ndarray:
+        """Embeddings LSA normalizados para linhas TF-IDF"""
+        return _normalize_rows(self.svd.transform(tfidf_rows).astype(np.float32))
+    
+    def _index_changed(self, count: int = 1) -> bool:
+        """Registrar alterações incrementais; recalcula o IDF periodicamente"""
+        self._pending_changes += count
+        
+        refit_after = max(
+            self.idf_refit_min,
+            int(len(self.documents_data) * self.idf_refit_ratio)
+        )
+        if self._pending_changes >= refit_after:
+            return self._refit_idf()
+        
+        self._save_index()
+        return True
+    
+    def _append_to_index(self, doc_data: Dict) -> bool:
+        """Adicionar documento e sua linha ao índice"""
+        return self._extend_index([doc_data])
+    
+    def _extend_index(self, docs: List[Dict]) -> bool:
+        """Adicionar documentos e suas linhas ao índice em um único passo"""
+        if not docs:
+            return True
+        
+        for doc in docs:
+            self._id_to_idx[doc['id']] = len(self.documents_data)
+            self.documents_data.append(doc)
+        
+        if self.transformer is None or self.counts_matrix is None:
+            return self._rebuild_tfidf_index()
+        
+        rows = self.vectorizer.transform([doc['processed_content'] for doc in docs])
+        tfidf_rows = self.transformer.transform(rows)
+        
+        self.counts_matrix = sparse.vstack([self.counts_matrix, rows], format='csr')
+        self.tfidf_matrix = sparse.vstack([self.tfidf_matrix, tfidf_rows], format='csr')
+        
+        if self.svd is not None:
+            embeddings = self._project(tfidf_rows)
+            self.embeddings = np.vstack([self.embeddings, embeddings])
+            
+            # Novas linhas entram no fim: os ids do HNSW seguem as posições
+            if self.ann is not None:
+                self.ann.add(embeddings)
+        
+        return self._index_changed(len(docs))
+    
+    def _replace_in_index(self, idx: int, processed_content: str) -> bool:
+        """Substituir a linha de um documento já indexado"""
+        if (self.transformer is None or self.counts_matrix is None
+                or idx >= self.counts_matrix.shape[0]):
+            return self._rebuild_tfidf_index()
+        
+        row = self.vectorizer.transform([processed_content])
+        tfidf_row = self.transformer.transform(row)
+        
+        self.counts_matrix = sparse.vstack(
+            [self.counts_matrix[:idx], row, self.counts_matrix[idx + 1:]],
+            format='csr'
+        )
+        self.tfidf_matrix = sparse.vstack(
+            [self.tfidf_matrix[:idx], tfidf_row, self.tfidf_matrix[idx + 1:]],
+            format='csr'
+        )
+        
+        if self.svd is not None:
+            self.embeddings = np.vstack([
+                self.embeddings[:idx], self._project(tfidf_row),
+                self.embeddings[idx + 1:]
+            ])
+        
+        # HNSW não atualiza vetores: varredura exata até o próximo refit
+        self.ann = None
+        
+        return self._index_changed()
+    
+    def _reindex_ids(self):
+        """Recriar o mapa document_id -> posição após trocar documents_data"""
+        self._id_to_idx = {doc['id']: idx for idx, doc in enumerate(self.documents_data)}
+    
+    def _remove_from_index(self, document_id: int) -> bool:
+        """Remover documento e sua linha do índice (o último ocupa a posição)"""
+        idx = self._id_to_idx.pop(document_id, None)
+        if idx is None:
+            return True
+        
+        last = len(self.documents_data) - 1
+        moved = self.documents_data.pop()
+        if idx != last:
+            self.documents_data[idx] = moved
+            self._id_to_idx[moved['id']] = idx
+        
+        if not self.documents_data:
+            self.transformer = None
+            self.counts_matrix = None
+            self.tfidf_matrix = None
+            self.svd = None
+            self.embeddings = None
+            self.ann = None
+            self._pending_changes = 0
+            self._save_index()
+            return True
+        
+        if self.counts_matrix is None or self.counts_matrix.shape[0] != last + 1:
+            return self._rebuild_tfidf_index()
+        
+        # Mesma troca nas linhas das matrizes: a última linha vai para idx
+        rows = np.arange(last)
+        if idx != last:
+            rows[idx] = last
+        
+        self.counts_matrix = self.counts_matrix[rows]
+        self.tfidf_matrix = self.tfidf_matrix[rows]
+        
+        if self.svd is not None:
+            self.embeddings = self.embeddings[rows]
+        
+        # Remoções deslocam as posições: varredura exata até o próximo refit
+        self.ann = None
+        
+        return self._index_changed()
+    
     def _save_index(self):
         """Salvar índice em disco"""
         try:
-            # Salvar vectorizer
-            with open(self.vectorizer_path, 'wb') as f:
-                pickle.dump(self.vectorizer, f)
-            
-            # Salvar matriz TF-IDF
-            with open(self.index_path, 'wb') as f:
-                pickle.dump(self.tfidf_matrix, f)
+            # Cada arquivo é gravado em <path>.tmp e trocado por os.replace
+            # (o de embeddings pode, inclusive, estar mapeado em memória)
+            
+            # Salvar pesos IDF
+            _atomic_dump(self.transformer, self.vectorizer_path)
+            
+            # Salvar contagens (a matriz TF-IDF é derivada delas no carregamento);
+            # npz guarda só os arrays CSR, sem o custo do pickle
+            if self.counts_matrix is not None:
+                _replace_atomically(
+                    self.index_path,
+                    lambda f: sparse.save_npz(f, self.counts_matrix, compressed=False)
+                )
+            elif os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            
+            # Salvar projeção LSA e embeddings
+            if self.svd is not None:
+                _atomic_dump(self.svd, self.svd_path)
+                _replace_atomically(
+                    self.embeddings_path, lambda f: np.save(f, self.embeddings)
+                )
+            else:
+                for path in (self.svd_path, self.embeddings_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            
+            # Salvar índice HNSW
+            if self.ann is not None:
+                faiss.write_index(self.ann, self.ann_path + '.tmp')
+                os.replace(self.ann_path + '.tmp', self.ann_path)
+            elif os.path.exists(self.ann_path):
+                os.remove(self.ann_path)
             
             # Salvar dados dos documentos
-            with open(self.documents_path, 'wb') as f:
-                pickle.dump(self.documents_data, f)
+            _atomic_dump(self.documents_data, self.documents_path)
                 
         except Exception as e:
             self._log_error(f"Erro ao salvar índice: {str(e)}")
@@ -674,27 +1253,58 @@ class SearchService:
     def _load_index(self):
         """Carregar índice do disco"""
         try:
-            # Carregar vectorizer
+            # Carregar pesos IDF
             if os.path.exists(self.vectorizer_path):
                 with open(self.vectorizer_path, 'rb') as f:
-                    self.vectorizer = pickle.load(f)
+                    self.transformer = pickle.load(f)
             
-            # Carregar matriz TF-IDF
-            if os.path.exists(self.index_path):
-                with open(self.index_path, 'rb') as f:
-                    self.tfidf_matrix = pickle.load(f)
+            # Carregar contagens de termos
+            if sparse is not None and os.path.exists(self.index_path):
+                self.counts_matrix = sparse.load_npz(self.index_path).tocsr()
             
             # Carregar dados dos documentos
             if os.path.exists(self.documents_path):
                 with open(self.documents_path, 'rb') as f:
                     self.documents_data = pickle.load(f)
+                self._reindex_ids()
+            
+            # Índices no formato antigo (TfidfVectorizer) exigem rebuild_index()
+            if TfidfTransformer is None or not isinstance(self.transformer, TfidfTransformer):
+                self.transformer = None
+                self.counts_matrix = None
+            
+            if self.transformer is not None and self.counts_matrix is not None:
+                self.tfidf_matrix = self.transformer.transform(self.counts_matrix)
+            
+            # Embeddings LSA, mapeados do disco (páginas compartilhadas entre workers)
+            if (self.tfidf_matrix is not None and os.path.exists(self.svd_path)
+                    and os.path.exists(self.embeddings_path)):
+                with open(self.svd_path, 'rb') as f:
+                    self.svd = pickle.load(f)
+                self.embeddings = np.load(self.embeddings_path, mmap_mode='r')
+                
+                if self.embeddings.shape[0] != self.tfidf_matrix.shape[0]:
+                    self._fit_embeddings()
+            
+            # Índice HNSW (descartado se não cobrir todos os embeddings)
+            if faiss is not None and self.embeddings is not None and os.path.exists(self.ann_path):
+                self.ann = faiss.read_index(self.ann_path)
+                self.ann.hnsw.efSearch = self.ann_ef_search
+                
+                if self.ann.ntotal != self.embeddings.shape[0]:
+                    self._fit_ann()
                     
         except Exception as e:
             self._log_error(f"Erro ao carregar índice: {str(e)}")
             # Resetar em caso de erro
-            self.vectorizer = None
+            self.transformer = None
+            self.counts_matrix = None
             self.tfidf_matrix = None
+            self.svd = None
+            self.embeddings = None
+            self.ann = None
             self.documents_data = []
+            self._id_to_idx = {}
     
     def _generate_highlights(self, content: str, query: str, max_highlights: int = 3) -> List[str]:
         """Gerar highlights do conteúdo baseado na query"""
@@ -702,27 +1312,35 @@ class SearchService:
             if not content or not query:
                 return []
             
-            query_words = query.lower().split()
-            content_lower = content.lower()
+            query_words = set(query.lower().split())
+            
+            if not query_words:
+                return []
+            
+            starts = _sentence_starts(content)
             
             highlights = []
-            sentences = content.split('.')
+            seen = set()
             
-            for sentence in sentences:
-                sentence_lower = sentence.lower()
+            # Uma única varredura do conteúdo com todas as palavras da query
+            for position in _query_match_starts(content, query_words):
+                # Sentença que contém a ocorrência
+                idx = bisect.bisect_right(starts, position) - 1
+                if idx in seen:
+                    continue
+                seen.add(idx)
                 
-                # Verificar se a sentença contém palavras da query
-                matches = sum(1 for word in query_words if word in sentence_lower)
+                end = starts[idx + 1] if idx + 1 < len(starts) else len(content)
+                sentence = content[starts[idx]:end].strip()
                 
-                if matches > 0:
-                    # Limitar tamanho da sentença
-                    if len(sentence) > 200:
-                        sentence = sentence[:200] + "..."
-                    
-                    highlights.append(sentence.strip())
-                    
-                    if len(highlights) >= max_highlights:
-                        break
+                # Limitar tamanho da sentença
+                if len(sentence) > 200:
+                    sentence = sentence[:200] + "..."
+                
+                highlights.append(sentence)
+                
+                if len(highlights) >= max_highlights:
+                    break
             
             return highlights
             
@@ -730,17 +1348,19 @@ class SearchService:
             self._log_error(f"Erro na geração de highlights: {str(e)}")
             return []
     
-    def _update_document_index(self, search_index, title, content, source, category, metadata):
+    def _update_document_index(self, search_index, title, content, source, category, metadata,
+                               content_hash: str = None):
         """Atualizar índice de documento existente"""
         try:
-            # Processar novo conteúdo
-            processed_content = self._preprocess_text(f"{title} {content}")
-            content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
+            content_hash = content_hash or _content_hash(content)
             
             # Verificar se conteúdo mudou
-            if search_index.content_hash == content_hash:
+            if _same_content(search_index.content_hash, content, content_hash):
                 return True  # Sem mudanças
             
+            # Processar novo conteúdo
+            processed_content = self._preprocess_text(f"{title} {content}")
+            
             # Atualizar no banco
             search_index.title = title
             search_index.content_hash = content_hash
@@ -753,22 +1373,19 @@ class SearchService:
             
             db.session.commit()
             
-            # Atualizar dados em memória
-            for doc_data in self.documents_data:
-                if doc_data['id'] == search_index.document_id:
-                    doc_data.update({
-                        'title': title,
-                        'content': content,
-                        'processed_content': processed_content,
-                        'source': source,
-                        'category': category,
-                        'metadata': metadata or {},
-                        'chunks': search_index.chunks
-                    })
-                    break
-            
-            # Reconstruir índice
-            self._rebuild_tfidf_index()
+            # Atualizar dados em memória e a linha do documento no índice
+            idx = self._id_to_idx.get(search_index.document_id)
+            if idx is not None:
+                self.documents_data[idx].update({
+                    'title': title,
+                    'content': content,
+                    'processed_content': processed_content,
+                    'source': source,
+                    'category': category,
+                    'metadata': metadata or {},
+                    'chunks': search_index.chunks
+                })
+                self._replace_in_index(idx, processed_content)
             
             return True
             
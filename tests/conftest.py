@@ -0,0 +1,173 @@
+"""
+Fixtures compartilhadas pelos testes dos Services do POLARIS
+
+Services sem estado alterado pelos testes são criados uma vez por módulo;
+os que os testes reconfiguram (busca, MCP) são recriados a cada teste, e
+cache/logging são cópias profundas de uma instância construída uma só vez.
+"""
+
+import io
+import copy
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+
+# Ambiente de teste: definido uma vez, antes da coleta (alguns módulos leem
+# as variáveis ao serem importados), e restaurado ao fim da sessão
+_env = pytest.MonkeyPatch()
+
+
+def pytest_configure(config):
+    _env.setenv('TESTING', 'true')
+    _env.setenv('DATABASE_URL', 'sqlite:///:memory:')
+
+
+def pytest_unconfigure(config):
+    _env.undo()
+
+
+class _UploadFile(io.BytesIO):
+    """Arquivo enviado em memória, com o atributo filename do upload"""
+    filename = 'test.txt'
+
+
+# Mocks montados uma vez por sessão; as fixtures entregam cópias rasas.
+# Os mocks filhos (ex.: .json) são compartilhados entre as cópias, então
+# os testes não devem contar chamadas neles.
+_CLAUDE_RESPONSE_TEMPLATE = Mock(status_code=200)
+_CLAUDE_RESPONSE_TEMPLATE.json.return_value = {
+    'content': [{'text': 'Resposta do Claude'}]
+}
+
+_PROCESSOR_TEMPLATE = Mock()
+_PROCESSOR_TEMPLATE.process_document.return_value = {
+    'text': 'Texto extraído',
+    'chunks': ['chunk1', 'chunk2'],
+    'metadata': {'file_type': 'txt'}
+}
+
+_SEARCH_TEMPLATE = Mock()
+_SEARCH_TEMPLATE.index_document.return_value = True
+
+_UPLOAD_FILE_TEMPLATE = _UploadFile(b'conteudo')
+
+
+@pytest.fixture(scope="module")
+def claude_service():
+    from src.services.claude_ai_service import ClaudeAIService
+    return ClaudeAIService()
+
+
+@pytest.fixture(scope="module")
+def auth_service():
+    from src.services.auth_service import AuthService
+    return AuthService()
+
+
+@pytest.fixture(scope="module")
+def jwt_token(auth_service):
+    """Token JWT assinado uma vez por módulo"""
+    user = SimpleNamespace(id=1, username='teste', email='test@example.com')
+    token, _ = auth_service._generate_token(user)
+    return token
+
+
+@pytest.fixture(scope="module")
+def bcrypt_hash(auth_service):
+    """Hash de "senha123" calculado uma vez por módulo"""
+    return auth_service._hash_password("senha123")
+
+
+@pytest.fixture(scope="module")
+def document_processor_service():
+    from src.services.document_processor_service import DocumentProcessorService
+    return DocumentProcessorService()
+
+
+@pytest.fixture(scope="module")
+def txt_tempfile(tmp_path_factory):
+    """Arquivo TXT de teste escrito uma vez por módulo"""
+    path = tmp_path_factory.mktemp("doc") / "t.txt"
+    path.write_text("Conteúdo de teste", encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def mcp_service():
+    from src.services.mcp_service import MCPService
+    return MCPService()
+
+
+@pytest.fixture
+def search_service():
+    from src.services.search_service import SearchService
+    return SearchService()
+
+
+@pytest.fixture
+def empty_index(search_service, tmp_path):
+    """SearchService apontando para um índice vazio em diretório temporário"""
+    search_service.vectorizer_path = str(tmp_path / 'vectorizer.pkl')
+    search_service.index_path = str(tmp_path / 'tfidf_index.npz')
+    search_service.documents_path = str(tmp_path / 'documents.pkl')
+    search_service.svd_path = str(tmp_path / 'svd.pkl')
+    search_service.embeddings_path = str(tmp_path / 'embeddings.npy')
+    search_service.ann_path = str(tmp_path / 'ann.faiss')
+    search_service.documents_data = []
+    search_service._id_to_idx = {}
+    search_service.transformer = None
+    search_service.counts_matrix = None
+    search_service.tfidf_matrix = None
+    return search_service
+
+
+@pytest.fixture(scope="module")
+def pdf_service():
+    from src.services.pdf_generator_service import PDFGeneratorService
+    return PDFGeneratorService()
+
+
+@pytest.fixture(scope="session")
+def _cache_template():
+    """CacheService construído uma vez; os testes recebem cópias profundas"""
+    from src.services.cache_service import CacheService
+    return CacheService()
+
+
+@pytest.fixture(scope="session")
+def _logging_template():
+    """LoggingService construído uma vez; os testes recebem cópias profundas"""
+    from src.services.logging_service import LoggingService
+    return LoggingService()
+
+
+@pytest.fixture
+def cache_service(_cache_template):
+    return copy.deepcopy(_cache_template)
+
+
+@pytest.fixture
+def logging_service(_logging_template):
+    return copy.deepcopy(_logging_template)
+
+
+@pytest.fixture
+def claude_response():
+    """Resposta HTTP 200 simulada da API do Claude"""
+    return copy.copy(_CLAUDE_RESPONSE_TEMPLATE)
+
+
+@pytest.fixture
+def mock_file():
+    """Arquivo enviado simulado para upload"""
+    upload = copy.copy(_UPLOAD_FILE_TEMPLATE)
+    upload.seek(0)
+    return upload
+
+
+@pytest.fixture
+def upload_mocks():
+    """Par (processor, search) simulado usado no upload de documentos"""
+    return copy.copy(_PROCESSOR_TEMPLATE), copy.copy(_SEARCH_TEMPLATE)
@@ -8,327 +8,358 @@ import unittest
 import tempfile
 import os
 import sys
+import functools
+import importlib
+import importlib.util
+import pathlib
+import pytest
 from unittest.mock import patch, MagicMock
 from typing import Dict, Any
 
-# Adicionar path do projeto
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Adicionar path do projeto (uma vez, à frente dos demais)
+_ROOT = str(pathlib.Path(__file__).resolve().parents[1])
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
 
+# Dependências pesadas do RAG completo, sondadas sem importá-las
+_HAVE_RAG = all(
+    importlib.util.find_spec(name) is not None
+    for name in ("chromadb", "sentence_transformers")
+)
 
-class TestRAGSafety(unittest.TestCase):
-    """Testa segurança e fallback do módulo RAG."""
+# (módulo, classe, instanciar): devem importar mesmo sem dependências; o
+# JuridicalRAGManager só é instanciável com elas (ver TestRAGManagerSafety)
+_RAG_IMPORTS = (
+    ("rag", None, False),
+    ("rag.utils", "RAGUtils", True),
+    ("rag.document_processor", "DocumentProcessor", True),
+    ("rag.rag_manager", "JuridicalRAGManager", False),
+    ("rag.mcp_integration", "MCPRAGIntegration", True),
+)
+
+# Textos de lei usados nos testes de chunking jurídico
+_SAMPLE_LEI_TEXT = """
+        Art. 1º Esta lei estabelece normas.
+        
+        Art. 2º São considerados:
+        I - primeira definição;
+        II - segunda definição.
+        
+        Parágrafo único. Disposições gerais.
+        """
+_SAMPLE_LEI_TEXT_SHORT = "Art. 1º Teste."
+
+
+@functools.lru_cache(maxsize=None)
+def _load(module_name: str, attr: str):
+    """Importa e retorna module_name.attr, resolvido uma vez por processo."""
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def fail_on_error(message: str):
+    """Converte qualquer exceção do teste em self.fail com a mensagem dada."""
+    def decorator(test):
+        @functools.wraps(test)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return test(self, *args, **kwargs)
+            except Exception as e:
+                self.fail(f"{message}: {e}")
+        return wrapper
+    return decorator
+
+
+class SharedInstanceTestCase(unittest.TestCase):
+    """
+    Importa e instancia (module, class) de `shared` uma vez por classe;
+    os testes usam a instância compartilhada, sem alterá-la.
+    """
     
-    def test_import_safety(self):
-        """Testa se imports opcionais funcionam corretamente."""
+    shared = None
+    # Cria tmp_path, um diretório temporário da classe, removido ao final
+    uses_tmp_path = False
+    
+    @classmethod
+    def setUpClass(cls):
+        if cls.uses_tmp_path:
+            tmp = tempfile.TemporaryDirectory()
+            cls.addClassCleanup(tmp.cleanup)
+            cls.tmp_path = pathlib.Path(tmp.name)
+        
+        cls.instance, cls.init_error = None, None
+        if cls.shared is None:
+            return
         
-        # Deve importar sem erro mesmo sem dependências
+        module_name, class_name = cls.shared
         try:
-            from rag import __init__
-            success = True
-        except ImportError:
-            success = False
+            cls.instance = _load(module_name, class_name)()
+        except Exception as e:
+            cls.init_error = e
+    
+    def shared_instance(self):
+        """Instância compartilhada; propaga o erro de import/inicialização."""
+        if self.instance is None:
+            raise self.init_error
+        return self.instance
+
+
+class TestRAGSafety(SharedInstanceTestCase):
+    """Testa segurança e fallback do módulo RAG."""
+    
+    shared = ('rag.mcp_integration', 'MCPRAGIntegration')
+    
+    def test_all_imports(self):
+        """Testa se os módulos RAG importam (e instanciam) sem as dependências."""
         
-        self.assertTrue(success, "Import do módulo RAG deve ser seguro")
+        for module_name, attr, construct in _RAG_IMPORTS:
+            with self.subTest(module=module_name):
+                try:
+                    module = importlib.import_module(module_name)
+                    if attr is not None:
+                        cls = _load(module_name, attr)
+                        if construct:
+                            self.assertIsNotNone(cls())
+                except Exception as e:
+                    self.fail(f"{module_name} deve importar com segurança: {e}")
     
+    @fail_on_error("MCPRAGIntegration deve funcionar com fallback")
     def test_mcp_integration_fallback(self):
         """Testa fallback seguro da integração MCP."""
         
-        try:
-            from rag.mcp_integration import MCPRAGIntegration
-            
-            # Inicializar sem dependências RAG
-            integration = MCPRAGIntegration()
-            
-            # Deve funcionar mesmo com dependências ausentes
-            self.assertIsNotNone(integration)
-            
-            # Status deve indicar disponibilidade corretamente
-            status = integration.get_rag_status()
-            self.assertIsInstance(status, dict)
-            self.assertIn("available", status)
-            
-        except Exception as e:
-            self.fail(f"MCPRAGIntegration deve funcionar com fallback: {e}")
+        # Inicializada sem dependências RAG; deve funcionar mesmo assim
+        integration = self.shared_instance()
+        
+        # Status deve indicar disponibilidade corretamente
+        status = integration.get_rag_status()
+        self.assertIsInstance(status, dict)
+        self.assertIn("available", status)
     
+    @fail_on_error("Verificação de disponibilidade falhou")
     def test_rag_availability_check(self):
         """Testa verificação de disponibilidade do RAG."""
         
-        try:
-            from rag.mcp_integration import MCPRAGIntegration
-            
-            integration = MCPRAGIntegration()
-            available = integration.is_rag_available()
-            
-            # Deve retornar boolean
-            self.assertIsInstance(available, bool)
-            
-        except Exception as e:
-            self.fail(f"Verificação de disponibilidade falhou: {e}")
+        available = self.shared_instance().is_rag_available()
+        
+        # Deve retornar boolean
+        self.assertIsInstance(available, bool)
 
 
-class TestRAGUtilsBasic(unittest.TestCase):
+class TestRAGUtilsBasic(SharedInstanceTestCase):
     """Testa utilitários básicos do RAG."""
     
-    def test_utils_import(self):
-        """Testa import dos utilitários."""
-        
-        try:
-            from rag.utils import RAGUtils
-            utils = RAGUtils()
-            self.assertIsNotNone(utils)
-        except Exception as e:
-            self.fail(f"RAGUtils deve importar: {e}")
+    shared = ('rag.utils', 'RAGUtils')
+    uses_tmp_path = True
     
+    @fail_on_error("Validação de arquivo falhou")
     def test_file_validation(self):
         """Testa validação de arquivos."""
         
-        try:
-            from rag.utils import RAGUtils
-            utils = RAGUtils()
-            
-            # Testar arquivo inexistente
-            result = utils.validate_file("/arquivo/inexistente.pdf")
-            self.assertFalse(result)
-            
-            # Testar extensão inválida
-            with tempfile.NamedTemporaryFile(suffix=".xyz") as tmp:
-                result = utils.validate_file(tmp.name)
-                self.assertFalse(result)
-                
-        except Exception as e:
-            self.fail(f"Validação de arquivo falhou: {e}")
+        utils = self.shared_instance()
+        
+        # Testar arquivo inexistente
+        result = utils.validate_file("/arquivo/inexistente.pdf")
+        self.assertFalse(result)
+        
+        # Testar extensão inválida
+        path = self.tmp_path / "bogus.xyz"
+        path.write_bytes(b"")
+        result = utils.validate_file(str(path))
+        self.assertFalse(result)
     
+    @fail_on_error("Chunking jurídico falhou")
     def test_juridical_chunking(self):
         """Testa chunking jurídico básico."""
         
-        try:
-            from rag.utils import RAGUtils
-            utils = RAGUtils()
-            
-            sample_text = """
-            Art. 1º Esta lei estabelece normas.
-            
-            Art. 2º São considerados:
-            I - primeira definição;
-            II - segunda definição.
-            
-            Parágrafo único. Disposições gerais.
-            """
-            
-            chunks = utils.chunk_juridical_document(
-                sample_text, 
-                doc_type="lei"
-            )
-            
-            self.assertIsInstance(chunks, list)
-            self.assertGreater(len(chunks), 0)
-            
-            # Verificar estrutura dos chunks
-            for chunk in chunks:
-                self.assertIsInstance(chunk, dict)
-                self.assertIn("text", chunk)
-                self.assertIn("metadata", chunk)
-                
-        except Exception as e:
-            self.fail(f"Chunking jurídico falhou: {e}")
+        utils = self.shared_instance()
+        
+        chunks = utils.chunk_juridical_document(
+            _SAMPLE_LEI_TEXT, 
+            doc_type="lei"
+        )
+        
+        self.assertIsInstance(chunks, list)
+        self.assertGreater(len(chunks), 0)
+        
+        # Verificar estrutura dos chunks
+        for chunk in chunks:
+            self.assertIsInstance(chunk, dict)
+            self.assertIn("text", chunk)
+            self.assertIn("metadata", chunk)
 
 
-class TestDocumentProcessor(unittest.TestCase):
+class TestDocumentProcessor(SharedInstanceTestCase):
     """Testa processador de documentos."""
     
-    def test_processor_import(self):
-        """Testa import do processador."""
-        
-        try:
-            from rag.document_processor import DocumentProcessor
-            processor = DocumentProcessor()
-            self.assertIsNotNone(processor)
-        except Exception as e:
-            self.fail(f"DocumentProcessor deve importar: {e}")
+    shared = ('rag.document_processor', 'DocumentProcessor')
+    uses_tmp_path = True
     
+    @fail_on_error("Extração de texto falhou")
     def test_text_extraction(self):
         """Testa extração de texto básica."""
         
-        try:
-            from rag.document_processor import DocumentProcessor
-            processor = DocumentProcessor()
-            
-            # Criar arquivo de texto temporário
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', 
-                                           delete=False) as tmp:
-                tmp.write("Conteúdo de teste do documento jurídico.")
-                tmp.flush()
-                
-                try:
-                    # Tentar extrair texto
-                    result = processor.extract_text(tmp.name)
-                    
-                    self.assertIsInstance(result, dict)
-                    self.assertIn("success", result)
-                    
-                    if result["success"]:
-                        self.assertIn("text", result)
-                        self.assertIn("Conteúdo de teste", result["text"])
-                    
-                finally:
-                    os.unlink(tmp.name)
-                    
-        except Exception as e:
-            self.fail(f"Extração de texto falhou: {e}")
+        processor = self.shared_instance()
+        
+        # Criar arquivo de texto no diretório temporário da classe
+        path = self.tmp_path / "doc.txt"
+        path.write_text("Conteúdo de teste do documento jurídico.", encoding="utf-8")
+        
+        # Tentar extrair texto
+        result = processor.extract_text(str(path))
+        
+        self.assertIsInstance(result, dict)
+        self.assertIn("success", result)
+        
+        if result["success"]:
+            self.assertIn("text", result)
+            self.assertIn("Conteúdo de teste", result["text"])
 
 
 class TestRAGManagerSafety(unittest.TestCase):
     """Testa segurança do gerenciador RAG."""
     
-    def test_manager_import(self):
-        """Testa import do gerenciador."""
-        
-        try:
-            from rag.rag_manager import JuridicalRAGManager
-            # Deve importar mesmo sem dependências
-            self.assertTrue(True)
-        except Exception as e:
-            self.fail(f"RAGManager deve importar com segurança: {e}")
-    
+    @unittest.skipUnless(_HAVE_RAG, "Dependências RAG ausentes")
     def test_manager_initialization_fallback(self):
-        """Testa inicialização com fallback."""
+        """Testa inicialização com as dependências RAG instaladas."""
         
         try:
-            from rag.rag_manager import JuridicalRAGManager
-            
-            # Tentar inicializar (pode falhar graciosamente)
-            try:
-                manager = JuridicalRAGManager()
-                self.assertIsNotNone(manager)
-            except Exception:
-                # Falha esperada se dependências não instaladas
-                pass
-                
+            JuridicalRAGManager = _load("rag.rag_manager", "JuridicalRAGManager")
         except ImportError:
             self.fail("Import do RAGManager deve ser seguro")
+        
+        manager = JuridicalRAGManager()
+        self.assertIsNotNone(manager)
 
 
-class TestFullIntegration(unittest.TestCase):
+class TestFullIntegration(SharedInstanceTestCase):
     """Testa integração completa com fallback."""
     
+    shared = ('rag.mcp_integration', 'MCPRAGIntegration')
+    
+    @fail_on_error("Integração completa falhou")
     def test_complete_workflow_fallback(self):
         """Testa fluxo completo com fallback."""
         
-        try:
-            from rag.mcp_integration import MCPRAGIntegration
-            
-            integration = MCPRAGIntegration()
-            
-            # Testar consulta (deve usar fallback se RAG indisponível)
-            query = "Teste de consulta jurídica"
-            response = integration.juridical_query(query)
-            
-            self.assertIsInstance(response, dict)
-            self.assertIn("success", response)
-            self.assertIn("response", response)
-            
-            # Se falhou, deve ter mensagem explicativa
-            if not response["success"]:
-                self.assertIn("error", response)
-                
-        except Exception as e:
-            self.fail(f"Integração completa falhou: {e}")
+        integration = self.shared_instance()
+        
+        # Testar consulta (deve usar fallback se RAG indisponível)
+        query = "Teste de consulta jurídica"
+        response = integration.juridical_query(query)
+        
+        self.assertIsInstance(response, dict)
+        self.assertIn("success", response)
+        self.assertIn("response", response)
+        
+        # Se falhou, deve ter mensagem explicativa
+        if not response["success"]:
+            self.assertIn("error", response)
     
+    @fail_on_error("Status reporting falhou")
     def test_status_reporting(self):
         """Testa relatório de status."""
         
-        try:
-            from rag.mcp_integration import MCPRAGIntegration
-            
-            integration = MCPRAGIntegration()
-            status = integration.get_rag_status()
-            
-            # Status deve sempre retornar estrutura válida
-            self.assertIsInstance(status, dict)
-            self.assertIn("available", status)
-            self.assertIn("timestamp", status)
-            
-            # Se disponível, deve ter mais detalhes
-            if status["available"]:
-                self.assertIn("document_count", status)
-            else:
-                self.assertIn("reason", status)
-                
-        except Exception as e:
-            self.fail(f"Status reporting falhou: {e}")
+        status = self.shared_instance().get_rag_status()
+        
+        # Status deve sempre retornar estrutura válida
+        self.assertIsInstance(status, dict)
+        self.assertIn("available", status)
+        self.assertIn("timestamp", status)
+        
+        # Se disponível, deve ter mais detalhes
+        if status["available"]:
+            self.assertIn("document_count", status)
+        else:
+            self.assertIn("reason", status)
 
 
 def run_safety_checks():
     """Executa verificações de segurança básicas."""
     
-    print("🔒 Executando verificações de segurança...")
-    
-    # 1. Verificar imports seguros
-    try:
-        import rag
-        print("✅ Import do módulo RAG: OK")
-    except Exception as e:
-        print(f"❌ Import do módulo RAG: {e}")
-        return False
-    
-    # 2. Verificar MCPRAGIntegration
-    try:
-        from rag.mcp_integration import MCPRAGIntegration
-        integration = MCPRAGIntegration()
-        status = integration.get_rag_status()
-        print(f"✅ MCPRAGIntegration: OK (disponível: {status['available']})")
-    except Exception as e:
-        print(f"❌ MCPRAGIntegration: {e}")
-        return False
+    # Saída acumulada e escrita de uma vez, inclusive ao abortar
+    out = ["🔒 Executando verificações de segurança..."]
     
-    # 3. Verificar fallback
     try:
-        from rag.mcp_integration import MCPRAGIntegration
-        integration = MCPRAGIntegration()
-        response = integration.juridical_query("teste")
-        print(f"✅ Fallback funcionando: {response['success']}")
-    except Exception as e:
-        print(f"❌ Fallback: {e}")
-        return False
-    
-    print("🎉 Todas as verificações de segurança passaram!")
-    return True
+        # 1. Verificar imports seguros
+        try:
+            import rag
+            out.append("✅ Import do módulo RAG: OK")
+        except Exception as e:
+            out.append(f"❌ Import do módulo RAG: {e}")
+            return False
+        
+        # 2. Verificar MCPRAGIntegration
+        try:
+            integration = _load("rag.mcp_integration", "MCPRAGIntegration")()
+            status = integration.get_rag_status()
+            out.append(f"✅ MCPRAGIntegration: OK (disponível: {status['available']})")
+        except Exception as e:
+            out.append(f"❌ MCPRAGIntegration: {e}")
+            return False
+        
+        # 3. Verificar fallback (mesma instância da verificação anterior)
+        try:
+            response = integration.juridical_query("teste")
+            out.append(f"✅ Fallback funcionando: {response['success']}")
+        except Exception as e:
+            out.append(f"❌ Fallback: {e}")
+            return False
+        
+        out.append("🎉 Todas as verificações de segurança passaram!")
+        return True
+    finally:
+        print("\n".join(out))
 
 
 def run_feature_tests():
     """Executa testes de funcionalidades se disponíveis."""
     
-    print("\n🧪 Testando funcionalidades disponíveis...")
+    # Saída acumulada e escrita de uma vez ao final
+    out = ["\n🧪 Testando funcionalidades disponíveis..."]
     
     try:
-        from rag.mcp_integration import MCPRAGIntegration
-        integration = MCPRAGIntegration()
+        integration = _load("rag.mcp_integration", "MCPRAGIntegration")()
         
         if integration.is_rag_available():
-            print("✅ RAG totalmente disponível - testando recursos avançados")
+            out.append("✅ RAG totalmente disponível - testando recursos avançados")
             
             # Testar busca semântica se disponível
             try:
-                from rag.rag_manager import JuridicalRAGManager
-                manager = JuridicalRAGManager()
-                print("✅ RAGManager inicializado")
+                manager = _load("rag.rag_manager", "JuridicalRAGManager")()
+                out.append("✅ RAGManager inicializado")
                 
                 # Testar utils
-                from rag.utils import RAGUtils
-                utils = RAGUtils()
+                utils = _load("rag.utils", "RAGUtils")()
                 chunks = utils.chunk_juridical_document(
-                    "Art. 1º Teste.", 
+                    _SAMPLE_LEI_TEXT_SHORT, 
                     doc_type="lei"
                 )
-                print(f"✅ Chunking jurídico: {len(chunks)} chunks")
+                out.append(f"✅ Chunking jurídico: {len(chunks)} chunks")
                 
             except Exception as e:
-                print(f"⚠️ Alguns recursos avançados indisponíveis: {e}")
+                out.append(f"⚠️ Alguns recursos avançados indisponíveis: {e}")
         else:
-            print("⚠️ RAG não totalmente disponível - usando fallback")
+            out.append("⚠️ RAG não totalmente disponível - usando fallback")
             
     except Exception as e:
-        print(f"❌ Erro nos testes de funcionalidade: {e}")
+        out.append(f"❌ Erro nos testes de funcionalidade: {e}")
+    
+    print("\n".join(out))
+
+
+class _ResultCounter:
+    """Plugin pytest que conta resultados para o resumo do main()."""
+    
+    def __init__(self):
+        self.tests_run = 0
+        self.failures = 0
+        self.errors = 0
+    
+    def pytest_runtest_logreport(self, report):
+        if report.when == "call":
+            self.tests_run += 1
+            self.failures += report.failed
+        elif report.failed:
+            # Falha em setup/teardown conta como erro, como no unittest
+            self.errors += 1
 
 
 def main():
@@ -337,40 +368,44 @@ def main():
     print("🚀 Iniciando testes do módulo RAG")
     print("=" * 50)
     
-    # Verificações de segurança primeiro
-    if not run_safety_checks():
-        print("❌ Testes de segurança falharam!")
-        return False
-    
-    # Testes de funcionalidade
-    run_feature_tests()
+    # Verificações prévias só com POLARIS_SMOKE: os testes unitários já
+    # cobrem os mesmos imports, inicializações e fallback
+    if os.environ.get("POLARIS_SMOKE"):
+        # Verificações de segurança primeiro
+        if not run_safety_checks():
+            print("❌ Testes de segurança falharam!")
+            return False
+        
+        # Testes de funcionalidade
+        run_feature_tests()
     
-    # Executar unittest
+    # Executar testes unitários via pytest
     print("\n🔬 Executando testes unitários...")
     
-    # Descobrir e executar testes
-    loader = unittest.TestLoader()
-    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    # Classes independentes: com pytest-xdist, distribui entre os núcleos
+    args = [__file__, "-v"]
+    if importlib.util.find_spec("xdist") is not None:
+        args += ["-n", "auto"]
     
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
+    result = _ResultCounter()
+    success = pytest.main(args, plugins=[result]) == pytest.ExitCode.OK
     
     # Resumo final
     print("\n" + "=" * 50)
-    if result.wasSuccessful():
+    if success:
         print("✅ Todos os testes passaram!")
         print("🎯 Módulo RAG está funcionando corretamente")
     else:
-        print(f"❌ {len(result.failures)} falhas, {len(result.errors)} erros")
+        print(f"❌ {result.failures} falhas, {result.errors} erros")
         print("⚠️ Verifique as dependências e configurações")
     
     print("\n📋 Resumo:")
-    print(f"   Testes executados: {result.testsRun}")
-    print(f"   Falhas: {len(result.failures)}")
-    print(f"   Erros: {len(result.errors)}")
+    print(f"   Testes executados: {result.tests_run}")
+    print(f"   Falhas: {result.failures}")
+    print(f"   Erros: {result.errors}")
     
-    return result.wasSuccessful()
+    return success
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(0 if main() else 1)
@@ -2,347 +2,847 @@
 Testes unitários para Services do POLARIS
 
 Testa todas as funcionalidades críticas dos services implementados.
+Os services vêm das fixtures de tests/conftest.py.
 """
 
-import unittest
 from unittest.mock import Mock, patch, MagicMock
+import copy
+import importlib.util
 import tempfile
 import os
 import json
+import time
+import asyncio
+import logging
+import sys
 from datetime import datetime
+from types import SimpleNamespace
+from concurrent.futures import Future
 
-# Configurar ambiente de teste
-os.environ['TESTING'] = 'true'
-os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+import httpx
+import pytest
+import requests
 
-from src.services.claude_ai_service import ClaudeAIService
-from src.services.auth_service import AuthService
-from src.services.document_processor_service import DocumentProcessorService
-from src.services.mcp_service import MCPService
-from src.services.search_service import SearchService
-from src.services.cache_service import CacheService
-from src.services.logging_service import LoggingService
+from src.services.mcp_service import (RateLimiter, SOURCES, _DEFAULT_SUMMARIES,
+                                      _extract_content)
+from src.services.search_service import IndexStats, _ranked_indices
+from src.services.pdf_generator_service import (_PlaceholderTemplate,
+                                                FLUSH_MAX_ATTEMPTS,
+                                                PDF_CACHE_MAX_AGE)
+from src.services.logging_service import (LoggingService, LogLevel,
+                                          BufferedRotatingFileHandler)
 
 
-class TestClaudeAIService(unittest.TestCase):
+# Query acima do limite de 1000 caracteres da busca
+_LONG_QUERY = "a" * 1001
+
+
+class TestClaudeAIService:
     """Testes para ClaudeAIService"""
     
-    def setUp(self):
-        self.service = ClaudeAIService()
-    
-    @patch('src.services.claude_ai_service.requests.post')
-    def test_chat_success(self, mock_post):
+    def test_chat_success(self, claude_service, claude_response, monkeypatch):
         """Testa chat com Claude AI"""
-        # Mock da resposta da API
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            'content': [{'text': 'Resposta do Claude'}]
-        }
-        mock_post.return_value = mock_response
+        monkeypatch.setattr(requests, 'post', Mock(return_value=claude_response))
+        # Sem API key o service responde em modo simulação, sem chamar a API
+        monkeypatch.setattr(claude_service, 'api_key', 'chave-teste')
         
         # Executar teste
-        result = self.service.chat(
-            prompt="Teste",
-            user_id=1,
-            use_rag=False
-        )
+        result = claude_service.chat(prompt="Teste", user_id=1)
         
         # Verificar resultado
-        self.assertTrue(result['success'])
-        self.assertIn('response', result)
-        self.assertEqual(result['response'], 'Resposta do Claude')
+        assert result.success
+        assert result.content == 'Resposta do Claude'
     
-    def test_chat_validation(self):
+    @pytest.mark.xfail(reason="ClaudeAIService.chat ainda não valida prompt vazio nem user_id",
+                       strict=True)
+    def test_chat_validation(self, claude_service):
         """Testa validação de entrada do chat"""
-        with self.assertRaises(ValueError):
-            self.service.chat(prompt="", user_id=1)
+        with pytest.raises(ValueError):
+            claude_service.chat(prompt="", user_id=1)
         
-        with self.assertRaises(ValueError):
-            self.service.chat(prompt="teste", user_id=None)
-    
-    def test_health_check(self):
-        """Testa health check do service"""
-        health = self.service.health_check()
-        
-        self.assertIn('status', health)
-        self.assertIn('timestamp', health)
+        with pytest.raises(ValueError):
+            claude_service.chat(prompt="teste", user_id=None)
+
 
+@pytest.mark.parametrize("service_name, required_keys", [
+    ("claude", {'status', 'last_test'}),
+    ("mcp", {'status', 'last_check'}),
+    ("search", {'status', 'last_check'}),
+], ids=["claude", "mcp", "search"])
+def test_health_schema(request, service_name, required_keys):
+    """Testa o formato do health check de cada service"""
+    service = request.getfixturevalue(f"{service_name}_service")
+    assert required_keys <= service.health_check().keys()
 
-class TestAuthService(unittest.TestCase):
+
+class TestAuthService:
     """Testes para AuthService"""
     
-    def setUp(self):
-        self.service = AuthService()
-    
-    def test_generate_token(self):
+    def test_generate_token(self, jwt_token):
         """Testa geração de token JWT"""
-        user_data = {'id': 1, 'email': 'test@example.com'}
-        token = self.service.generate_token(user_data)
-        
-        self.assertIsInstance(token, str)
-        self.assertTrue(len(token) > 50)
+        assert isinstance(jwt_token, str)
+        assert len(jwt_token) > 50
     
-    def test_validate_token(self):
+    def test_validate_token(self, auth_service, jwt_token):
         """Testa validação de token JWT"""
-        user_data = {'id': 1, 'email': 'test@example.com'}
-        token = self.service.generate_token(user_data)
-        
-        # Token válido
-        decoded = self.service.validate_token(token)
-        self.assertEqual(decoded['id'], 1)
-        self.assertEqual(decoded['email'], 'test@example.com')
+        # Token válido (o usuário do token precisa existir no banco)
+        with patch('src.services.auth_service.User'):
+            decoded = auth_service.validate_token(jwt_token)
+        assert decoded.is_valid
+        assert decoded.user_id == 1
+        assert decoded.email == 'test@example.com'
         
         # Token inválido
-        invalid_decoded = self.service.validate_token('token_invalido')
-        self.assertIsNone(invalid_decoded)
+        invalid_decoded = auth_service.validate_token('token_invalido')
+        assert not invalid_decoded.is_valid
     
-    def test_hash_password(self):
+    def test_hash_password(self, bcrypt_hash):
         """Testa hash de senha"""
-        password = "senha123"
-        hashed = self.service.hash_password(password)
-        
-        self.assertNotEqual(password, hashed)
-        self.assertTrue(len(hashed) > 50)
+        assert "senha123" != bcrypt_hash
+        assert len(bcrypt_hash) > 50
     
-    def test_verify_password(self):
+    def test_verify_password(self, auth_service, bcrypt_hash):
         """Testa verificação de senha"""
-        password = "senha123"
-        hashed = self.service.hash_password(password)
-        
         # Senha correta
-        self.assertTrue(self.service.verify_password(password, hashed))
+        assert auth_service._verify_password("senha123", bcrypt_hash)
         
         # Senha incorreta
-        self.assertFalse(self.service.verify_password("senha_errada", hashed))
+        assert not auth_service._verify_password("senha_errada", bcrypt_hash)
 
 
-class TestDocumentProcessorService(unittest.TestCase):
+class TestDocumentProcessorService:
     """Testes para DocumentProcessorService"""
     
-    def setUp(self):
-        self.service = DocumentProcessorService()
-    
-    def test_extract_text_from_txt(self):
+    def test_extract_text_from_txt(self, document_processor_service, txt_tempfile):
         """Testa extração de texto de arquivo TXT"""
-        # Criar arquivo temporário
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-            f.write("Conteúdo de teste")
-            temp_path = f.name
-        
-        try:
-            # Testar extração
-            text = self.service.extract_text(temp_path)
-            self.assertEqual(text.strip(), "Conteúdo de teste")
-        finally:
-            os.unlink(temp_path)
-    
-    def test_chunk_text(self):
+        text = document_processor_service._extract_content(txt_tempfile, '.txt')
+        assert text.strip() == "Conteúdo de teste"
+    
+    def test_chunk_text(self, document_processor_service, monkeypatch):
         """Testa divisão de texto em chunks"""
         text = "Este é um texto longo que precisa ser dividido em chunks menores para processamento."
+        monkeypatch.setattr(document_processor_service, 'chunk_size', 20)
+        monkeypatch.setattr(document_processor_service, 'chunk_overlap', 5)
         
-        chunks = self.service.chunk_text(text, chunk_size=20)
+        chunks = document_processor_service._create_chunks(text)
         
-        self.assertIsInstance(chunks, list)
-        self.assertTrue(len(chunks) > 1)
-        for chunk in chunks:
-            self.assertTrue(len(chunk) <= 25)  # Margem para palavras completas
+        assert isinstance(chunks, list)
+        assert len(chunks) > 1
+        assert max(len(chunk.content) for chunk in chunks) <= 25  # Margem para palavras completas
     
-    def test_extract_metadata(self):
+    @pytest.mark.xfail(reason="DocumentProcessorService não expõe extract_metadata; "
+                              "os metadados só são montados em upload_document",
+                       raises=AttributeError, strict=True)
+    def test_extract_metadata(self, document_processor_service, txt_tempfile):
         """Testa extração de metadados"""
-        # Criar arquivo temporário
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-            f.write("Conteúdo de teste")
-            temp_path = f.name
+        metadata = document_processor_service.extract_metadata(txt_tempfile)
         
-        try:
-            metadata = self.service.extract_metadata(temp_path)
-            
-            self.assertIn('file_size', metadata)
-            self.assertIn('file_type', metadata)
-            self.assertIn('created_at', metadata)
-            self.assertEqual(metadata['file_type'], 'txt')
-        finally:
-            os.unlink(temp_path)
+        assert 'file_size' in metadata
+        assert 'file_type' in metadata
+        assert 'created_at' in metadata
+        assert metadata['file_type'] == 'txt'
 
 
-class TestMCPService(unittest.TestCase):
+class TestMCPService:
     """Testes para MCPService"""
     
-    def setUp(self):
-        self.service = MCPService()
-    
-    @patch('src.services.mcp_service.document_processor_service')
-    @patch('src.services.mcp_service.search_service')
-    def test_upload_document(self, mock_search, mock_processor):
+    @pytest.mark.xfail(reason="Upload saiu do MCPService; fica em DocumentProcessorService.upload_document",
+                       raises=AttributeError, strict=True)
+    def test_upload_document(self, mcp_service, upload_mocks, mock_file,
+                             monkeypatch):
         """Testa upload de documento"""
-        # Mock dos services
-        mock_processor.process_document.return_value = {
-            'text': 'Texto extraído',
-            'chunks': ['chunk1', 'chunk2'],
-            'metadata': {'file_type': 'txt'}
-        }
-        mock_search.index_document.return_value = True
-        
-        # Mock do arquivo
-        mock_file = Mock()
-        mock_file.filename = 'test.txt'
-        mock_file.read.return_value = b'conteudo'
+        mock_processor, mock_search = upload_mocks
+        monkeypatch.setattr('src.services.mcp_service.document_processor_service',
+                            mock_processor)
+        monkeypatch.setattr('src.services.mcp_service.search_service', mock_search)
         
         # Testar upload
-        result = self.service.upload_document(
+        result = mcp_service.upload_document(
             file=mock_file,
             filename='test.txt',
             user_id=1
         )
         
-        self.assertIn('document_id', result)
-        self.assertIn('status', result)
-        self.assertEqual(result['status'], 'processing')
+        assert 'document_id' in result
+        assert 'status' in result
+        assert result['status'] == 'processing'
     
-    def test_get_statistics(self):
+    @pytest.mark.xfail(reason="MCPService não tem get_statistics; as estatísticas por "
+                              "categoria ficam em get_categories_stats",
+                       raises=AttributeError, strict=True)
+    def test_get_statistics(self, mcp_service):
         """Testa obtenção de estatísticas"""
-        stats = self.service.get_statistics(user_id=1)
+        stats = mcp_service.get_statistics(user_id=1)
         
-        self.assertIn('total_documents', stats)
-        self.assertIn('total_size_mb', stats)
-        self.assertIn('documents_by_category', stats)
-        self.assertIn('processing_status', stats)
+        assert {'total_documents', 'total_size_mb', 'documents_by_category',
+                'processing_status'} <= stats.keys()
     
-    def test_health_check(self):
-        """Testa health check do MCP"""
-        health = self.service.health_check()
+    def test_scrape_all_sources_concurrent(self, mcp_service):
+        """Testa scraping assíncrono de todas as fontes"""
+        requested = []
+        
+        def handler(request):
+            requested.append(str(request.url))
+            if 'bcb.gov.br' in request.url.host:
+                return httpx.Response(503)
+            return httpx.Response(200, text='<html><title>ok</title></html>')
+        
+        mcp_service.request_delay = 0
+        mcp_service._async_client = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        
+        with patch.object(mcp_service, '_needs_update', return_value=True), \
+                patch.object(mcp_service, '_save_scraped_batch') as mock_save, \
+                patch('src.services.mcp_service.RETRY_INITIAL_DELAY', 0):
+            results = mcp_service.scrape_all_sources()
+        
+        total_endpoints = sum(len(source.endpoints) for source in SOURCES)
+        bacen_endpoints = len(mcp_service._source_index['brazil_bacen'].endpoints)
+        retries = (mcp_service.max_retries - 1) * bacen_endpoints
+        assert len(requested) == total_endpoints + retries
+        mock_save.assert_called_once()
+        assert len(mock_save.call_args[0][0]) == len(results)
+        assert results['usa_irs'].success
+        assert results['usa_irs'].documents_found == 3
+        assert results['brazil_bacen'].documents_found == 0
+    
+    def test_scrape_source_conditional_get(self, mcp_service):
+        """Testa reaproveitamento de páginas não modificadas (304)"""
+        url = 'https://www.irs.gov/businesses/international-businesses'
+        previous = {url: {'title': 'Anterior', 'content': 'Texto', 'url': url,
+                          'etag': '"v1"', 'last_modified': None}}
+        
+        def handler(request):
+            if request.headers.get('if-none-match') == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, text='<html><main><p>Novo</p></main></html>',
+                                  headers={'ETag': '"v2"'})
+        
+        mcp_service.request_delay = 0
+        mcp_service._async_client = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        
+        with patch.object(mcp_service, '_load_previous_documents', return_value=previous), \
+                patch.object(mcp_service, '_needs_update', return_value=True), \
+                patch.object(mcp_service, '_save_scraped_batch'), \
+                patch.object(mcp_service, '_get_redis', return_value=None):
+            result = mcp_service.scrape_source('usa_irs')
+        
+        by_url = {doc['url']: doc for doc in result.content}
+        assert by_url[url] is previous[url]
+        assert len(by_url) == 3
+        assert all(doc['etag'] == '"v2"'
+                   for key, doc in by_url.items() if key != url)
+    
+    def test_scrape_source_retries_transient_errors(self, mcp_service):
+        """Testa novas tentativas em 5xx e ausência delas em 4xx"""
+        attempts = {}
+        
+        def handler(request):
+            path = request.url.path
+            attempts[path] = attempts.get(path, 0) + 1
+            if path.endswith('international-businesses'):
+                return httpx.Response(404)
+            if attempts[path] == 1:
+                return httpx.Response(503)
+            return httpx.Response(200, text='<html><main><p>ok</p></main></html>')
+        
+        mcp_service.request_delay = 0
+        mcp_service._async_client = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        
+        with patch.object(mcp_service, '_load_previous_documents', return_value={}), \
+                patch.object(mcp_service, '_needs_update', return_value=True), \
+                patch.object(mcp_service, '_save_scraped_batch'), \
+                patch.object(mcp_service, '_get_redis', return_value=None), \
+                patch('src.services.mcp_service.RETRY_INITIAL_DELAY', 0):
+            result = mcp_service.scrape_source('usa_irs')
+        
+        assert result.documents_found == 2
+        assert attempts['/businesses/international-businesses'] == 1
+        assert attempts['/individuals/international-taxpayers'] == 2
+    
+    def test_scrape_source_unknown_charset(self, mcp_service):
+        """Testa fallback para UTF-8 quando o servidor declara charset desconhecido"""
+        def handler(request):
+            return httpx.Response(200, content='<html><main><p>Regra única</p></main></html>'.encode(),
+                                  headers={'Content-Type': 'text/html; charset=x-inexistente'})
+        
+        mcp_service.request_delay = 0
+        mcp_service._async_client = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
         
-        self.assertIn('status', health)
-        self.assertIn('timestamp', health)
+        with patch.object(mcp_service, '_load_previous_documents', return_value={}), \
+                patch.object(mcp_service, '_needs_update', return_value=True), \
+                patch.object(mcp_service, '_save_scraped_batch'), \
+                patch.object(mcp_service, '_get_redis', return_value=None):
+            result = mcp_service.scrape_source('usa_irs')
+        
+        assert result.success
+        assert result.documents_found == 3
+        assert all(doc['content'] == 'Regra única' for doc in result.content)
+    
+    def test_get_legal_context_cached(self, mcp_service):
+        """Testa cache do contexto jurídico por consulta"""
+        with patch.object(mcp_service, '_get_redis', return_value=None), \
+                patch.object(mcp_service, '_build_legal_context',
+                             wraps=mcp_service._build_legal_context) as mock_build:
+            first = mcp_service.get_legal_context('offshore trust', max_results=2)
+            second = mcp_service.get_legal_context('offshore trust', max_results=2)
+            mcp_service.get_legal_context('acordos', max_results=2)
+        
+        assert first == second
+        assert mock_build.call_count == 2
+    
+    def test_get_legal_context_ranking(self, mcp_service):
+        """Testa ranqueamento BM25 do contexto jurídico"""
+        with patch.object(mcp_service, '_get_redis', return_value=None):
+            docs = mcp_service.get_legal_context('trust structures')
+            unrelated = mcp_service.get_legal_context('xyzzy')
+        
+        assert docs[0].source == 'Treasury Department'
+        assert docs[0].relevance_score == 1.0
+        assert all(d.relevance_score <= 1.0 for d in docs)
+        assert unrelated == []
+    
+    def test_extract_content_from_html(self, mcp_service):
+        """Testa extração de título e parágrafos de HTML e JSON"""
+        page = ('<html><head><title>Tax Treaties</title></head><body>'
+                '<nav><p>Menu</p></nav><main><p>First rule.</p>'
+                '<p>Second rule.</p></main></body></html>')
+        
+        with patch.object(mcp_service, '_get_redis', return_value=None):
+            html_content = mcp_service._extract_content_from_html(
+                page, 'https://example.gov/treaties'
+            )
+            json_content = mcp_service._extract_content_from_html(
+                '{"title": "Rule 1", "description": "Text"}',
+                'https://example.gov/api', 'application/json'
+            )
+        
+        assert html_content == {'title': 'Tax Treaties',
+                                'content': 'First rule. Second rule.'}
+        assert json_content == {'title': 'Rule 1', 'content': 'Text'}
+    
+    def test_extract_content_xhtml_and_empty(self):
+        """Testa páginas XHTML com declaração de encoding e páginas sem documento"""
+        xhtml = ('<?xml version="1.0" encoding="iso-8859-1"?>\n'
+                 '<html xmlns="http://www.w3.org/1999/xhtml"><head><title>Tratados</title>'
+                 '</head><body><p>Regra única.</p></body></html>')
+        
+        assert _extract_content(xhtml, 'https://example.gov/x') == {
+            'title': 'Tratados', 'content': 'Regra única.'}
+        assert _extract_content('<!-- vazio -->', 'https://www.sec.gov/rules') == \
+            _DEFAULT_SUMMARIES[('www.sec.gov', '')]
+    
+    def test_process_pool_shared(self, mcp_service, pdf_service):
+        """Testa pool de processos único e limitado entre os services"""
+        with patch('src.services.process_pool.ProcessPoolExecutor') as mock_executor, \
+                patch('src.services.process_pool._pool', None), \
+                patch('src.services.process_pool.MAX_POOL_WORKERS', 2):
+            pool = mcp_service._get_parse_pool()
+        
+            assert pdf_service._get_render_pool() is pool
+            mock_executor.assert_called_once_with(max_workers=min(os.cpu_count() or 1, 2))
+    
+    def test_rate_limiter_spacing(self):
+        """Testa espaçamento imposto pelo token bucket"""
+        limiter = RateLimiter(rate=20)
+        
+        async def acquire_three():
+            for _ in range(3):
+                await limiter.acquire()
+        
+        start = time.monotonic()
+        asyncio.run(acquire_three())
+        assert time.monotonic() - start >= 0.09
 
 
-class TestSearchService(unittest.TestCase):
+class TestSearchService:
     """Testes para SearchService"""
     
-    def setUp(self):
-        self.service = SearchService()
-    
-    def test_semantic_search_validation(self):
-        """Testa validação da busca semântica"""
-        # Query vazia
-        with self.assertRaises(ValueError):
-            self.service.semantic_search(query="", filters={})
-        
-        # Query muito longa
-        long_query = "a" * 1001
-        with self.assertRaises(ValueError):
-            self.service.semantic_search(query=long_query, filters={})
-    
-    def test_keyword_search(self):
+    @pytest.mark.xfail(reason="SearchService não tem semantic_search; search() não valida a query",
+                       raises=AttributeError, strict=True)
+    @pytest.mark.parametrize("query", ["", _LONG_QUERY], ids=["empty", "too_long"])
+    def test_semantic_search_validation(self, search_service, query):
+        """Testa validação da busca semântica (query vazia ou muito longa)"""
+        with pytest.raises(ValueError):
+            search_service.semantic_search(query=query, filters={})
+    
+    @pytest.mark.xfail(reason="SearchService não tem busca só por palavras-chave",
+                       raises=AttributeError, strict=True)
+    def test_keyword_search(self, search_service):
         """Testa busca por palavras-chave"""
-        result = self.service.keyword_search(
+        result = search_service.keyword_search(
             query="teste",
             filters={'user_id': 1},
             limit=10
         )
         
-        self.assertIn('results', result)
-        self.assertIn('total', result)
-        self.assertIn('search_time_ms', result)
-        self.assertIsInstance(result['results'], list)
+        assert 'results' in result
+        assert 'total' in result
+        assert 'search_time_ms' in result
+        assert isinstance(result['results'], list)
     
-    def test_get_search_suggestions(self):
+    @pytest.mark.xfail(reason="SearchService não tem sugestões de busca",
+                       raises=AttributeError, strict=True)
+    def test_get_search_suggestions(self, search_service):
         """Testa sugestões de busca"""
-        suggestions = self.service.get_search_suggestions(
+        suggestions = search_service.get_search_suggestions(
             partial_query="tes",
             user_id=1,
             limit=5
         )
         
-        self.assertIn('suggestions', suggestions)
-        self.assertIsInstance(suggestions['suggestions'], list)
+        assert 'suggestions' in suggestions
+        assert isinstance(suggestions['suggestions'], list)
     
-    def test_health_check(self):
-        """Testa health check da busca"""
-        health = self.service.health_check()
+    def test_health_check_skips_search(self, search_service):
+        """Testa que o health check só executa busca real com deep=True"""
+        stats = IndexStats(1, 1, 1, 0.0, datetime.utcnow(), {})
         
-        self.assertIn('status', health)
-        self.assertIn('index_size', health)
+        with patch.object(search_service, 'get_index_stats', return_value=stats), \
+                patch.object(search_service, 'search', return_value=[]) as mock_search:
+            health = search_service.health_check()
+            mock_search.assert_not_called()
+            assert 'deep_results_count' not in health['search_test']
+            
+            search_service._deep_check_cache = None
+            search_service.health_check(deep=True)
+            search_service.health_check(deep=True)
+            mock_search.assert_called_once()
+    
+    def test_incremental_index(self, empty_index):
+        """Testa inclusão e remoção incrementais no índice TF-IDF"""
+        if empty_index.vectorizer is None:
+            pytest.skip("scikit-learn não disponível")
+        
+        import numpy as np
+        
+        texts = ['trust offshore tax', 'holding company tax', 'estate planning trust']
+        for doc_id, text in enumerate(texts, 1):
+            empty_index._append_to_index({'id': doc_id, 'processed_content': text})
+        
+        assert empty_index.tfidf_matrix.shape[0] == 3
+        assert empty_index.tfidf_matrix.dtype == np.float32
+        full = empty_index.vectorizer.transform(texts)
+        assert (empty_index.counts_matrix != full).nnz == 0
+        
+        # O último documento ocupa a posição do removido
+        empty_index._remove_from_index(1)
+        
+        assert empty_index.tfidf_matrix.shape[0] == 2
+        assert [doc['id'] for doc in empty_index.documents_data] == [3, 2]
+        assert empty_index._id_to_idx == {3: 0, 2: 1}
+        assert (empty_index.counts_matrix != full[[2, 1]]).nnz == 0
+        
+        empty_index._load_index()
+        assert empty_index._id_to_idx == {3: 0, 2: 1}
+        assert (empty_index.counts_matrix != full[[2, 1]]).nnz == 0
+    
+    def test_ranked_indices(self):
+        """Testa ordenação top-k com argpartition e continuação sob demanda"""
+        import numpy as np
+        
+        scores = np.array([0.2, 0.9, 0.05, 0.7, 0.4, 0.8])
+        candidates = np.flatnonzero(scores >= 0.1)
+        
+        ranked = [int(i) for i in _ranked_indices(scores, candidates, 2)]
+        
+        assert ranked == [1, 5, 3, 4, 0]
+    
+    def test_lsa_search(self, empty_index):
+        """Testa busca por embeddings LSA densos"""
+        if empty_index.vectorizer is None:
+            pytest.skip("scikit-learn não disponível")
+        
+        empty_index.lsa_components = 2
+        
+        texts = ['trust offshore trust', 'holding company shares',
+                 'trust estate trust', 'company shares dividends']
+        empty_index._extend_index([
+            {'id': doc_id, 'title': text, 'content': text,
+             'processed_content': text, 'source': 'test', 'category': 'general'}
+            for doc_id, text in enumerate(texts, 1)
+        ])
+        
+        assert empty_index.embeddings.shape == (4, 2)
+        
+        results = empty_index.search('trust')
+        assert {r.document_id for r in results[:2]} == {1, 3}
+        
+        empty_index._load_index()
+        assert empty_index.embeddings.shape == (4, 2)
+    
+    def test_generate_highlights(self, search_service):
+        """Testa highlights por sentença com uma única varredura"""
+        content = "A lei do trust. Nada aqui! Outro trust e lei? Fim"
+        
+        highlights = search_service._generate_highlights(content, "Trust lei")
+        
+        assert highlights == ['A lei do trust.', 'Outro trust e lei?']
+    
+    def test_search_scores_are_cosine(self, empty_index):
+        """Testa que o produto escalar reproduz a similaridade de cosseno"""
+        if empty_index.vectorizer is None:
+            pytest.skip("scikit-learn não disponível")
+        
+        from sklearn.metrics.pairwise import cosine_similarity
+        
+        texts = ['trust offshore tax', 'holding company', 'trust estate planning']
+        for doc_id, text in enumerate(texts, 1):
+            empty_index._append_to_index({
+                'id': doc_id, 'title': text, 'content': text,
+                'processed_content': text, 'source': 'test', 'category': 'general'
+            })
+        
+        results = empty_index.search('trust')
+        
+        query = empty_index.transformer.transform(
+            empty_index.vectorizer.transform(['trust'])
+        )
+        expected = cosine_similarity(query, empty_index.tfidf_matrix).ravel()
+        
+        assert 2 not in [r.document_id for r in results]
+        for result in results:
+            assert result.score == pytest.approx(expected[result.document_id - 1])
+    
+    def test_sparse_scores_postings(self, empty_index):
+        """Testa que os scores via postings coincidem com o produto completo"""
+        if empty_index.vectorizer is None:
+            pytest.skip("scikit-learn não disponível")
+        
+        import numpy as np
+        
+        empty_index.postings_min_docs = 0
+        
+        texts = ['trust offshore tax', 'holding company', 'trust estate planning']
+        for doc_id, text in enumerate(texts, 1):
+            empty_index._append_to_index({'id': doc_id, 'processed_content': text})
+        
+        query = empty_index.transformer.transform(
+            empty_index.vectorizer.transform(['trust tax'])
+        )
+        full = (empty_index.tfidf_matrix @ query.T).toarray().ravel()
+        np.testing.assert_allclose(empty_index._sparse_scores(query), full, rtol=1e-6)
+        
+        # Nova matriz após inclusão invalida a cópia CSC
+        empty_index._append_to_index({'id': 4, 'processed_content': 'offshore tax'})
+        scores = empty_index._sparse_scores(query)
+        assert len(scores) == 4
+        assert scores[3] > 0
 
 
-class TestCacheService(unittest.TestCase):
+class TestPDFGeneratorService:
+    """Testes para PDFGeneratorService"""
+    
+    def test_render_template(self, pdf_service):
+        """Testar renderização com template pré-compilado"""
+        template = pdf_service.templates['tax_analysis']
+        assert template.compiled is not None
+        
+        html = pdf_service._render_template(template, {
+            'client_name': 'Ana <Souza>',
+            'savings': '30%'
+        })
+        
+        assert 'Ana &lt;Souza&gt;' in html
+        assert '30%' in html
+        assert '{{' not in html
+    
+    def test_placeholder_fallback(self):
+        """Testar substituição em uma passada sem Jinja2"""
+        template = _PlaceholderTemplate('<p>{{name}} - {{ status }} - {{missing}}</p>')
+        
+        html = template.render(name='A & B', status='ok')
+        
+        assert html == '<p>A &amp; B - ok - {{missing}}</p>'
+    
+    def test_custom_template_sandboxed(self, pdf_service):
+        """Testar que template customizado não alcança internals do Python"""
+        payload = '<p>{{ name }}{{ cycler.__init__.__globals__.os.popen("id").read() }}</p>'
+        template = pdf_service._resolve_template('custom', {'name': 'Ana'}, payload)
+        
+        with patch('os.popen') as mock_popen:
+            html = pdf_service._render_template(template, {'name': 'Ana'})
+        
+        mock_popen.assert_not_called()
+        assert 'uid=' not in html
+        assert pdf_service._render_template(
+            pdf_service._resolve_template('custom', {}, '<p>{{ name }}</p>'),
+            {'name': 'A & B'}
+        ) == '<p>A &amp; B</p>'
+    
+    def test_minimal_css(self, pdf_service):
+        """Testar remoção de regras CSS não usadas pelo template"""
+        css = pdf_service.templates['tax_analysis'].css_styles
+        
+        assert '.section' in css
+        assert '@page' in css
+        assert '.signature-section' not in css
+        assert '.footer' not in css
+        assert '.signature-block' in pdf_service.templates['trust_agreement'].css_styles
+    
+    @patch('src.services.pdf_generator_service.CSS')
+    def test_stylesheet_cached(self, mock_css, pdf_service):
+        """Testar que cada folha de estilo é parseada uma única vez"""
+        first = pdf_service._get_stylesheet('p { color: red; }')
+        second = pdf_service._get_stylesheet('p { color: red; }')
+        
+        assert first is second
+        mock_css.assert_called_once_with(string='p { color: red; }',
+                                         font_config=pdf_service._font_config)
+    
+    def test_generate_documents_bulk_validation(self, pdf_service):
+        """Testar validação do lote antes da renderização"""
+        with patch.object(pdf_service, '_get_render_pool') as mock_pool:
+            results = pdf_service.generate_documents_bulk([
+                {'template_type': 'inexistente', 'data': {}},
+                {'template_type': 'tax_analysis', 'data': {'client_name': 'Ana'}}
+            ], user_id=1)
+        
+        mock_pool.assert_not_called()
+        assert len(results) == 2
+        assert not results[0].success
+        assert 'não encontrado' in results[0].error
+        assert not results[1].success
+        assert 'current_structure' in results[1].error
+    
+    def test_render_pdf_cache(self, pdf_service, monkeypatch):
+        """Testar reaproveitamento do PDF em cache via hardlink"""
+        template = pdf_service.templates['tax_analysis']
+        data = pdf_service._get_sample_data('tax_analysis')
+        
+        def fake_render(template, data, file_path):
+            with open(file_path, 'wb') as f:
+                f.write(b'%PDF-1.7')
+            return True
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            monkeypatch.setattr(pdf_service, 'cache_dir', temp_dir)
+            first = os.path.join(temp_dir, 'first.pdf')
+            second = os.path.join(temp_dir, 'second.pdf')
+            
+            with patch('src.services.pdf_generator_service.HTML', object()), \
+                    patch.object(pdf_service, '_render_pdf_uncached',
+                                 side_effect=fake_render) as mock_render:
+                assert pdf_service._render_pdf(template, data, first)
+                assert pdf_service._render_pdf(template, data, second)
+            
+            mock_render.assert_called_once()
+            assert os.path.samefile(first, second)
+    
+    def test_render_pdf_reportlab_not_cached(self, pdf_service, tmp_path, monkeypatch):
+        """Testar que o fallback ReportLab (PDF com data de geração) não usa o cache"""
+        template = pdf_service.templates['tax_analysis']
+        data = pdf_service._get_sample_data('tax_analysis')
+        monkeypatch.setattr(pdf_service, 'cache_dir', str(tmp_path))
+        
+        with patch('src.services.pdf_generator_service.HTML', None), \
+                patch.object(pdf_service, '_render_pdf_uncached',
+                             return_value=True) as mock_render:
+            assert pdf_service._render_pdf(template, data, str(tmp_path / 'a.pdf'))
+            assert pdf_service._render_pdf(template, data, str(tmp_path / 'b.pdf'))
+        
+        assert mock_render.call_count == 2
+        assert list(tmp_path.iterdir()) == []
+    
+    def test_prune_pdf_cache(self, pdf_service, tmp_path, monkeypatch):
+        """Testar poda do cache por idade e por tamanho total"""
+        monkeypatch.setattr(pdf_service, 'cache_dir', str(tmp_path))
+        now = time.time()
+        ages = {'expired': PDF_CACHE_MAX_AGE + 60, 'old': 300, 'recent': 60, 'newest': 0}
+        for name, age in ages.items():
+            path = tmp_path / f'{name}.pdf'
+            path.write_bytes(b'x' * 10)
+            os.utime(path, (now - age, now - age))
+        
+        with patch('src.services.pdf_generator_service.PDF_CACHE_MAX_BYTES', 20):
+            pdf_service._prune_pdf_cache()
+        
+        assert sorted(path.name for path in tmp_path.iterdir()) == ['newest.pdf', 'recent.pdf']
+    
+    def test_delete_releases_cached_pdf(self, pdf_service, tmp_path, monkeypatch):
+        """Testar que o cache só é removido quando o último documento sai"""
+        monkeypatch.setattr(pdf_service, 'cache_dir', str(tmp_path))
+        data = {'client_name': 'Ana'}
+        cache_path = pdf_service._pdf_cache_path(pdf_service.templates['tax_analysis'], data)
+        with open(cache_path, 'wb') as f:
+            f.write(b'%PDF-1.7')
+        
+        documentos = []
+        for name in ('a.pdf', 'b.pdf'):
+            file_path = str(tmp_path / name)
+            assert pdf_service._link_cached_pdf(cache_path, file_path)
+            documentos.append(SimpleNamespace(template_type='tax_analysis',
+                                              template_data=data, file_path=file_path))
+        
+        for documento, cache_left in zip(documentos, (True, False)):
+            assert pdf_service._cached_pdf_for(documento) == cache_path
+            os.remove(documento.file_path)
+            pdf_service._release_cached_pdf(cache_path)
+            assert os.path.exists(cache_path) is cache_left
+    
+    def test_flush_falls_back_to_single_rows(self, pdf_service, tmp_path):
+        """Testar que uma linha inválida não derruba o lote e é descartada ao fim"""
+        good, bad = tmp_path / 'good.pdf', tmp_path / 'bad.pdf'
+        good.write_bytes(b'%PDF-1.7')
+        bad.write_bytes(b'%PDF-1.7')
+        app = MagicMock()
+        writes = [(app, ('update', {'id': 1, 'file_size': 8}, str(good), 1)),
+                  (app, ('update', {'id': 2, 'file_size': 8}, str(bad), 1))]
+        persisted = []
+        
+        def persist(batch):
+            if any(mapping['id'] == 2 for _, mapping, _, _ in batch):
+                raise ValueError('linha inválida')
+            persisted.extend(mapping['id'] for _, mapping, _, _ in batch)
+        
+        with patch.object(pdf_service, '_persist_writes', side_effect=persist), \
+                patch.object(pdf_service, '_ensure_flusher'), \
+                patch('src.services.pdf_generator_service.db'):
+            pdf_service._flush_jobs([], writes)
+            for _ in range(FLUSH_MAX_ATTEMPTS - 1):
+                retry, pdf_service._pending_writes = pdf_service._pending_writes, []
+                assert [write[1]['id'] for _, write in retry] == [2]
+                pdf_service._flush_jobs([], retry)
+        
+        assert persisted == [1]
+        assert pdf_service._pending_writes == []
+        assert good.exists()
+        assert not bad.exists()
+    
+    def test_submit_failure_removes_pending_row(self, pdf_service):
+        """Testar que falha ao enviar ao pool não deixa linha pendente órfã"""
+        with patch('src.services.pdf_generator_service.db') as mock_db, \
+                patch('src.services.pdf_generator_service.DocumentoGerado') as mock_model, \
+                patch.object(pdf_service, '_get_render_pool') as mock_pool:
+            mock_pool.return_value.submit.side_effect = RuntimeError('pool encerrado')
+            with pytest.raises(RuntimeError):
+                pdf_service._submit_document('tax_analysis', {}, 1, None,
+                                             'a.pdf', '/tmp/a.pdf', 0.0)
+        
+        mock_db.session.add.assert_called_once_with(mock_model.return_value)
+        mock_db.session.delete.assert_called_once_with(mock_model.return_value)
+        assert pdf_service._pending_jobs == []
+    
+    def test_drain_pending_at_exit(self, pdf_service, tmp_path):
+        """Testar gravação dos jobs pendentes na saída do processo"""
+        finished, stuck = Future(), Future()
+        finished.set_result(10)
+        stuck_path = tmp_path / 'stuck.pdf'
+        stuck_path.write_bytes(b'%PDF-1.7')
+        app = MagicMock()
+        pdf_service._pending_jobs = [(finished, 7, str(tmp_path / 'ok.pdf'), 1, app),
+                                     (stuck, 8, str(stuck_path), 1, app)]
+        
+        with patch.object(pdf_service, '_persist_writes') as mock_persist, \
+                patch('src.services.pdf_generator_service.FLUSH_DRAIN_TIMEOUT', 0):
+            pdf_service._drain_pending()
+        
+        mock_persist.assert_called_once_with([
+            ('delete', {'id': 8}, None, 1),
+            ('update', {'id': 7, 'file_size': 10, 'generated': True}, str(tmp_path / 'ok.pdf'), 1)
+        ])
+        assert not stuck_path.exists()
+        assert pdf_service._pending_jobs == [] and pdf_service._pending_writes == []
+    
+    def test_preview_template(self, pdf_service):
+        """Testar preview com dados de exemplo"""
+        html = pdf_service.preview_template('trust_agreement')
+        
+        assert 'John Smith' in html
+        assert 'Cayman Islands' in html
+
+
+class TestCacheService:
     """Testes para CacheService"""
     
-    def setUp(self):
-        self.service = CacheService()
+    STATS_ITEMS = {"key1": "value1", "key2": "value2"}
     
-    def test_set_get_cache(self):
+    def test_set_get_cache(self, cache_service):
         """Testa operações básicas de cache"""
         key = "test_key"
         value = {"data": "test_value"}
         
         # Set
-        self.service.set(key, value, ttl=60)
+        cache_service.set(key, value, ttl=60)
         
         # Get
-        cached_value = self.service.get(key)
-        self.assertEqual(cached_value, value)
+        cached_value = cache_service.get(key)
+        assert cached_value == value
     
-    def test_cache_expiration(self):
+    def test_cache_expiration(self, cache_service, monkeypatch):
         """Testa expiração do cache"""
         key = "test_expiration"
         value = "test_value"
+        t0 = time.time()
         
         # Set com TTL muito baixo
-        self.service.set(key, value, ttl=0.1)
+        cache_service.set(key, value, ttl=0.1)
         
         # Verificar que existe
-        self.assertEqual(self.service.get(key), value)
+        assert cache_service.get(key) == value
         
-        # Aguardar expiração
-        import time
-        time.sleep(0.2)
+        # Avançar o relógio do service além do TTL, sem dormir
+        monkeypatch.setattr(time, 'time', lambda: t0 + 1.0)
         
         # Verificar que expirou
-        self.assertIsNone(self.service.get(key))
+        assert cache_service.get(key) is None
     
-    def test_delete_cache(self):
+    def test_delete_cache(self, cache_service):
         """Testa exclusão de cache"""
         key = "test_delete"
         value = "test_value"
         
         # Set e verificar
-        self.service.set(key, value)
-        self.assertEqual(self.service.get(key), value)
+        cache_service.set(key, value)
+        assert cache_service.get(key) == value
         
         # Delete e verificar
-        self.service.delete(key)
-        self.assertIsNone(self.service.get(key))
+        cache_service.delete(key)
+        assert cache_service.get(key) is None
     
-    def test_cache_statistics(self):
+    def test_cache_statistics(self, cache_service):
         """Testa estatísticas do cache"""
-        # Adicionar alguns itens
-        self.service.set("key1", "value1")
-        self.service.set("key2", "value2")
-        
-        stats = self.service.get_statistics()
-        
-        self.assertIn('total_keys', stats)
-        self.assertIn('memory_usage_mb', stats)
-        self.assertIn('hit_rate', stats)
+        # Adicionar alguns itens em lote
+        assert cache_service.set_multiple(self.STATS_ITEMS)
+        assert cache_service.get_multiple(list(self.STATS_ITEMS)) == self.STATS_ITEMS
+        
+        stats = cache_service.get_stats()
+        
+        assert stats.total_keys >= len(self.STATS_ITEMS)
+        assert stats.memory_usage_mb >= 0
+        assert stats.hit_rate > 0
+    
+    def test_deepcopy_isolated(self, cache_service):
+        """Testa que a cópia profunda isola o cache e compartilha o Redis"""
+        cache_service.set("shared", ["a"])
+        clone = copy.deepcopy(cache_service)
+        clone.set("only_clone", 1)
+        
+        assert clone.redis_client is cache_service.redis_client
+        assert clone.get("shared") == ["a"]
+        assert clone.memory_cache["shared"] is not cache_service.memory_cache["shared"]
+        assert cache_service.get("only_clone") is None
 
 
-class TestLoggingService(unittest.TestCase):
+class TestLoggingService:
     """Testes para LoggingService"""
     
-    def setUp(self):
-        self.service = LoggingService()
-    
-    def test_log_levels(self):
+    @pytest.mark.parametrize("level", ["debug", "info", "warning", "error"])
+    def test_log_levels(self, logging_service, level):
         """Testa diferentes níveis de log"""
         # Não deve gerar exceções
-        self.service.debug("TestComponent", "DEBUG_ACTION", "Debug message")
-        self.service.info("TestComponent", "INFO_ACTION", "Info message")
-        self.service.warning("TestComponent", "WARNING_ACTION", "Warning message")
-        self.service.error("TestComponent", "ERROR_ACTION", "Error message")
+        getattr(logging_service, level)(
+            "TestComponent", f"{level.upper()}_ACTION", f"{level.capitalize()} message"
+        )
     
-    def test_log_with_metadata(self):
+    def test_log_with_metadata(self, logging_service):
         """Testa log com metadados"""
         metadata = {
             'user_id': 123,
@@ -350,7 +850,7 @@ class TestLoggingService(unittest.TestCase):
         }
         
         # Não deve gerar exceções
-        self.service.info(
+        logging_service.info(
             "TestComponent",
             "TEST_ACTION",
             "Test message with metadata",
@@ -358,81 +858,165 @@ class TestLoggingService(unittest.TestCase):
             metadata=metadata
         )
     
-    def test_get_logs(self):
+    def test_get_logs(self, logging_service):
         """Testa obtenção de logs"""
-        # Adicionar alguns logs
-        self.service.info("TestComponent", "ACTION1", "Message 1")
-        self.service.error("TestComponent", "ACTION2", "Message 2")
+        # Adicionar alguns logs em lote
+        emitted = logging_service.log_many([
+            (LogLevel.INFO, "TestComponent", "ACTION1", "Message 1"),
+            (LogLevel.ERROR, "TestComponent", "ACTION2", "Message 2"),
+        ])
+        assert emitted == 2
         
         # Obter logs
-        logs = self.service.get_logs(limit=10)
+        logs = logging_service.get_logs(limit=10)
         
-        self.assertIsInstance(logs, list)
+        assert isinstance(logs, list)
         if logs:  # Se houver logs
             log_entry = logs[0]
-            self.assertIn('timestamp', log_entry)
-            self.assertIn('level', log_entry)
-            self.assertIn('component', log_entry)
-
+            assert 'timestamp' in log_entry
+            assert 'level' in log_entry
+            assert 'service' in log_entry
+    
+    def test_log_many_matches_log(self):
+        """Testa que log_many grava os mesmos registros que log"""
+        with tempfile.TemporaryDirectory() as logs_dir:
+            service = LoggingService(logs_dir=logs_dir)
+            service.log_many([
+                (LogLevel.INFO, "BatchComponent", "ACTION1", "Primeira"),
+                (LogLevel.WARNING, "BatchComponent", "ACTION2", "Segunda"),
+            ])
+            
+            logs = service.get_logs(service="BatchComponent")
+            
+            assert [log['message'] for log in logs] == ["Segunda", "Primeira"]
+            assert [log['level'] for log in logs] == ["WARNING", "INFO"]
+    
+    def test_get_logs_filters(self, logging_service):
+        """Testa filtros de service e nível na leitura de logs"""
+        logging_service.info("FilterComponent", "ACTION1", "Info message")
+        logging_service.error("FilterComponent", "ACTION2", "Error message")
+        logging_service.info("OtherComponent", "ACTION3", "Other message")
+        
+        logs = logging_service.get_logs(service="FilterComponent",
+                                        level=LogLevel.ERROR, limit=1000)
+        
+        assert logs
+        for log_entry in logs:
+            assert log_entry['service'] == "FilterComponent"
+            assert log_entry['level'] == "ERROR"
+    
+    def test_get_logs_most_recent_first(self, logging_service):
+        """Testa que os logs mais recentes são retornados primeiro"""
+        logging_service.info("OrderComponent", "ACTION1", "Primeira mensagem")
+        logging_service.info("OrderComponent", "ACTION2", "Segunda mensagem")
+        
+        logs = logging_service.get_logs(service="OrderComponent", limit=1)
+        
+        assert len(logs) == 1
+        assert logs[0]['message'] == "Segunda mensagem"
+    
+    def test_get_logs_index_matches_scan(self):
+        """Testa que o índice lateral retorna o mesmo que a leitura linear"""
+        with tempfile.TemporaryDirectory() as logs_dir:
+            service = LoggingService(logs_dir=logs_dir)
+            for i in range(20):
+                service.info("IndexComponent" if i % 2 else "OtherComponent",
+                             "ACTION", f"Mensagem {i}", user_id=i % 3 or None)
+            
+            indexed = service.get_logs(service="IndexComponent", user_id=1)
+            assert os.path.exists(os.path.join(logs_dir, 'polaris.log.idx'))
+            
+            os.remove(os.path.join(logs_dir, 'polaris.log.idx'))
+            scanned = service.get_logs(service="IndexComponent", user_id=1)
+            
+            assert indexed
+            assert indexed == scanned
+    
+    def test_buffered_handler_flush_on_error(self):
+        """Testa que registros de erro descarregam o buffer imediatamente"""
+        with tempfile.TemporaryDirectory() as logs_dir:
+            log_file = os.path.join(logs_dir, 'buffered.log')
+            handler = BufferedRotatingFileHandler(
+                log_file, flush_interval=60, encoding='utf-8')
+            logger = logging.getLogger('polaris.test.buffered')
+            logger.propagate = False
+            logger.addHandler(handler)
+            
+            try:
+                logger.warning("Mensagem bufferizada")
+                assert os.path.getsize(log_file) == 0
+                
+                logger.error("Mensagem de erro")
+                with open(log_file, encoding='utf-8') as f:
+                    content = f.read()
+                assert "Mensagem bufferizada" in content
+                assert "Mensagem de erro" in content
+            finally:
+                logger.removeHandler(handler)
+                handler.close()
+    
+    def test_buffered_handler_rollover_in_background(self):
+        """Testa rotação executada pela thread de flush"""
+        with tempfile.TemporaryDirectory() as logs_dir:
+            log_file = os.path.join(logs_dir, 'rotating.log')
+            handler = BufferedRotatingFileHandler(
+                log_file, flush_interval=0.01, maxBytes=100, backupCount=2,
+                encoding='utf-8')
+            logger = logging.getLogger('polaris.test.rotating')
+            logger.propagate = False
+            logger.addHandler(handler)
+            
+            try:
+                for i in range(5):
+                    logger.warning("Mensagem de rotação %d %s", i, "x" * 40)
+                
+                deadline = time.monotonic() + 2
+                while (not os.path.exists(log_file + '.1') and
+                       time.monotonic() < deadline):
+                    time.sleep(0.01)
+                
+                assert os.path.exists(log_file + '.1')
+            finally:
+                logger.removeHandler(handler)
+                handler.close()
 
-class TestIntegration(unittest.TestCase):
-    """Testes de integração entre services"""
-    
-    def setUp(self):
-        self.auth_service = AuthService()
-        self.cache_service = CacheService()
-        self.logging_service = LoggingService()
-    
-    def test_auth_cache_integration(self):
-        """Testa integração entre Auth e Cache"""
-        # Gerar token
-        user_data = {'id': 1, 'email': 'test@example.com'}
-        token = self.auth_service.generate_token(user_data)
-        
-        # Cachear token
-        cache_key = f"token_{token[:10]}"
-        self.cache_service.set(cache_key, user_data, ttl=300)
-        
-        # Verificar cache
-        cached_data = self.cache_service.get(cache_key)
-        self.assertEqual(cached_data, user_data)
-    
-    def test_logging_integration(self):
-        """Testa integração do logging com outros services"""
-        # Simular operação que gera logs
-        self.logging_service.info(
-            "Integration",
-            "TEST_OPERATION",
-            "Testing integration",
-            user_id=1,
-            metadata={'test': True}
-        )
-        
-        # Verificar que log foi criado
-        logs = self.logging_service.get_logs(limit=1)
-        self.assertTrue(len(logs) >= 0)  # Pode estar vazio dependendo da implementação
 
+# Testes de integração entre services
 
-def run_all_tests():
-    """Executa todos os testes"""
-    # Descobrir e executar todos os testes
-    loader = unittest.TestLoader()
-    suite = loader.loadTestsFromModule(__import__(__name__))
+def test_auth_cache_integration(jwt_token, cache_service):
+    """Testa integração entre Auth e Cache"""
+    user_data = {'id': 1, 'email': 'test@example.com'}
     
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
+    # Cachear token
+    cache_key = f"token_{jwt_token[:10]}"
+    cache_service.set(cache_key, user_data, ttl=300)
     
-    return result.wasSuccessful()
+    # Verificar cache
+    cached_data = cache_service.get(cache_key)
+    assert cached_data == user_data
 
 
-if __name__ == '__main__':
-    # Executar testes
-    success = run_all_tests()
-    
-    if success:
-        print("\n✅ TODOS OS TESTES PASSARAM!")
-    else:
-        print("\n❌ ALGUNS TESTES FALHARAM!")
-    
-    exit(0 if success else 1)
+def test_logging_integration(logging_service):
+    """Testa integração do logging com outros services"""
+    # Simular operação que gera logs
+    logging_service.info(
+        "Integration",
+        "TEST_OPERATION",
+        "Testing integration",
+        user_id=1,
+        metadata={'test': True}
+    )
+    
+    # Verificar que log foi criado
+    logs = logging_service.get_logs(limit=1)
+    assert len(logs) >= 0  # Pode estar vazio dependendo da implementação
 
+
+if __name__ == '__main__':
+    # Execução avulsa para depuração; o ponto de entrada normal é
+    # ``pytest tests/test_services.py``. Com pytest-xdist instalado,
+    # distribui as classes entre os núcleos.
+    args = [__file__, '-q', '--no-header', '-p', 'no:cacheprovider']
+    if importlib.util.find_spec('xdist') is not None:
+        args += ['-n', 'auto', '--dist=loadscope']
+    sys.exit(pytest.main(args))